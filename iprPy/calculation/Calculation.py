@@ -122,6 +122,8 @@ class Calculation(object):
         # Universal singular keys for all calculations
         return  [
                     'branch',
+                    'archive_exclude',
+                    'archive_keep',
                 ]
     
     @property
@@ -132,6 +134,24 @@ class Calculation(object):
         # Universal multi key sets for all calculations
         return []
     
+    @property
+    def archive_exclude(self):
+        """
+        list: Patterns of the files in finished calculation folders that are
+        left out of the archives.  Can be replaced by the archive_exclude
+        input term.
+        """
+        return []
+    
+    @property
+    def archive_keep(self):
+        """
+        list: Patterns of the files in finished calculation folders that are
+        archived even if they match archive_exclude.  Can be replaced by the
+        archive_keep input term.
+        """
+        return []
+    
     @property
     def allkeys(self):
         """
@@ -150,7 +170,7 @@ class Calculation(object):
         
         # Add metadata fields
         template += '\n# Calculation metadata\n'
-        metakeys = ['branch']
+        metakeys = ['branch', 'archive_exclude', 'archive_keep']
         for key in metakeys:
             spacelen = 32 - len(key)
             if spacelen < 1:
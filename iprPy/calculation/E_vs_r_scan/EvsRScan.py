@@ -41,6 +41,16 @@ class EvsRScan(Calculation):
         # Join and return
         return universalfiles + files
     
+    @property
+    def archive_exclude(self):
+        """
+        list: Patterns of the files left out of the archives of finished
+        calculations: the LAMMPS logs of the individual r values.
+        """
+        return [
+            'run0-*-log.lammps',
+        ]
+    
     @property
     def template(self):
         """
@@ -1,7 +1,7 @@
 """
 Attributes
 ----------
-loaded : dict
+loaded : iprPy.tools.LazyImport
     Dictionary of the derived classes
 databases_dict : dict
     Dictionary of the database styles that successfully loaded. The
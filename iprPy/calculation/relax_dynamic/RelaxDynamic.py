@@ -40,6 +40,16 @@ class RelaxDynamic(Calculation):
         # Join and return
         return universalfiles + files
     
+    @property
+    def archive_exclude(self):
+        """
+        list: Patterns of the files left out of the archives of finished
+        calculations: the dump files between the initial and final ones.
+        """
+        return [
+            '*.dump',
+        ]
+    
     @property
     def template(self):
         """
@@ -40,6 +40,16 @@ class RelaxStatic(Calculation):
         # Join and return
         return universalfiles + files
     
+    @property
+    def archive_exclude(self):
+        """
+        list: Patterns of the files left out of the archives of finished
+        calculations: the dump files of the cycles before the final one.
+        """
+        return [
+            'relax_static-*.dump',
+        ]
+    
     @property
     def template(self):
         """
@@ -40,6 +40,16 @@ class StackingFaultMap2D(Calculation):
         # Join and return
         return universalfiles + files
     
+    @property
+    def archive_exclude(self):
+        """
+        list: Patterns of the files left out of the archives of finished
+        calculations: the LAMMPS runs of the individual shifts.
+        """
+        return [
+            'a*-b*/*',
+        ]
+    
     @property
     def template(self):
         """
@@ -15,8 +15,13 @@ __all__ = ['check_modules']
 def check_modules():
     """
     Prints lists of the calculation, record, and database styles that were
-    successfully and unsuccessfully loaded when iprPy was initialized.
+    successfully and unsuccessfully loaded.  As styles are imported on first
+    use, all styles are imported here first.
     """
+    for loaded in [input_subset_loaded, input_buildcombos_loaded,
+                   record_loaded, calculation_loaded, database_loaded]:
+        loaded.load_all()
+    
     print('input.subset styles that passed import:')
     for style in input_subset_loaded.keys():
         print(f'- {style}')
@@ -0,0 +1,137 @@
+# Standard Python libraries
+from collections import OrderedDict
+from copy import deepcopy
+from threading import Lock
+
+__all__ = ['ContentCache', 'content_cache']
+
+class ContentCache(object):
+    """
+    Size-bounded least recently used cache of parsed record content.  Entries
+    are keyed by the database host and record name, and are only returned if
+    the record's modification stamp still matches the stamp the content was
+    stored with.  The cache is shared by all database objects in the process
+    so that records used by multiple prepare calls are only parsed once.
+    Content is copied going in and out of the cache, so the cached values are
+    not affected by changes made to the returned content.
+    """
+
+    def __init__(self, maxsize=2048):
+        """
+        Initializes an empty cache.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            The maximum number of record contents to keep.  The least recently
+            used entries are dropped once the size is exceeded.  Default value
+            is 2048.
+        """
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        """int: The maximum number of record contents to keep."""
+        return self.__maxsize
+
+    @maxsize.setter
+    def maxsize(self, value):
+        value = int(value)
+        if value < 0:
+            raise ValueError('maxsize must be >= 0')
+        self.__maxsize = value
+        with self.__lock:
+            self.__trim()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __trim(self):
+        """Drops the least recently used entries above maxsize."""
+        while len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+
+    def get(self, host, name, stamp):
+        """
+        Retrieves cached record content.
+
+        Parameters
+        ----------
+        host : str
+            The host of the database the record is in.
+        name : str
+            The record's name.
+        stamp : any
+            The record's current modification stamp.
+
+        Returns
+        -------
+        DataModelDict or None
+            A copy of the cached content, or None if the record is not cached or the
+            cached content is for a different stamp.
+        """
+        key = (str(host), name)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry[0] != stamp:
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            content = entry[1]
+        return deepcopy(content)
+
+    def set(self, host, name, stamp, content):
+        """
+        Stores record content.
+
+        Parameters
+        ----------
+        host : str
+            The host of the database the record is in.
+        name : str
+            The record's name.
+        stamp : any
+            The record's modification stamp.
+        content : DataModelDict
+            The record's parsed content.
+        """
+        key = (str(host), name)
+        content = deepcopy(content)
+        with self.__lock:
+            self.__entries[key] = (stamp, content)
+            self.__entries.move_to_end(key)
+            self.__trim()
+
+    def invalidate(self, host, name=None):
+        """
+        Removes cached record content.
+
+        Parameters
+        ----------
+        host : str
+            The host of the database.
+        name : str, optional
+            The name of the record to remove.  If not given, all records for
+            the host are removed.
+        """
+        host = str(host)
+        with self.__lock:
+            if name is not None:
+                self.__entries.pop((host, name), None)
+            else:
+                for key in [key for key in self.__entries if key[0] == host]:
+                    del self.__entries[key]
+
+    def clear(self):
+        """Removes all cached content and resets the hit counts."""
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+content_cache = ContentCache()
@@ -4,6 +4,8 @@ import sys
 import glob
 import shutil
 import tempfile
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 
 # https://pandas.pydata.org/
 import pandas as pd
@@ -17,6 +19,7 @@ from ..record import loaded as record_loaded
 from ..tools import screen_input, aslist
 from .prepare import prepare
 from .runner import runner
+from .claim import FileClaim
 from .settings import load_run_directory
 
 class Database(object):
@@ -92,6 +95,57 @@ class Database(object):
         """
         raise AttributeError('get_records not defined for Database style')
     
+    def iget_records(self, name=None, style=None, query=None, batch_size=None,
+                     **kwargs):
+        """
+        Iterates over all matching records in the database.  Unlike
+        get_records, the records are loaded as they are iterated over rather
+        than all at once.
+        
+        Parameters
+        ----------
+        name : str, optional
+            The record name or id to limit the search by.
+        style : str, optional
+            The record style to limit the search by.
+        batch_size : int, optional
+            The number of records to fetch from the database at a time, for
+            the database styles where records are fetched in batches.
+            
+        Yields
+        ------
+        iprPy.Record
+            Each record from the database matching the given parameters.
+        
+        Raises
+        ------
+        AttributeError
+            If iget_records is not defined for database style.
+        """
+        raise AttributeError('iget_records not defined for Database style')
+    
+    def _ismatch(self, record, **kwargs):
+        """
+        Checks if a record's todict(full=False, flat=True) values match all
+        given kwargs.  Used by iget_records for kwargs that cannot be
+        evaluated before the record is loaded.
+        """
+        if len(kwargs) == 0:
+            return True
+        
+        # Check the values with querypaths without building todict
+        mismatch, kwargs = record.queryextractor.mismatch(record.content, **kwargs)
+        if mismatch:
+            return False
+        if len(kwargs) == 0:
+            return True
+        
+        params = record.todict(full=False, flat=True)
+        for key in kwargs:
+            if key not in params or params[key] not in aslist(kwargs[key]):
+                return False
+        return True
+    
     def get_record(self, name=None, style=None, query=None, **kwargs):
         """
         Returns a single matching record from the database.  Issues an error
@@ -148,6 +202,28 @@ class Database(object):
         """
         raise AttributeError('get_records_df not defined for Database style')
     
+    def get_record_names(self, style):
+        """
+        Lists the names of all records of a given style in the database
+        without loading the records.
+        
+        Parameters
+        ----------
+        style : str
+            The record style to list the names of.
+            
+        Returns
+        ------
+        set of str
+            The names of all records of the style.
+        
+        Raises
+        ------
+        AttributeError
+            If get_record_names is not defined for database style.
+        """
+        raise AttributeError('get_record_names not defined for Database style')
+    
     def add_record(self, record=None, name=None, style=None, content=None):
         """
         Adds a new record to the database.  Will issue an error if a
@@ -181,6 +257,81 @@ class Database(object):
         """
         raise AttributeError('add_record not defined for Database style')
     
+    def add_records(self, records, skip_existing=True, existing=None):
+        """
+        Adds multiple new records to the database.  The names of the existing
+        records are checked once for each record style rather than once per
+        record.  Database styles that support bulk writes override this to
+        upload the records together, otherwise each record is added with
+        add_record.
+        
+        Parameters
+        ----------
+        records : list of iprPy.Record
+            The new records to add to the database.
+        skip_existing : bool, optional
+            If True (default), records whose names match existing records or
+            earlier records in the list are skipped.  If False, an error is
+            issued if any matching records are found.
+        existing : dict, optional
+            The names of the existing records for each record style, if
+            already known.  Styles included here are not listed again, and
+            the sets are updated with the added names.
+        
+        Returns
+        ------
+        list of iprPy.Record
+            The records that were added.
+        
+        Raises
+        ------
+        ValueError
+            If skip_existing is False and a matching record already exists.
+        """
+        records = self._new_records(records, skip_existing, existing)
+        for record in records:
+            self.add_record(record=record)
+        return records
+    
+    def _new_records(self, records, skip_existing=True, existing=None):
+        """
+        Filters a list of records down to the ones whose names are not in the
+        database or earlier in the list.  Used by add_records.
+        
+        Parameters
+        ----------
+        records : list of iprPy.Record
+            The records to check.
+        skip_existing : bool, optional
+            If True (default), matching records are left out of the returned
+            list.  If False, an error is issued if any are found.
+        existing : dict, optional
+            The known names of the existing records for each record style.
+        
+        Returns
+        ------
+        list of iprPy.Record
+            The records with new names.
+        
+        Raises
+        ------
+        ValueError
+            If skip_existing is False and a matching record is found.
+        """
+        if existing is None:
+            existing = {}
+        newrecords = []
+        for record in records:
+            if record.style not in existing:
+                existing[record.style] = set(self.get_record_names(record.style))
+            if record.name in existing[record.style]:
+                if skip_existing:
+                    continue
+                raise ValueError(f'Record {record.name} already exists')
+            existing[record.style].add(record.name)
+            newrecords.append(record)
+        return newrecords
+    
     def update_record(self, record=None, name=None, style=None, content=None):
         """
         Replaces an existing record with a new record of matching name and
@@ -236,7 +387,8 @@ class Database(object):
         """
         raise AttributeError('delete_record not defined for Database style')
     
-    def get_tar(self, record=None, name=None, style=None, raw=False):
+    def get_tar(self, record=None, name=None, style=None, raw=False,
+                stream=False):
         """
         Retrives the tar archive associated with a record in the database.
         Issues an error if exactly one matching record is not found in the
@@ -253,6 +405,10 @@ class Database(object):
         raw : bool, optional
             If True, return the archive as raw binary content. If
             False, return as an open tarfile. (Default is False)
+        stream : bool, optional
+            If True and raw is True, the raw content is returned as an open
+            binary file-like object rather than as bytes, allowing for it to
+            be read in chunks. (Default is False)
             
         Returns
         -------
@@ -285,9 +441,10 @@ class Database(object):
             .The name to use in uniquely identifying the record.
         style : str, optional
             .The style to use in uniquely identifying the record.
-        tar : bytes, optional
-            The bytes content of a tar file to save.  tar cannot be given
-            with root_dir.
+        tar : bytes or file-like object, optional
+            The bytes content of a tar file to save, or an open binary
+            file-like object to read it from.  tar cannot be given with
+            root_dir.
         root_dir : str, optional
             Specifies the root directory for finding the directory to archive.
             The directory to archive is at <root_dir>/<name>.  (Default is to
@@ -318,9 +475,10 @@ class Database(object):
             .The name to use in uniquely identifying the record.
         style : str, optional
             .The style to use in uniquely identifying the record.
-        tar : bytes, optional
-            The bytes content of a tar file to save.  tar cannot be given
-            with root_dir.
+        tar : bytes or file-like object, optional
+            The bytes content of a tar file to save, or an open binary
+            file-like object to read it from.  tar cannot be given with
+            root_dir.
         root_dir : str, optional
             Specifies the root directory for finding the directory to archive.
             The directory to archive is at <root_dir>/<name>.  (Default is to
@@ -357,6 +515,71 @@ class Database(object):
         """
         raise AttributeError('delete_tar not defined for Database style')
     
+    def get_tar_names(self, style):
+        """
+        Lists the names of all records of a given style in the database that
+        have an associated tar archive.
+        
+        Parameters
+        ----------
+        style : str
+            The record style to list the names of.
+            
+        Returns
+        ------
+        set of str
+            The names of all records of the style with tar archives.
+        
+        Raises
+        ------
+        AttributeError
+            If get_tar_names is not defined for database style.
+        """
+        raise AttributeError('get_tar_names not defined for Database style')
+
+    def get_tar_member(self, record=None, name=None, style=None, path=None):
+        """
+        Retrieves a single file from the tar archive associated with a record
+        in the database.  This default implementation reads through the
+        archive with get_tar and copies the file to a temporary file that is
+        kept in memory while small, while the database styles that store
+        member indexes with the archives only read the file's part of the
+        archive.
+
+        Parameters
+        ----------
+        record : iprPy.Record, optional
+            The record to retrive the associated tar archive for.
+        name : str, optional
+            .The name to use in uniquely identifying the record.
+        style : str, optional
+            .The style to use in uniquely identifying the record.
+        path : str
+            The path of the file in the archive, which starts with the record's
+            name.
+
+        Returns
+        -------
+        file-like object
+            The file's content as an open binary file-like object.
+
+        Raises
+        ------
+        KeyError
+            If the archive does not contain the file.
+        """
+        tar = self.get_tar(record=record, name=name, style=style) #pylint: disable=assignment-from-no-return
+        try:
+            member = tar.extractfile(str(path))
+            if member is None:
+                raise KeyError(f'{path} not found in archive')
+            spool = tempfile.SpooledTemporaryFile(max_size=16777216)
+            shutil.copyfileobj(member, spool)
+            spool.seek(0)
+            return spool
+        finally:
+            tar.close()
+
     def build_refs(self, lib_directory=None, refresh=False, include=None):
         """
         Adds reference records from a library to a database.
@@ -498,14 +721,14 @@ class Database(object):
             if records is not None:
                 raise ValueError('record_style and records cannot both be given')
             
-            # Retrieve records with errors from self
-            records = self.get_records(style=record_style, status='error') #pylint: disable=assignment-from-no-return
+            # Iterate over records with errors from self
+            records = self.iget_records(style=record_style, status='error') #pylint: disable=assignment-from-no-return
         
         elif records is None:
             # Set empty list if record_style is still None and no records given
             records = []
         
-        print(len(records), 'records to clean')
+        count = 0
         
         # Loop over all error records
         for record in records:
@@ -535,18 +758,27 @@ class Database(object):
             del(model[model_root]['error'])
             model[model_root]['status'] = 'not calculated'
             self.update_record(record=record, content=model.xml())
+            count += 1
+        
+        print(count, 'records cleaned')
         
-        # Remove bid files
-        for bidfile in run_directory.glob('*/*.bid'):
-            bidfile.unlink()
+        # Remove claim files
+        for claimfile in run_directory.glob(f'*/{FileClaim.filename}'):
+            claimfile.unlink()
         
         # Remove results.json files
         for resultsfile in run_directory.glob('*/results.json'):
             resultsfile.unlink()
     
-    def copy_records(self, dbase2, record_style=None, records=None, includetar=True, overwrite=False):
+    def copy_records(self, dbase2, record_style=None, records=None,
+                     includetar=True, overwrite=False, max_workers=4,
+                     batch_size=100, checkpoint=None):
         """
-        Copies records from one database to another.
+        Copies records from one database to another.  Records are copied in
+        batches, with new records added together using dbase2.add_records
+        and the updates and tar transfers of each batch spread across a pool
+        of threads.  Which records and tars already exist in dbase2 is
+        determined once upfront rather than by trying each operation.
         
         Parameters
         ----------
@@ -566,6 +798,16 @@ class Database(object):
         overwrite : bool, optional
             If False (default) only new records and tars will be copied.
             If True, all existing content will be updated.
+        max_workers : int, optional
+            The number of threads to use for updating records and
+            transferring tars.  (Default is 4).
+        batch_size : int, optional
+            The number of records to copy at a time.  (Default is 100).
+        checkpoint : path-like object, optional
+            A file for recording the names of the records that have been
+            copied.  If given, any records already listed in the file are
+            skipped, allowing an interrupted copy to be resumed by calling
+            copy_records again with the same checkpoint.
         """
         if record_style is None and records is None:
             # Prompt for record_style
@@ -575,49 +817,108 @@ class Database(object):
             if records is not None:
                 raise ValueError('record_style and records cannot both be given')
             
-            # Retrieve records from self
-            records = self.get_records(style=record_style) #pylint: disable=assignment-from-no-return
+            # Iterate over records from self
+            records = self.iget_records(style=record_style, batch_size=batch_size) #pylint: disable=assignment-from-no-return
         
         elif records is None:
             # Set empty list if record_style is still None and no records given
             records = []
         
-        print(len(records), 'records to try to copy')
+        # Read names of records copied by previous calls
+        done = set()
+        if checkpoint is not None:
+            checkpoint = Path(checkpoint)
+            if checkpoint.is_file():
+                with open(checkpoint) as f:
+                    done = set(f.read().split())
+        
+        # Names of existing records and tars, collected once per style
+        names = {}
+        def existing(style):
+            if style not in names:
+                names[style] = {'records': dbase2.get_record_names(style)}
+                if includetar:
+                    names[style]['tars'] = dbase2.get_tar_names(style)
+                    names[style]['source_tars'] = self.get_tar_names(style)
+            return names[style]
+        
+        def copy_tar(record, update):
+            tar = self.get_tar(record=record, raw=True, stream=True) #pylint: disable=assignment-from-no-return
+            try:
+                if update:
+                    dbase2.update_tar(record=record, tar=tar)
+                else:
+                    dbase2.add_tar(record=record, tar=tar)
+            finally:
+                tar.close()
         
         record_count = 0
         tar_count = 0
-        # Copy records
-        for record in records:
-            try:
-                # Add new records
-                dbase2.add_record(record=record)
-                record_count += 1
-            except:
-                # Update existing records
-                if overwrite:
-                    dbase2.update_record(record=record)
-                    record_count += 1
+        skip_count = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
             
-            # Copy archives
-            if includetar:
-                try:
-                    # get tar if it exists
-                    tar = self.get_tar(record=record, raw=True) #pylint: disable=assignment-from-no-return
-                except:
-                    pass
-                else:
-                    try:
-                        # Add new tar
-                        dbase2.add_tar(record=record, tar=tar)
-                        tar_count += 1
-                    except:
-                        # Update existing tar
-                        if overwrite:
-                            dbase2.update_tar(record=record, tar=tar)
-                            tar_count += 1
+            # Copy records in batches
+            batch = []
+            for record in chain(records, [None]):
+                if record is not None:
+                    if record.name in done:
+                        skip_count += 1
+                    else:
+                        batch.append(record)
+                    if len(batch) < batch_size:
+                        continue
+                if len(batch) == 0:
+                    continue
+                
+                # Add new records together and update existing ones
+                newrecords = []
+                updates = []
+                for record in batch:
+                    if record.name not in existing(record.style)['records']:
+                        newrecords.append(record)
+                    elif overwrite:
+                        updates.append(executor.submit(dbase2.update_record,
+                                                       record=record))
+                if len(newrecords) > 0:
+                    dbase2.add_records(newrecords, existing={
+                        record_style: existing(record_style)['records']
+                        for record_style in set(r.style for r in newrecords)})
+                
+                # Finish updates before the records' tars are replaced
+                for future in updates:
+                    future.result()
+                
+                # Copy archives
+                tars = []
+                if includetar:
+                    for record in batch:
+                        style_names = existing(record.style)
+                        if record.name not in style_names['source_tars']:
+                            continue
+                        if record.name not in style_names['tars']:
+                            tars.append(executor.submit(copy_tar, record, False))
+                            style_names['tars'].add(record.name)
+                        elif overwrite:
+                            tars.append(executor.submit(copy_tar, record, True))
+                
+                # Wait for the batch to finish, raising any errors
+                for future in tars:
+                    future.result()
+                record_count += len(newrecords) + len(updates)
+                tar_count += len(tars)
+                
+                # Record the finished batch
+                if checkpoint is not None:
+                    with open(checkpoint, 'a') as f:
+                        for record in batch:
+                            f.write(record.name + '\n')
+                batch = []
+        
         print(record_count, 'records added/updated')
         if includetar:
             print(tar_count, 'tars added/updated')
+        if skip_count > 0:
+            print(skip_count, 'records skipped as already copied')
     
     def destroy_records(self, record_style=None):
         """
@@ -632,13 +933,14 @@ class Database(object):
         if record_style is None:
             record_style = self.select_record_style()
         
-        records = self.get_records(style=record_style) #pylint: disable=assignment-from-no-return
-        print(f'{len(records)} records found for {record_style}')
-        if len(records) > 0:
+        # Count records using the flat table rather than loading the records
+        num_records = len(self.get_records_df(style=record_style, full=False, flat=True)) #pylint: disable=assignment-from-no-return
+        print(f'{num_records} records found for {record_style}')
+        if num_records > 0:
             test = screen_input('Delete records? (must type yes):')
             if test == 'yes':
                 count = 0
-                for record in records:
+                for record in self.iget_records(style=record_style): #pylint: disable=not-an-iterable
                     try:
                         self.delete_tar(record=record)
                     except:
@@ -721,7 +1023,9 @@ class Database(object):
         
         prepare(self, run_directory, calculation, **kwargs)
     
-    def runner(self, run_directory, orphan_directory=None, hold_directory=None):
+    def runner(self, run_directory, orphan_directory=None, hold_directory=None,
+               claim=None, lease=600, queue=None, warm_pool=False,
+               upload_backlog=2):
         # Check for run_directory first by name then by path
         try:
             run_directory = load_run_directory(run_directory)
@@ -730,4 +1034,6 @@ class Database(object):
             if not run_directory.is_dir():
                 raise ValueError('run_directory not found/set')
         
-        runner(self, run_directory, orphan_directory=None, hold_directory=None)
\ No newline at end of file
+        runner(self, run_directory, orphan_directory=orphan_directory,
+               hold_directory=hold_directory, claim=claim, lease=lease,
+               queue=queue, warm_pool=warm_pool, upload_backlog=upload_backlog)
\ No newline at end of file
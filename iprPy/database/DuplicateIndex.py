@@ -0,0 +1,173 @@
+# Standard Python libraries
+import numbers
+
+# http://www.numpy.org/
+import numpy as np
+
+# https://pandas.pydata.org/
+import pandas as pd
+
+class DuplicateIndex(object):
+    """
+    Index of record compare values used to identify duplicate calculations.
+    Records are grouped into buckets by hashing their exact-match compare
+    terms, and the float compare terms of each bucket are kept as an array
+    sorted by the first float term.  A candidate is then only compared
+    against the records in its own bucket that fall within the tolerance of
+    the first float term.
+    """
+
+    def __init__(self, dterms, fterms):
+        """
+        Initializes an empty index.
+
+        Parameters
+        ----------
+        dterms : list
+            The compare terms that are tested for exact matches.
+        fterms : dict
+            The compare terms (keys) that are tested using absolute
+            tolerances (values).
+        """
+        self.__dterms = list(dterms)
+        self.__fterms = list(fterms.keys())
+        self.__tols = np.array(list(fterms.values()), dtype=float)
+        self.__buckets = {}
+        self.names = set()
+
+    @property
+    def dterms(self):
+        """list: The compare terms tested for exact matches."""
+        return self.__dterms
+
+    @property
+    def fterms(self):
+        """list: The compare terms tested using tolerances."""
+        return self.__fterms
+
+    def __len__(self):
+        return len(self.names)
+
+    def _keys(self, df):
+        """Hashes the exact-match compare terms of each row."""
+        df = df.copy()
+        if 'a_mult' in self.dterms:
+            df['a_mult'] = df.a_mult2 - df.a_mult1
+        if 'b_mult' in self.dterms:
+            df['b_mult'] = df.b_mult2 - df.b_mult1
+        if 'c_mult' in self.dterms:
+            df['c_mult'] = df.c_mult2 - df.c_mult1
+
+        # Hash the normalized values so that the hashes do not depend on the
+        # column dtypes or on how the numbers are stored in object columns
+        dvalues = pd.DataFrame(index=df.index)
+        for term in self.dterms:
+            if term not in df:
+                dvalues[term] = normalize(np.nan)
+            else:
+                dvalues[term] = [normalize(value) for value in df[term]]
+        if len(self.dterms) == 0:
+            return np.zeros(len(df), dtype='uint64')
+        return pd.util.hash_pandas_object(dvalues, index=False).values
+
+    def _fvalues(self, df):
+        """Returns the float compare terms of each row as an array."""
+        fvalues = np.empty((len(df), len(self.fterms)))
+        for i, term in enumerate(self.fterms):
+            if term in df:
+                fvalues[:, i] = pd.to_numeric(df[term], errors='coerce')
+            else:
+                fvalues[:, i] = np.nan
+        return fvalues
+
+    def _add(self, key, fvalues):
+        """Adds float compare values to a bucket, keeping it sorted."""
+        bucket = self.__buckets.get(key)
+        if bucket is None:
+            bucket = np.empty((0, len(self.fterms)))
+        if len(self.fterms) == 0:
+            bucket = np.vstack([bucket, fvalues])
+        elif len(fvalues) == 1:
+            index = np.searchsorted(bucket[:, 0], fvalues[0, 0])
+            bucket = np.insert(bucket, index, fvalues[0], axis=0)
+        else:
+            bucket = np.vstack([bucket, fvalues])
+            bucket = bucket[np.argsort(bucket[:, 0], kind='stable')]
+        self.__buckets[key] = bucket
+
+    def add(self, df):
+        """
+        Adds records to the index.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            The todict(full=False, flat=True) rows of the records.
+        """
+        if len(df) == 0:
+            return
+        keys = self._keys(df)
+        fvalues = self._fvalues(df)
+        for key in np.unique(keys):
+            self._add(key, fvalues[keys == key])
+        if 'key' in df:
+            self.names.update(df.key)
+
+    def isduplicate(self, key, fvalues):
+        """Checks one row's values against its bucket."""
+        bucket = self.__buckets.get(key)
+        if bucket is None:
+            return False
+        if len(self.fterms) == 0:
+            return True
+
+        # Limit to the rows within the tolerance of the first fterm
+        lo = np.searchsorted(bucket[:, 0], fvalues[0] - self.__tols[0], side='left')
+        hi = np.searchsorted(bucket[:, 0], fvalues[0] + self.__tols[0], side='right')
+        if hi <= lo:
+            return False
+        close = np.abs(bucket[lo:hi] - fvalues) <= self.__tols
+        return bool(close.all(axis=1).any())
+
+    def new(self, df):
+        """
+        Identifies the rows that do not duplicate records in the index or
+        earlier rows, and adds those rows to the index.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            The todict(full=False, flat=True) rows of the candidate records.
+
+        Returns
+        -------
+        numpy.ndarray of bool
+            True for each row that is new.
+        """
+        isnew = np.zeros(len(df), dtype=bool)
+        if len(df) == 0:
+            return isnew
+        keys = self._keys(df)
+        fvalues = self._fvalues(df)
+        for i in range(len(df)):
+            if not self.isduplicate(keys[i], fvalues[i]):
+                isnew[i] = True
+                self._add(keys[i], fvalues[i:i+1])
+        if 'key' in df:
+            self.names.update(df.key[isnew])
+        return isnew
+
+def normalize(value):
+    """
+    Converts an exact-match compare value to a str that equals that of every
+    value comparing equal to it.  Numbers are converted to floats and all
+    missing values are the same.
+    """
+    if np.ndim(value) == 0 and pd.isna(value):
+        return 'nan'
+    elif isinstance(value, (numbers.Real, np.bool_)):
+        return f'float:{float(value)!r}'
+    elif isinstance(value, str):
+        return f'str:{value}'
+    else:
+        return f'{type(value).__name__}:{value!r}'
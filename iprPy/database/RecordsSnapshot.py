@@ -0,0 +1,318 @@
+# Standard Python libraries
+from pathlib import Path
+import json
+import time
+import uuid
+import os
+
+# https://pandas.pydata.org/
+import pandas as pd
+
+# https://arrow.apache.org/docs/python/
+try:
+    import pyarrow #pylint: disable=unused-import
+except ImportError:
+    has_pyarrow = False
+else:
+    has_pyarrow = True
+
+__all__ = ['RecordsSnapshot']
+
+class RecordsSnapshot(object):
+    """
+    Incremental snapshot of the todict rows of all records of one style.
+    Each row is stored with the change stamp of its record so that updating
+    the snapshot only requires the rows of new and changed records to be
+    built.  Each update is saved as a delta file holding only those rows and
+    the names of removed records, and the deltas are merged into the base
+    file once there are compact_after of them.
+
+    Files are saved as Parquet, which requires pyarrow, with the values of
+    object columns JSON-encoded.  Rows with values that JSON cannot
+    represent, such as atomman Systems, are built but not saved.  Snapshots
+    are only a cache: rows lost to concurrent compactions are rebuilt on the
+    next update as their stamps no longer match.
+    """
+
+    def __init__(self, directory, record_style, full=True, flat=False,
+                 compact_after=16):
+        """
+        Initializes the snapshot.
+
+        Parameters
+        ----------
+        directory : path-like object
+            The directory where the snapshot files are kept.
+        record_style : str
+            The record style of the snapshot.
+        full : bool, optional
+            The full value that the rows are built with.  (Default is True).
+        flat : bool, optional
+            The flat value that the rows are built with.  (Default is False).
+        compact_after : int, optional
+            The number of delta files that are merged into the base file.
+            (Default is 16).
+        """
+        self.__directory = Path(directory)
+        self.__record_style = record_style
+        self.__full = full
+        self.__flat = flat
+        self.__compact_after = compact_after
+
+    @property
+    def record_style(self):
+        """str: The record style of the snapshot."""
+        return self.__record_style
+
+    @property
+    def basename(self):
+        """str: The snapshot file name without extension."""
+        full = 'full' if self.__full else 'input'
+        flat = 'flat' if self.__flat else 'obj'
+        return f'{self.record_style}.{full}.{flat}'
+
+    @property
+    def path(self):
+        """pathlib.Path: The base snapshot file."""
+        return Path(self.__directory, f'{self.basename}.parquet')
+
+    def delta_paths(self):
+        """list of pathlib.Path: The delta files in the order saved."""
+        return sorted(self.__directory.glob(f'{self.basename}.delta.*.parquet'))
+
+    def load(self, deltas=None):
+        """
+        Reads the saved snapshot.
+
+        Parameters
+        ----------
+        deltas : list, optional
+            If given, the paths of the delta files that were read are
+            appended to it.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The saved rows indexed by record name, with the change stamps in
+            the '_stamp' column.  Empty if no snapshot has been saved.
+        """
+        df = pd.DataFrame(columns=['_stamp'])
+        if not has_pyarrow:
+            return df
+
+        base = read(self.path)
+        if base is not None:
+            df = base
+
+        for delta_path in self.delta_paths():
+            delta = read(delta_path)
+            if delta is None:
+                continue
+            if deltas is not None:
+                deltas.append(delta_path)
+            names = delta.index.union(delta.attrs.get('removed', []))
+            df = df.drop(index=names.intersection(df.index))
+            if len(delta) > 0:
+                df = pd.concat([df, delta], sort=False) if len(df) > 0 else delta
+
+        return df
+
+    def save(self, df, path):
+        """
+        Saves rows to a snapshot file, replacing any existing file.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            The rows indexed by record name, with the change stamps in the
+            '_stamp' column.
+        path : path-like object
+            The file to save to.
+
+        Returns
+        -------
+        bool
+            False if the rows could not be saved.
+        """
+        if not has_pyarrow:
+            return False
+        try:
+            df = encode(df)
+        except ValueError:
+            return False
+
+        if not self.__directory.is_dir():
+            self.__directory.mkdir(parents=True, exist_ok=True)
+
+        temp_path = Path(self.__directory, f'.{self.basename}.{uuid.uuid4()}')
+        try:
+            df.to_parquet(temp_path)
+            os.replace(temp_path, path)
+        except Exception:
+            if temp_path.is_file():
+                temp_path.unlink()
+            return False
+        return True
+
+    def update(self, stamps, loader):
+        """
+        Brings the snapshot up to date, building rows only for the records
+        that are new or whose change stamps differ.
+
+        Parameters
+        ----------
+        stamps : dict
+            The current change stamp of every record of the style, keyed by
+            record name.
+        loader : callable
+            Function that takes a list of record names and returns the
+            records.
+
+        Returns
+        -------
+        pandas.DataFrame
+            All rows indexed by record name, with the change stamps in the
+            '_stamp' column.
+        """
+        deltas = []
+        df = self.load(deltas)
+        stamps = {name: str(stamp) for name, stamp in stamps.items()}
+
+        # Compare stamps
+        oldstamps = df['_stamp'].to_dict()
+        changed = [name for name, stamp in stamps.items() if oldstamps.get(name) != stamp]
+        removed = [name for name in oldstamps if name not in stamps]
+        if len(changed) == 0 and len(removed) == 0:
+            return df
+
+        # Build rows for the new and changed records
+        newdf = self.build(changed, loader, stamps)
+
+        df = df.drop(index=set(changed + removed).intersection(df.index))
+        if len(newdf) > 0:
+            df = pd.concat([df, newdf], sort=False) if len(df) > 0 else newdf
+
+        # Save the first snapshot as the base file
+        if len(deltas) == 0 and not self.path.is_file():
+            self.save(df, self.path)
+            return df
+
+        # Save the changes as a delta listing the removed records
+        newdf.attrs['removed'] = removed
+        delta_path = Path(self.__directory,
+                          f'{self.basename}.delta.{time.time_ns():020d}.{uuid.uuid4().hex}.parquet')
+        if not self.save(newdf, delta_path):
+            return df
+
+        # Merge the deltas into the base file
+        deltas.append(delta_path)
+        if len(deltas) >= self.__compact_after and self.save(df, self.path):
+            for delta_path in deltas:
+                delta_path.unlink(missing_ok=True)
+
+        return df
+
+    def build(self, names, loader, stamps=None):
+        """
+        Builds the rows of records.
+
+        Parameters
+        ----------
+        names : list of str
+            The names of the records.
+        loader : callable
+            Function that takes a list of record names and returns the
+            records.
+        stamps : dict, optional
+            The change stamps to add to the rows, keyed by record name.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The rows indexed by record name.
+        """
+        rows = []
+        index = []
+        if len(names) > 0:
+            for record in loader(names):
+                row = record.todict(full=self.__full, flat=self.__flat)
+                if stamps is not None:
+                    row['_stamp'] = stamps[record.name]
+                rows.append(row)
+                index.append(record.name)
+        return pd.DataFrame(rows, index=pd.Index(index))
+
+    def select(self, df, names, loader):
+        """
+        Takes the rows of the named records from a snapshot.  Rows of records
+        that were added after the snapshot was updated are built with loader.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            The snapshot rows returned by update.
+        names : list of str
+            The names of the records.
+        loader : callable
+            Function that takes a list of record names and returns the
+            records.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The rows indexed by record name, without the change stamps.
+            Records that no longer exist are left out.
+        """
+        missing = [name for name in names if name not in df.index]
+        if len(missing) > 0:
+            newdf = self.build(missing, loader)
+            if len(newdf) > 0:
+                df = pd.concat([df, newdf], sort=False) if len(df) > 0 else newdf
+        names = [name for name in names if name in df.index]
+        return df.loc[names].drop(columns='_stamp', errors='ignore')
+
+def jsonable(value):
+    """bool: True if JSON represents value exactly."""
+    if value is None or type(value) in (bool, int, float, str):
+        return True
+    elif type(value) is list:
+        return all(jsonable(v) for v in value)
+    elif type(value) is dict:
+        return all(type(k) is str and jsonable(v) for k, v in value.items())
+    return False
+
+def encode(df):
+    """
+    JSON-encodes the object columns of rows, listing them in the 'json'
+    attribute.
+
+    Raises
+    ------
+    ValueError
+        If a value cannot be represented by JSON.
+    """
+    df = df.copy()
+    columns = []
+    for column in df.columns:
+        if df[column].dtype == object:
+            values = df[column].tolist()
+            if not all(jsonable(value) for value in values):
+                raise ValueError(f'{column} values cannot be JSON-encoded')
+            df[column] = [json.dumps(value) for value in values]
+            columns.append(column)
+    df.attrs['json'] = columns
+    return df
+
+def read(path):
+    """
+    Reads and decodes a snapshot file, returning None if it is missing or
+    unreadable.
+    """
+    try:
+        df = pd.read_parquet(path)
+        columns = df.attrs.pop('json')
+        for column in columns:
+            df[column] = [json.loads(value) for value in df[column]]
+    except Exception:
+        return None
+    return df
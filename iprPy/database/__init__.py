@@ -1,8 +1,10 @@
 """
 Attributes
 ----------
-loaded : dict
+loaded : iprPy.tools.LazyImport
     Dictionary of the derived classes
+content_cache : iprPy.database.ContentCache
+    The process-wide cache of parsed record content.
 databases_dict : dict
     Dictionary of the database styles that successfully loaded. The
     dictionary keys are the database style names, and the values are the
@@ -13,12 +15,17 @@ from ..tools import dynamic_import
 from .settings import *
 from .settings import __all__ as settings_all
 
+from .ContentCache import ContentCache, content_cache
 from .Database import Database
 
-ignorelist = ['Database', 'prepare', 'runner', 'settings', 'load_database']
+ignorelist = ['Database', 'prepare', 'runner', 'settings', 'load_database',
+              'claim', 'workqueue', 'workerpool', 'DuplicateIndex', 'ContentCache',
+              'dependencies', 'RecordsSnapshot', 'archive', 'retention', 'blobstore',
+              'uploader']
 loaded, failed = dynamic_import(__file__, __name__, ignorelist=ignorelist)
 
 from .load_database import load_database
 
-__all__ = settings_all + ['Database', 'load_database', 'failed', 'loaded']
+__all__ = settings_all + ['ContentCache', 'content_cache', 'Database',
+                          'load_database', 'failed', 'loaded']
 __all__.sort()
\ No newline at end of file
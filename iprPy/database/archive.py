@@ -0,0 +1,486 @@
+# Standard Python libraries
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import io
+import gzip
+import lzma
+import shutil
+import tarfile
+import tempfile
+import zlib
+
+# https://github.com/indygreg/python-zstandard
+try:
+    import zstandard
+except ImportError:
+    has_zstandard = False
+else:
+    has_zstandard = True
+
+__all__ = ['ArchiveCodec', 'write_archive', 'index_archive', 'open_archive',
+           'open_member', 'ArchiveMember']
+
+# Uncompressed size of the independently compressed blocks of an archive
+blocksize = 4194304
+
+class ArchiveCodec(object):
+    """
+    Compression format settings for record archives.  Archives are compressed
+    as a series of independent gzip members, xz streams or zstd frames, which
+    the standard tools for each format read as one stream.  The format of an
+    existing archive is detected from its leading bytes, so archives can be
+    read regardless of the codec settings of the database.
+    """
+
+    # Leading bytes of each format
+    magic = {'gzip': b'\x1f\x8b',
+             'xz': b'\xfd7zXZ\x00',
+             'zstd': b'\x28\xb5\x2f\xfd'}
+
+    # File name extension of the archives of each format
+    extensions = {'gzip': '.tar.gz',
+                  'xz': '.tar.xz',
+                  'zstd': '.tar.zst'}
+
+    # Default compression level of each format
+    default_level = {'gzip': 9,
+                     'xz': 6,
+                     'zstd': 3}
+
+    def __init__(self, name='gzip', level=None, threads=None):
+        """
+        Initializes the codec settings.
+
+        Parameters
+        ----------
+        name : str, optional
+            The compression format: 'gzip' (default), 'xz' or 'zstd'.  zstd
+            requires the zstandard package.
+        level : int, optional
+            The compression level, or preset for xz.  Default value depends
+            on the format: 9 for gzip, 6 for xz and 3 for zstd.
+        threads : int, optional
+            The number of blocks to compress at the same time when writing
+            archives.  Default value is 1.
+        """
+        if name not in self.magic:
+            raise ValueError(f'unknown archive codec {name}')
+        if name == 'zstd' and not has_zstandard:
+            raise ValueError('zstd archive codec requires the zstandard package')
+        self.__name = name
+
+        if level is None:
+            level = self.default_level[name]
+        self.__level = int(level)
+
+        if threads is None:
+            threads = 1
+        self.__threads = int(threads)
+        if self.__threads < 1:
+            raise ValueError('threads must be >= 1')
+
+    @property
+    def name(self):
+        """str: The compression format."""
+        return self.__name
+
+    @property
+    def level(self):
+        """int: The compression level."""
+        return self.__level
+
+    @property
+    def extension(self):
+        """str: The file name extension of archives in the format."""
+        return self.extensions[self.name]
+
+    @property
+    def threads(self):
+        """int: The number of blocks compressed at the same time."""
+        return self.__threads
+
+    @classmethod
+    def detect(cls, fileobj):
+        """
+        Identifies the compression format of an archive.
+
+        Parameters
+        ----------
+        fileobj : file-like object
+            The open binary archive, positioned at its start.  The position is
+            restored after reading the leading bytes.
+
+        Returns
+        -------
+        ArchiveCodec
+            A codec for the format with default settings.
+
+        Raises
+        ------
+        ValueError
+            If the format is not recognized.
+        """
+        start = fileobj.tell()
+        head = fileobj.read(6)
+        fileobj.seek(start)
+        for name, magic in cls.magic.items():
+            if head[:len(magic)] == magic:
+                return cls(name)
+        raise ValueError('unknown archive compression format')
+
+    def compress(self, data):
+        """
+        Compresses data into one complete gzip member, xz stream or zstd
+        frame.
+
+        Parameters
+        ----------
+        data : bytes
+            The data to compress.
+
+        Returns
+        -------
+        bytes
+            The compressed data.
+        """
+        if self.name == 'gzip':
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+            return compressor.compress(data) + compressor.flush()
+        elif self.name == 'xz':
+            return lzma.compress(data, format=lzma.FORMAT_XZ, preset=self.level)
+        elif self.name == 'zstd':
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def reader(self, fileobj):
+        """
+        Opens a decompressing stream that reads from the current position of
+        a compressed file through to its end.
+
+        Parameters
+        ----------
+        fileobj : file-like object
+            The open binary compressed file.
+
+        Returns
+        -------
+        file-like object
+            The decompressed stream.
+        """
+        if self.name == 'gzip':
+            return gzip.GzipFile(fileobj=fileobj, mode='rb')
+        elif self.name == 'xz':
+            return lzma.LZMAFile(fileobj, mode='rb')
+        elif self.name == 'zstd':
+            return zstandard.ZstdDecompressor().stream_reader(fileobj,
+                                                              read_across_frames=True,
+                                                              closefd=False)
+
+class _BlockWriter(object):
+    """
+    Write-only file-like object that compresses what is written to it in
+    independent blocks, using a pool of threads if the codec allows it.
+    """
+
+    def __init__(self, fileobj, codec):
+        self.fileobj = fileobj
+        self.codec = codec
+        self.start = fileobj.tell()
+        self.offset = 0
+        self.buffer = []
+        self.buffersize = 0
+        self.blocks = []
+        self.pending = deque()
+        if codec.threads > 1:
+            self.executor = ThreadPoolExecutor(codec.threads)
+        else:
+            self.executor = None
+
+    def tell(self):
+        return self.offset
+
+    def write(self, data):
+        n = len(data)
+        self.buffer.append(bytes(data))
+        self.buffersize += n
+        self.offset += n
+        while self.buffersize >= blocksize:
+            data = b''.join(self.buffer)
+            self.buffer = [data[blocksize:]]
+            self.buffersize = len(data) - blocksize
+            self.submit(data[:blocksize])
+        return n
+
+    def submit(self, data):
+        """Compresses a block, keeping at most 2*threads blocks in memory."""
+        offset = self.offset - self.buffersize - len(data)
+        if self.executor is None:
+            self.save(offset, self.codec.compress(data))
+        else:
+            self.pending.append((offset, self.executor.submit(self.codec.compress, data)))
+            while len(self.pending) > 2 * self.codec.threads:
+                offset, future = self.pending.popleft()
+                self.save(offset, future.result())
+
+    def save(self, offset, compressed):
+        """Writes a compressed block and notes its offsets."""
+        self.blocks.append([self.fileobj.tell() - self.start, offset])
+        self.fileobj.write(compressed)
+
+    def close(self):
+        if self.buffersize > 0 or len(self.blocks) + len(self.pending) == 0:
+            data = b''.join(self.buffer)
+            self.buffer = []
+            self.buffersize = 0
+            self.submit(data)
+        while len(self.pending) > 0:
+            offset, future = self.pending.popleft()
+            self.save(offset, future.result())
+        if self.executor is not None:
+            self.executor.shutdown()
+
+class _IndexingTarFile(tarfile.TarFile):
+    """TarFile that notes where the data of each added file starts."""
+
+    def addfile(self, tarinfo, fileobj=None, **kwargs):
+        super().addfile(tarinfo, fileobj, **kwargs)
+        tarinfo = self.members[-1]
+        if tarinfo.isfile():
+            blocks = -(-tarinfo.size // tarfile.BLOCKSIZE)
+        else:
+            blocks = 0
+        tarinfo.offset_data = self.offset - blocks * tarfile.BLOCKSIZE
+
+def write_archive(fileobj, target, arcname=None, codec=None):
+    """
+    Writes a directory to a compressed tar archive that can be read one
+    member at a time.  The tar stream is compressed in independent blocks of
+    blocksize bytes as it is written, and the returned member index gives the
+    block where each file's data can be decompressed from without
+    decompressing what comes before it.
+
+    Parameters
+    ----------
+    fileobj : file-like object
+        The open binary file to write the archive to.
+    target : path-like object
+        The directory (or file) to archive.
+    arcname : str, optional
+        The name of target in the archive.  Default value is the name of
+        target.
+    codec : ArchiveCodec, optional
+        The compression settings.  Default value is gzip at level 9.
+
+    Returns
+    -------
+    dict
+        The member index of the archive.
+    """
+    target = Path(target)
+    if arcname is None:
+        arcname = target.name
+    if codec is None:
+        codec = ArchiveCodec()
+
+    writer = _BlockWriter(fileobj, codec)
+    try:
+        with _IndexingTarFile(fileobj=writer, mode='w') as tar:
+            tar.add(target, arcname)
+            tarinfos = tar.getmembers()
+    finally:
+        writer.close()
+
+    return build_index(tarinfos, writer.blocks, codec)
+
+def index_archive(fileobj):
+    """
+    Builds the member index of an existing compressed tar archive by reading
+    it through once.  Archives not written by write_archive are treated as a
+    single block, so reading a member still requires decompressing the
+    archive up to that member, but not extracting anything else.
+
+    Parameters
+    ----------
+    fileobj : file-like object
+        The open binary archive file, positioned at its start.
+
+    Returns
+    -------
+    dict
+        The member index of the archive.
+    """
+    codec = ArchiveCodec.detect(fileobj)
+    with codec.reader(fileobj) as stream:
+        with tarfile.open(fileobj=stream, mode='r|') as tar:
+            tarinfos = [tarinfo for tarinfo in tar]
+    return build_index(tarinfos, [[0, 0]], codec)
+
+def build_index(tarinfos, blocks, codec):
+    """
+    Builds a member index from the tar members and compressed blocks.
+
+    Parameters
+    ----------
+    tarinfos : list of tarfile.TarInfo
+        The members of the tar.
+    blocks : list of list of int
+        The compressed and uncompressed starting offsets of each block.
+    codec : ArchiveCodec
+        The codec the archive is compressed with.
+
+    Returns
+    -------
+    dict
+        The member index, with the 'codec' name, the 'blocks' and the
+        'members' which gives the uncompressed data offset and size of each
+        regular file.
+    """
+    members = {}
+    for tarinfo in tarinfos:
+        if tarinfo.isfile():
+            members[tarinfo.name] = [tarinfo.offset_data, tarinfo.size]
+    return {'codec': codec.name, 'blocks': blocks, 'members': members}
+
+def open_archive(archive):
+    """
+    Opens a compressed tar archive of any supported format for reading.
+
+    Parameters
+    ----------
+    archive : path-like object or file-like object
+        The archive file path or open binary file.
+
+    Returns
+    -------
+    tarfile.TarFile
+        The open archive.
+    """
+    if hasattr(archive, 'read'):
+        fileobj = archive
+    else:
+        fileobj = open(archive, 'rb')
+
+    try:
+        codec = ArchiveCodec.detect(fileobj)
+
+        # tarfile handles gzip and xz itself
+        if codec.name != 'zstd':
+            if fileobj is archive:
+                return tarfile.open(fileobj=fileobj)
+            return tarfile.open(archive)
+
+        # Decompress zstd to a temporary file to allow random access
+        temp = tempfile.TemporaryFile()
+        with codec.reader(fileobj) as stream:
+            shutil.copyfileobj(stream, temp)
+        temp.seek(0)
+        tar = tarfile.open(fileobj=temp)
+        tar._extfileobj = False
+        return tar
+
+    finally:
+        if fileobj is not archive:
+            fileobj.close()
+
+def open_member(fileobj, index, path, closefd=False):
+    """
+    Opens one file of an archive for reading.
+
+    Parameters
+    ----------
+    fileobj : file-like object
+        The open binary archive file.  It must be seekable and remain open
+        while the member is read.
+    index : dict
+        The member index of the archive.
+    path : str
+        The path of the file in the archive.
+    closefd : bool, optional
+        If True, fileobj is closed when the returned member is closed.
+        Default value is False.
+
+    Returns
+    -------
+    io.BufferedReader
+        The file's content.
+
+    Raises
+    ------
+    KeyError
+        If the archive has no regular file with the path.
+    """
+    try:
+        offset, size = index['members'][str(path)]
+    except KeyError:
+        raise KeyError(f'{path} not found in archive')
+
+    # Find the last block starting at or before the data
+    block = index['blocks'][0]
+    for b in index['blocks']:
+        if b[1] > offset:
+            break
+        block = b
+
+    codec = ArchiveCodec(index.get('codec', 'gzip'))
+    return io.BufferedReader(ArchiveMember(fileobj, codec, block[0],
+                                           offset - block[1], size,
+                                           closefd=closefd))
+
+class ArchiveMember(io.RawIOBase):
+    """
+    Read-only stream of one file's data in a compressed tar archive,
+    decompressed starting from one of the archive's blocks.
+    """
+
+    def __init__(self, fileobj, codec, start, skip, size, closefd=False):
+        """
+        Parameters
+        ----------
+        fileobj : file-like object
+            The open binary archive file.
+        codec : ArchiveCodec
+            The codec of the archive.
+        start : int
+            The archive offset of the block to start decompressing at.
+        skip : int
+            The number of decompressed bytes before the file's data.
+        size : int
+            The size of the file's data.
+        closefd : bool, optional
+            If True, fileobj is closed with the member.  Default value is
+            False.
+        """
+        self.__fileobj = fileobj
+        self.__closefd = closefd
+        self.__fileobj.seek(start)
+        self.__stream = codec.reader(fileobj)
+        self.__skip = skip
+        self.__remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        # Skip over the data before the member
+        while self.__skip > 0:
+            skipped = len(self.__stream.read(min(self.__skip, blocksize)))
+            if skipped == 0:
+                raise EOFError('archive ended before the member data')
+            self.__skip -= skipped
+
+        if self.__remaining == 0:
+            return 0
+        data = self.__stream.read(min(len(b), self.__remaining))
+        if len(data) == 0:
+            raise EOFError('archive ended before the end of the member data')
+        n = len(data)
+        b[:n] = data
+        self.__remaining -= n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self.__stream.close()
+            if self.__closefd:
+                self.__fileobj.close()
+        super().close()
@@ -0,0 +1,359 @@
+# Standard Python libraries
+from pathlib import Path
+import hashlib
+import io
+import json
+import os
+import tarfile
+import tempfile
+import time
+
+# iprPy imports
+from .archive import ArchiveCodec, _BlockWriter, open_archive
+
+__all__ = ['BlobStore', 'load_manifest']
+
+# Size of the chunks that archived files are split into
+chunksize = 1048576
+
+# Identifies manifest files
+manifest_format = 'iprPy-blob-manifest'
+
+# TarInfo attributes saved in manifests
+tarinfo_keys = ['name', 'mode', 'uid', 'gid', 'size', 'mtime', 'linkname',
+                'uname', 'gname']
+
+def load_manifest(fileobj):
+    """
+    Reads a manifest from an open binary file.
+
+    Raises
+    ------
+    ValueError
+        If the content is not a blob manifest.
+    """
+    manifest = json.loads(fileobj.read().decode('UTF-8'))
+    if manifest.get('format') != manifest_format:
+        raise ValueError('not a blob manifest')
+    return manifest
+
+class BlobStore(object):
+    """
+    Content-addressed storage for the files of record archives.  Files are
+    split into chunks that are stored once under the sha256 of their
+    content, and each archive is replaced by a manifest that lists its tar
+    members and the chunks of each file.  Chunks are compressed with the
+    database's archive codec.  Subclasses define where chunks are kept.
+    """
+
+    def __init__(self, codec=None):
+        """
+        Initializes the store.
+
+        Parameters
+        ----------
+        codec : iprPy.database.archive.ArchiveCodec, optional
+            The compression of new chunks and of rebuilt archives.  Default
+            value is gzip at level 9.
+        """
+        if codec is None:
+            codec = ArchiveCodec()
+        self.__codec = codec
+
+    @property
+    def codec(self):
+        """iprPy.database.archive.ArchiveCodec: The compression of chunks."""
+        return self.__codec
+
+    def has(self, blob):
+        """Checks if a chunk is stored."""
+        raise AttributeError('has not defined for BlobStore style')
+
+    def _touch(self, blob):
+        """
+        Updates the storage time of a chunk, returning False if it is not
+        stored.
+        """
+        raise AttributeError('_touch not defined for BlobStore style')
+
+    def _put(self, blob, data):
+        """Stores the compressed data of a chunk."""
+        raise AttributeError('_put not defined for BlobStore style')
+
+    def _get(self, blob):
+        """Returns the compressed data of a chunk."""
+        raise AttributeError('_get not defined for BlobStore style')
+
+    def _delete(self, blob):
+        """Deletes a chunk."""
+        raise AttributeError('_delete not defined for BlobStore style')
+
+    def _iter_blobs(self):
+        """Yields the hash and last storage time in seconds of every chunk."""
+        raise AttributeError('_iter_blobs not defined for BlobStore style')
+
+    def put(self, data):
+        """
+        Stores a chunk if it is not already stored.  The storage time of
+        already stored chunks is updated so that prune does not delete them
+        before the manifest that reuses them is saved.
+
+        Parameters
+        ----------
+        data : bytes
+            The chunk content.
+
+        Returns
+        -------
+        str
+            The sha256 hex digest of the content.
+        """
+        blob = hashlib.sha256(data).hexdigest()
+        if not self._touch(blob):
+            self._put(blob, self.codec.compress(data))
+        return blob
+
+    def get(self, blob):
+        """
+        Retrieves a chunk.
+
+        Parameters
+        ----------
+        blob : str
+            The sha256 hex digest of the content.
+
+        Returns
+        -------
+        bytes
+            The chunk content.
+        """
+        fileobj = io.BytesIO(self._get(blob))
+        with ArchiveCodec.detect(fileobj).reader(fileobj) as stream:
+            return stream.read()
+
+    def add_fileobj(self, fileobj):
+        """Stores the content of an open binary file, returning its chunks."""
+        blobs = []
+        for data in iter(lambda: fileobj.read(chunksize), b''):
+            blobs.append(self.put(data))
+        return blobs
+
+    def add_directory(self, target, arcname=None):
+        """
+        Stores the files of a directory.
+
+        Parameters
+        ----------
+        target : path-like object
+            The directory (or file) to store.
+        arcname : str, optional
+            The name of target in the archive.  Default value is the name of
+            target.
+
+        Returns
+        -------
+        dict
+            The manifest of the archive.
+        """
+        target = Path(target)
+        if arcname is None:
+            arcname = target.name
+
+        members = []
+
+        # Use TarFile only to build the TarInfo of each path as tar.add does
+        with tarfile.open(fileobj=io.BytesIO(), mode='w') as tar:
+            def add(path, name):
+                tarinfo = tar.gettarinfo(path, name)
+                if tarinfo is None:
+                    return
+                blobs = []
+                if tarinfo.isreg():
+                    with open(path, 'rb') as f:
+                        blobs = self.add_fileobj(f)
+                members.append(manifest_entry(tarinfo, blobs))
+                if tarinfo.isdir():
+                    for child in sorted(os.listdir(path)):
+                        add(Path(path, child), f'{name}/{child}')
+            add(target, arcname)
+
+        return {'format': manifest_format, 'members': members}
+
+    def add_tar(self, tar):
+        """
+        Stores the files of an existing tar archive.
+
+        Parameters
+        ----------
+        tar : bytes or file-like object
+            The content of a compressed tar archive of any supported format,
+            or an open binary file-like object to read it from.
+
+        Returns
+        -------
+        dict
+            The manifest of the archive.
+        """
+        if not hasattr(tar, 'read'):
+            tar = io.BytesIO(tar)
+
+        members = []
+        with open_archive(tar) as archive:
+            for tarinfo in archive:
+                blobs = []
+                if tarinfo.isreg():
+                    with archive.extractfile(tarinfo) as f:
+                        blobs = self.add_fileobj(f)
+                members.append(manifest_entry(tarinfo, blobs))
+
+        return {'format': manifest_format, 'members': members}
+
+    def write_tar(self, manifest, fileobj, compress=True):
+        """
+        Rebuilds the tar archive of a manifest.
+
+        Parameters
+        ----------
+        manifest : dict
+            The manifest of the archive.
+        fileobj : file-like object
+            The open binary file to write the archive to.
+        compress : bool, optional
+            If True (default), the archive is compressed with the codec.
+            If False, an uncompressed tar is written.
+        """
+        if compress:
+            writer = _BlockWriter(fileobj, self.codec)
+        else:
+            writer = fileobj
+        try:
+            with tarfile.open(fileobj=writer, mode='w') as tar:
+                for entry in manifest['members']:
+                    tarinfo = tarfile.TarInfo()
+                    for key in tarinfo_keys:
+                        setattr(tarinfo, key, entry[key])
+                    tarinfo.type = entry['type'].encode('ascii')
+                    if tarinfo.isreg():
+                        with self.open(entry['blobs']) as f:
+                            tar.addfile(tarinfo, f)
+                    else:
+                        tar.addfile(tarinfo)
+        finally:
+            if compress:
+                writer.close()
+
+    def open_tar(self, manifest):
+        """
+        Rebuilds the tar archive of a manifest in a temporary file and opens
+        it.
+
+        Returns
+        -------
+        tarfile.TarFile
+            The open archive.
+        """
+        temp = tempfile.TemporaryFile()
+        self.write_tar(manifest, temp, compress=False)
+        temp.seek(0)
+        tar = tarfile.open(fileobj=temp)
+        tar._extfileobj = False
+        return tar
+
+    def open(self, blobs):
+        """
+        Opens the content of a file stored as the given chunks.
+
+        Returns
+        -------
+        io.BufferedReader
+            The file's content.
+        """
+        return io.BufferedReader(BlobReader(self, blobs), buffer_size=chunksize)
+
+    def open_member(self, manifest, path):
+        """
+        Opens one file of a manifest's archive.
+
+        Parameters
+        ----------
+        manifest : dict
+            The manifest of the archive.
+        path : str
+            The path of the file in the archive.
+
+        Returns
+        -------
+        io.BufferedReader
+            The file's content.
+
+        Raises
+        ------
+        KeyError
+            If the archive has no regular file with the path.
+        """
+        for entry in manifest['members']:
+            if (entry['name'] == str(path) and
+                entry['type'].encode('ascii') in tarfile.REGULAR_TYPES):
+                return self.open(entry['blobs'])
+        raise KeyError(f'{path} not found in archive')
+
+    def prune(self, manifests, grace=3600):
+        """
+        Deletes the chunks that no manifest refers to.
+
+        Parameters
+        ----------
+        manifests : iterable of dict
+            All manifests that use the store.
+        grace : float, optional
+            Chunks stored or reused less than this many seconds ago are
+            kept, as they may belong to an archive that is being added.  Default value is
+            3600.
+
+        Returns
+        -------
+        int
+            The number of chunks deleted.
+        """
+        referenced = set()
+        for manifest in manifests:
+            for entry in manifest['members']:
+                referenced.update(entry.get('blobs', []))
+
+        cutoff = time.time() - grace
+        count = 0
+        for blob, stored in list(self._iter_blobs()):
+            if blob not in referenced and stored < cutoff:
+                self._delete(blob)
+                count += 1
+        return count
+
+def manifest_entry(tarinfo, blobs):
+    """Builds the manifest entry of a tar member."""
+    entry = {key: getattr(tarinfo, key) for key in tarinfo_keys}
+    entry['type'] = tarinfo.type.decode('ascii')
+    entry['blobs'] = blobs
+    return entry
+
+class BlobReader(io.RawIOBase):
+    """Read-only stream of a file stored as a series of chunks."""
+
+    def __init__(self, store, blobs):
+        self.__store = store
+        self.__blobs = list(blobs)
+        self.__data = b''
+        self.__pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self.__pos == len(self.__data):
+            if len(self.__blobs) == 0:
+                return 0
+            self.__data = self.__store.get(self.__blobs.pop(0))
+            self.__pos = 0
+        n = min(len(b), len(self.__data) - self.__pos)
+        b[:n] = self.__data[self.__pos:self.__pos + n]
+        self.__pos += n
+        return n
@@ -0,0 +1,367 @@
+# Standard Python libraries
+import os
+import socket
+import time
+import datetime
+import uuid
+
+__all__ = ['Claim', 'FileClaim', 'MongoClaim', 'load_claim']
+
+class Claim(object):
+    """
+    Base class for the atomic claims runners place on calculations.  A claim
+    is held by a single owner, and a claim that is not renewed within the
+    lease time is treated as abandoned by a crashed runner and can be taken
+    over by another runner.
+    """
+
+    def __init__(self, lease=600):
+        """
+        Initializes a claim manager.
+
+        Parameters
+        ----------
+        lease : float, optional
+            The number of seconds a claim remains valid without being renewed.
+            (Default is 600).
+        """
+        self.__lease = float(lease)
+        self.__owner = f'{socket.gethostname()} {os.getpid()} {time.time()} {uuid.uuid4().hex}'
+
+    @property
+    def lease(self):
+        """float: The number of seconds a claim is valid without renewal."""
+        return self.__lease
+
+    @property
+    def owner(self):
+        """str: The host, pid, start time and a unique id of the claim owner."""
+        return self.__owner
+
+    def acquire(self, sim):
+        """
+        Attempts to claim a calculation.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+
+        Returns
+        -------
+        bool
+            True if the claim was placed, False if the calculation is already
+            claimed by another owner.
+        """
+        raise AttributeError('acquire not defined for Claim style')
+
+    def renew(self, sim):
+        """
+        Extends the lease on a held claim.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        raise AttributeError('renew not defined for Claim style')
+
+    def release(self, sim):
+        """
+        Releases a held claim.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        raise AttributeError('release not defined for Claim style')
+
+    def done(self, sim):
+        """
+        Releases the claim on a calculation that has been finished or
+        removed.  Same as release unless overridden.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        self.release(sim)
+
+class FileClaim(Claim):
+    """
+    Claims calculations by exclusively creating a claim file in the
+    calculation instance directory.  The claim file contains the owner
+    information, and its modification time is used for the lease.
+    """
+
+    filename = 'runner.claim'
+
+    def acquire(self, sim):
+        """
+        Attempts to claim a calculation.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+
+        Returns
+        -------
+        bool
+            True if the claim was placed, False if the calculation is already
+            claimed by another owner.
+        """
+        claim_file = os.path.join(sim, self.filename)
+
+        for tries in range(2):
+            try:
+                fd = os.open(claim_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if tries > 0:
+                    return False
+                
+                # Take over abandoned claims by renaming them away first
+                info = self.read(claim_file)
+                if info is None or not self.abandoned(info):
+                    return False
+                stale_file = f'{claim_file}.{uuid.uuid4().hex}.stale'
+                try:
+                    os.rename(claim_file, stale_file)
+                except OSError:
+                    return False
+                
+                # Another runner may have taken the claim over between the
+                # check and the rename, in which case the renamed file is its
+                # new claim.  Put it back without replacing any newer claim
+                if self.read(stale_file) != info:
+                    try:
+                        os.link(stale_file, claim_file)
+                    except OSError:
+                        pass
+                    os.remove(stale_file)
+                    return False
+                os.remove(stale_file)
+                continue
+            except OSError:
+                # sim was removed or is not a directory
+                return False
+            else:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(self.owner)
+                return True
+        return False
+
+    def read(self, claim_file):
+        """
+        Reads the identity of a claim file.
+
+        Parameters
+        ----------
+        claim_file : str
+            The path to the claim file.
+
+        Returns
+        -------
+        tuple or None
+            The owner, inode and modification time in ns of the claim file,
+            or None if it does not exist.
+        """
+        try:
+            with open(claim_file) as f:
+                stat = os.fstat(f.fileno())
+                owner = f.read()
+        except OSError:
+            return None
+        return owner, stat.st_ino, stat.st_mtime_ns
+
+    def abandoned(self, info):
+        """
+        Checks if a claim has been abandoned from its identity.  A claim is
+        abandoned if its lease has run out, or if it was placed by a process
+        on this host that is no longer running.
+
+        Parameters
+        ----------
+        info : tuple
+            The claim file identity returned by read.
+
+        Returns
+        -------
+        bool
+            True if the claim is abandoned.
+        """
+        owner, ino, mtime = info
+        owner = owner.split()
+
+        if time.time() - mtime / 1e9 > self.lease:
+            return True
+
+        # Signal 0 only checks that a process exists on posix systems
+        if os.name == 'posix' and len(owner) > 1 and owner[0] == socket.gethostname():
+            try:
+                os.kill(int(owner[1]), 0)
+            except ProcessLookupError:
+                return True
+            except (OSError, ValueError):
+                pass
+
+        return False
+
+    def held(self, sim):
+        """bool: True if the claim file for sim belongs to this owner."""
+        try:
+            with open(os.path.join(sim, self.filename)) as f:
+                return f.read() == self.owner
+        except OSError:
+            return False
+
+    def renew(self, sim):
+        """
+        Extends the lease on a held claim by updating the claim file's
+        modification time.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        if self.held(sim):
+            os.utime(os.path.join(sim, self.filename))
+
+    def release(self, sim):
+        """
+        Releases a held claim by deleting the claim file.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        if self.held(sim):
+            try:
+                os.remove(os.path.join(sim, self.filename))
+            except OSError:
+                pass
+
+class MongoClaim(Claim):
+    """
+    Claims calculations by atomically upserting a document in a Mongo
+    collection.  Useful when the run directory is on a shared filesystem
+    where file operations are slow.
+    """
+
+    def __init__(self, mongodb, lease=600, collection='runner_claims'):
+        """
+        Initializes a claim manager.
+
+        Parameters
+        ----------
+        mongodb : pymongo.database.Database
+            The Mongo database to store the claims in.
+        lease : float, optional
+            The number of seconds a claim remains valid without being renewed.
+            (Default is 600).
+        collection : str, optional
+            The name of the collection to store the claims in.  (Default is
+            'runner_claims').
+        """
+        super().__init__(lease=lease)
+        self.__collection = mongodb[collection]
+
+    @property
+    def collection(self):
+        """pymongo.collection.Collection: The claims collection."""
+        return self.__collection
+
+    def expires(self):
+        """datetime.datetime: The expiration time for a new or renewed claim."""
+        return datetime.datetime.utcnow() + datetime.timedelta(seconds=self.lease)
+
+    def acquire(self, sim):
+        """
+        Attempts to claim a calculation.  The claim document is only updated
+        if it is missing or expired, otherwise the upsert fails on the
+        existing document.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+
+        Returns
+        -------
+        bool
+            True if the claim was placed, False if the calculation is already
+            claimed by another owner.
+        """
+        # https://api.mongodb.com/python/current/
+        from pymongo.errors import DuplicateKeyError
+
+        key = os.path.basename(sim)
+        try:
+            self.collection.find_one_and_update(
+                {'_id': key, 'expires': {'$lt': datetime.datetime.utcnow()}},
+                {'$set': {'owner': self.owner, 'expires': self.expires()}},
+                upsert=True)
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def renew(self, sim):
+        """
+        Extends the lease on a held claim.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        key = os.path.basename(sim)
+        self.collection.update_one({'_id': key, 'owner': self.owner},
+                                   {'$set': {'expires': self.expires()}})
+
+    def release(self, sim):
+        """
+        Releases a held claim.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        key = os.path.basename(sim)
+        self.collection.delete_one({'_id': key, 'owner': self.owner})
+
+def load_claim(dbase, claim=None, lease=600):
+    """
+    Builds the claim manager for a runner.
+
+    Parameters
+    ----------
+    dbase : iprPy.Database
+        The database the runner interacts with.
+    claim : str or Claim, optional
+        The claim style to use: 'file' (default) places claim files in the
+        calculation directories, and 'mongo' stores the claims in the Mongo
+        database dbase.  A Claim object can also be given directly.
+    lease : float, optional
+        The number of seconds a claim remains valid without being renewed.
+        (Default is 600).
+
+    Returns
+    -------
+    Claim
+        The claim manager.
+    """
+    if isinstance(claim, Claim):
+        return claim
+    elif claim is None or claim == 'file':
+        return FileClaim(lease=lease)
+    elif claim == 'mongo':
+        if dbase.style != 'mongo':
+            raise ValueError('mongo claims require a mongo database')
+        return MongoClaim(dbase.mongodb, lease=lease)
+    else:
+        raise ValueError(f'Unknown claim style {claim}')
@@ -0,0 +1,158 @@
+# Standard Python libraries
+from pathlib import Path
+import os
+import json
+import uuid
+
+__all__ = ['Dependencies']
+
+class Dependencies(object):
+    """
+    Dependency graph of the calculations prepared in a run directory, stored
+    in a dependencies.json file.  For each calculation, the file lists the
+    parent calculations that were still waiting to be run in the run
+    directory when the calculation was prepared.  A parent is finished once
+    its calculation directory is gone, so the runners only claim
+    calculations whose parent directories have all been removed, and claim
+    the calculations with the longest chains of waiting children first.
+    """
+
+    filename = 'dependencies.json'
+
+    def __init__(self, run_directory):
+        """
+        Initializes the graph for a run directory.  The file is only read
+        when needed.
+
+        Parameters
+        ----------
+        run_directory : path-like object
+            The run directory the calculations are prepared in.
+        """
+        self.__run_directory = Path(run_directory)
+        self.__parents = {}
+        self.__mtime = None
+
+    @property
+    def run_directory(self):
+        """pathlib.Path: The run directory."""
+        return self.__run_directory
+
+    @property
+    def path(self):
+        """pathlib.Path: The path to the dependencies file."""
+        return Path(self.run_directory, self.filename)
+
+    @property
+    def parents(self):
+        """dict: The list of waiting parents for each calculation."""
+        self.load()
+        return self.__parents
+
+    def load(self):
+        """Reads the dependencies file if it changed since the last read."""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self.__parents = {}
+            self.__mtime = None
+            return
+        if mtime != self.__mtime:
+            with open(self.path) as f:
+                self.__parents = json.load(f)
+            self.__mtime = mtime
+
+    def add(self, items):
+        """
+        Adds calculations to the graph.  Only parents with a calculation
+        directory in the run directory are kept, and calculations whose
+        directories have since been removed are dropped.  The file is replaced
+        atomically, but multiple prepares should not add to the same run
+        directory at the same time.
+
+        Parameters
+        ----------
+        items : list of tuple
+            Each item is (name, parents), where name is the calculation's name
+            and parents is a list of the names of records the calculation
+            depends on.
+        """
+        pending = self.pending()
+        parents = {}
+        for name, calc_parents in self.parents.items():
+            if name in pending:
+                parents[name] = [p for p in calc_parents if p in pending]
+        for name, calc_parents in items:
+            parents[name] = [p for p in calc_parents if p in pending]
+        parents = {name: p for name, p in parents.items() if len(p) > 0}
+
+        tempname = Path(self.run_directory, f'.{self.filename}.{uuid.uuid4()}')
+        with open(tempname, 'w') as f:
+            json.dump(parents, f)
+        os.replace(tempname, self.path)
+
+    def pending(self):
+        """
+        Lists the calculations that have not finished, i.e. those with a
+        calculation directory in the run directory.
+
+        Returns
+        -------
+        set of str
+            The calculation names.
+        """
+        pending = set()
+        with os.scandir(self.run_directory) as entries:
+            for entry in entries:
+                if entry.name[0] != '.' and entry.is_dir():
+                    pending.add(entry.name)
+        return pending
+
+    def order(self, names, pending=None):
+        """
+        Filters calculations down to the ones whose parents have finished,
+        and sorts them so that the calculations with the longest chains of
+        waiting children come first.  The order of the given names is kept
+        between calculations with equal chain lengths.
+
+        Parameters
+        ----------
+        names : list of str
+            The calculation names to order.
+        pending : set of str, optional
+            The unfinished calculations.  If not given, the run directory is
+            listed.
+
+        Returns
+        -------
+        list of str
+            The ready calculations in run order.
+        """
+        parents = self.parents
+        if len(parents) == 0:
+            return list(names)
+        if pending is None:
+            pending = self.pending()
+
+        # Build children of each pending parent
+        children = {}
+        for name, calc_parents in parents.items():
+            if name in pending:
+                for parent in calc_parents:
+                    if parent in pending:
+                        children.setdefault(parent, []).append(name)
+
+        # Find the length of the longest chain below each calculation
+        depths = {}
+        def depth(name):
+            if name not in depths:
+                depths[name] = 0
+                depths[name] = 1 + max([depth(child) for child in children.get(name, [])],
+                                       default=-1)
+            return depths[name]
+
+        ready = []
+        for name in names:
+            if all(parent not in pending for parent in parents.get(name, [])):
+                ready.append(name)
+        return sorted(ready, key=depth, reverse=True)
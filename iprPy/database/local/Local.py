@@ -1,7 +1,10 @@
 # Standard Python libraries
 from pathlib import Path
+import os
+import uuid
 import shutil
-import tarfile
+import json
+import tempfile
 
 # http://www.numpy.org/
 import numpy as np
@@ -11,13 +14,22 @@ import pandas as pd
 
 # iprPy imports
 from ...tools import aslist, iaslist
+from ...input import boolean
 from .. import Database
+from ..ContentCache import content_cache
 from ... import load_record
 from ...record import loaded as record_styles
+from .LocalIndex import LocalIndex
+from ..RecordsSnapshot import RecordsSnapshot
+from ..archive import (ArchiveCodec, write_archive, index_archive,
+                       open_archive, open_member)
+from ..blobstore import load_manifest
+from .LocalBlobStore import LocalBlobStore
 
 class Local(Database):
     
-    def __init__(self, host):
+    def __init__(self, host, index=True, archive_codec='gzip',
+                 archive_level=None, archive_threads=None, blob_store=False):
         """
         Initializes a connection to a local database.
         
@@ -25,9 +37,38 @@ class Local(Database):
         ----------
         host : str
             The host name (local directory path) for the database.
+        index : bool, optional
+            If True (default), a sidecar metadata index of each record style
+            is maintained and used to list and filter records without parsing
+            every record file.
+        archive_codec : str, optional
+            The compression format of the tar archives created by add_tar:
+            'gzip' (default), 'xz' or 'zstd'.  Archives are saved with the
+            matching .tar.gz, .tar.xz or .tar.zst extension, and archives of
+            any format can be read.
+        archive_level : int, optional
+            The compression level of created archives.  Default value depends
+            on the format.
+        archive_threads : int, optional
+            The number of threads to compress created archives with.  Default
+            value is 1.
+        blob_store : bool, optional
+            If True, add_tar stores the files of each archive in a shared
+            content-addressed store in host/.blobs, with each unique chunk
+            of file content stored once, and saves a manifest in place of the
+            archive.  get_tar rebuilds the archive from the manifest.  If
+            False (default), archives are stored whole.  Both kinds of
+            archives can be read either way.
         """
+        self.__index = boolean(index)
+        self.__archive_codec = ArchiveCodec(archive_codec, level=archive_level,
+                                            threads=archive_threads)
+        self.__blob_store = boolean(blob_store)
+        
         # Get absolute path to host
         host = Path(host).resolve()
+        self.__blobs = LocalBlobStore(Path(host, '.blobs'),
+                                      codec=self.__archive_codec)
         
         # Make the path if needed
         if not host.is_dir():
@@ -36,6 +77,26 @@ class Local(Database):
         # Pass host to Database initializer
         Database.__init__(self, host)
     
+    @property
+    def index(self):
+        """bool: Indicates if the record style indexes are used."""
+        return self.__index
+    
+    @property
+    def archive_codec(self):
+        """iprPy.database.archive.ArchiveCodec: The compression of created archives."""
+        return self.__archive_codec
+    
+    @property
+    def blob_store(self):
+        """bool: Indicates if add_tar stores archives in the blob store."""
+        return self.__blob_store
+    
+    @property
+    def blobs(self):
+        """iprPy.database.local.LocalBlobStore: The content-addressed store of archive files."""
+        return self.__blobs
+    
     def get_records(self, name=None, style=None, query=None, return_df=False,
                     **kwargs):
         """
@@ -56,7 +117,53 @@ class Local(Database):
         list of iprPy.Records
             All records from the database matching the given parameters.
         """
-
+        
+        # Find matching record files using the index
+        keys, df, records = self._select(name=name, style=style, query=query,
+                                         **kwargs)
+        
+        # Load only the matching records that were not already loaded
+        for i in df.index:
+            if i not in records:
+                records[i] = self._load(*keys[i])
+        records = [records[i] for i in df.index]
+        
+        if return_df:
+            return records, df.reset_index(drop=True)
+        else:
+            return records
+    
+    def iget_records(self, name=None, style=None, query=None, batch_size=None,
+                     **kwargs):
+        """
+        Iterates over all matching records in the database.  Record files are
+        only parsed as they are reached, and the index is used to skip the
+        files of records that do not match kwargs.
+        
+        Parameters
+        ----------
+        name : str, optional
+            The record name or id to limit the search by.
+        style : str, optional
+            The record style to limit the search by.
+        query : str, optional
+            A query str for identifying records.  Not supported by this style.
+        batch_size : int, optional
+            Not used by this style as records are read one file at a time.
+            
+        Yields
+        ------
+        iprPy.Record
+            Each record from the database matching the given parameters.
+        """
+        
+        # Use index rows to identify matching records
+        if name is None and self.index:
+            keys, df, records = self._select(style=style, query=query, **kwargs)
+            for i in df.index:
+                yield self._load(*keys[i])
+            return
+        
         # Set default search parameters
         if style is None:
             style = list(record_styles.keys())
@@ -64,46 +171,23 @@ class Local(Database):
             style = aslist(style)
             for record_style in style:
                 assert record_style in list(record_styles.keys()), f'unknown record style {record_style}'
-
+        
         if query is not None:
             raise ValueError('query not supported by this style')
         
-        df = []
-        records = []
-        # Iterate through all files matching style, name values
+        # Lazily iterate over record files
         for record_style in style:
-            
-            # Iterate over all names using glob
             if name is None:
-                for record_file in Path(self.host, record_style).glob('*.xml'):
-                    record_name = record_file.stem
-                    
-                    # Load as an iprPy.Record object
-                    record = load_record(record_style, record_name, record_file)
-                    records.append(record)
-                    df.append(record.todict(full=False, flat=True))
+                record_files = Path(self.host, record_style).glob('*.xml')
             else:
-                # Iterate over given names
-                for record_name in aslist(name):
-                    record_file = Path(self.host, record_style, record_name+'.xml')
-                    if record_file.is_file():
-                        
-                        # Load as an iprPy.Record object
-                        record = load_record(record_style, record_name, record_file)
-                        records.append(record)
-                        df.append(record.todict(full=False, flat=True))
-        
-        records = np.array(records)
-        df = pd.DataFrame(df)
-        
-        if len(df) > 0:
-            for key in kwargs:
-                df = df[df[key].isin(aslist(kwargs[key]))]
-        
-        if return_df:
-            return list(records[df.index.tolist()]), df.reset_index(drop=True)
-        else:
-            return list(records[df.index.tolist()])
+                record_files = (Path(self.host, record_style, record_name+'.xml')
+                                for record_name in aslist(name))
+            
+            for record_file in record_files:
+                if record_file.is_file():
+                    record = self._load(record_style, record_file.stem)
+                    if self._ismatch(record, **kwargs):
+                        yield record
     
     def get_records_df(self, name=None, style=None, query=None, full=True,
                        flat=False, **kwargs):
@@ -123,7 +207,99 @@ class Local(Database):
             All records from the database matching the given parameters.
         """
         
-       # Set default search parameters
+        # Pre-filter using the index rows for kwargs that they contain
+        keys, df, records = self._select(name=name, style=style, query=query,
+                                         skipmissing=not (full is False and flat is True),
+                                         **kwargs)
+        
+        # Index rows are the todict(full=False, flat=True) values
+        if full is False and flat is True:
+            return df.reset_index(drop=True)
+        
+        # Take the rows of the records that passed the index filter from
+        # the record style snapshots
+        if name is None and self.index:
+            names = {}
+            for i in df.index:
+                names.setdefault(keys[i][0], []).append(keys[i][1])
+            dfs = []
+            for record_style, record_names in names.items():
+                dfs.append(self._snapshot(record_style, record_names, full, flat))
+            if len(dfs) > 0:
+                df = pd.concat(dfs, sort=False)
+            else:
+                df = pd.DataFrame()
+        
+        # Load and convert only the records that passed the index filter
+        else:
+            df2 = []
+            for i in df.index:
+                if i in records:
+                    record = records[i]
+                else:
+                    record = self._load(*keys[i])
+                df2.append(record.todict(full=full, flat=flat))
+            df = pd.DataFrame(df2)
+        
+        if len(df) > 0:
+            for key in kwargs:
+                df = df[df[key].isin(aslist(kwargs[key]))]
+        
+        return df.reset_index(drop=True)
+    
+    def get_record_names(self, style):
+        """
+        Lists the names of all records of a given style in the database
+        without loading the records.
+        
+        Parameters
+        ----------
+        style : str
+            The record style to list the names of.
+            
+        Returns
+        ------
+        set of str
+            The names of all records of the style.
+        """
+        return set(record_file.stem for record_file
+                   in Path(self.host, style).glob('*.xml'))
+    
+    def _select(self, name=None, style=None, query=None, skipmissing=False,
+                **kwargs):
+        """
+        Identifies the records matching name, style and kwargs using the
+        todict(full=False, flat=True) rows.  For name=None, the rows are taken
+        from the record style indexes rather than by parsing all record
+        files.
+        
+        Parameters
+        ----------
+        name : str, optional
+            The record name or id to limit the search by.
+        style : str, optional
+            The record style to limit the search by.
+        query : str, optional
+            A query str for identifying records.  Not supported by this style.
+        skipmissing : bool, optional
+            If True, kwargs keys that are not row fields are ignored rather
+            than raising an error. Default value is False.
+        **kwargs : any
+            Field values to limit the rows by.
+            
+        Returns
+        -------
+        keys : list of tuple
+            The (record style, record name) of every record found, in the
+            same order as the unfiltered rows.
+        df : pandas.DataFrame
+            The matching rows.  The DataFrame's index values correspond to
+            the positions in keys.
+        records : dict
+            Any records that were loaded during the search, with the keys
+            being the positions in keys.
+        """
+        # Set default search parameters
         if style is None:
             style = list(record_styles.keys())
         else:
@@ -134,36 +310,106 @@ class Local(Database):
         if query is not None:
             raise ValueError('query not supported by this style')
         
-        df = []
-       # Iterate through all files matching style, name values
+        keys = []
+        dfs = []
+        records = {}
         for record_style in style:
             
-            # Iterate over all names using glob
-            if name is None:
-                for record_file in Path(self.host, record_style).glob('*.xml'):
-                    record_name = record_file.stem
-
-                    # Load as an iprPy.Record object
-                    record = load_record(record_style, record_name, record_file)
-                    df.append(record.todict(full=full, flat=flat))
+            # Use index rows when searching all names
+            if name is None and self.index:
+                names, rows = self._index(record_style).rows()
+                keys.extend([(record_style, record_name) for record_name in names])
+                dfs.append(rows)
+            
+            # Load the records directly otherwise
             else:
-                # Iterate over given names
-                for record_name in aslist(name):
-                    record_file = Path(self.host, record_style, record_name+'.xml')
-                    if record_file.is_file():
-                        
-                        # Load as an iprPy.Record object
-                        record = load_record(record_style, record_name, record_file)
-                        df.append(record.todict(full=full, flat=flat))                    
+                if name is None:
+                    record_files = Path(self.host, record_style).glob('*.xml')
+                else:
+                    record_files = []
+                    for record_name in aslist(name):
+                        record_file = Path(self.host, record_style, record_name+'.xml')
+                        if record_file.is_file():
+                            record_files.append(record_file)
+                
+                rows = []
+                for record_file in record_files:
+                    record = self._load(record_style, record_file.stem)
                     
-        df = pd.DataFrame(df)
+                    # Skip records with mismatched querypaths values
+                    if (not skipmissing and 
+                        record.queryextractor.mismatch(record.content, **kwargs)[0]):
+                        continue
+                    records[len(keys)] = record
+                    keys.append((record_style, record.name))
+                    rows.append(record.todict(full=False, flat=True))
+                dfs.append(pd.DataFrame(rows))
+        
+        if len(dfs) > 0:
+            df = pd.concat(dfs, ignore_index=True, sort=False)
+        else:
+            df = pd.DataFrame()
         
         if len(df) > 0:
             for key in kwargs:
+                if skipmissing and key not in df:
+                    continue
                 df = df[df[key].isin(aslist(kwargs[key]))]
         
-        return df.reset_index(drop=True)
-
+        return keys, df, records
+    
+    def _load(self, record_style, record_name, cache=False):
+        """
+        Loads a record file as an iprPy.Record object.  If cache is True, the
+        parsed content is kept in the shared content cache and reused until
+        the file changes.  Bulk reads leave cache as False so that the
+        content is only parsed if used and does not push out the cached
+        records that are looked up repeatedly, such as parents and
+        potentials.
+        """
+        record_file = Path(self.host, record_style, record_name+'.xml')
+        if not cache:
+            return load_record(record_style, record_name, record_file)
+        
+        stat = record_file.stat()
+        stamp = (record_style, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        
+        content = content_cache.get(self.host, record_name, stamp)
+        if content is not None:
+            return load_record(record_style, record_name, content)
+        
+        record = load_record(record_style, record_name, record_file)
+        content_cache.set(self.host, record_name, stamp, record.content)
+        return record
+    
+    def _index(self, record_style):
+        """Returns the LocalIndex for a record style"""
+        return LocalIndex(Path(self.host, record_style), record_style)
+    
+    def _snapshot(self, record_style, names, full, flat):
+        """
+        Returns the todict rows of the named records of a style from the
+        style's snapshot, building rows only for new and modified record
+        files.
+        """
+        stamps = {}
+        style_dir = Path(self.host, record_style)
+        if style_dir.is_dir():
+            with os.scandir(style_dir) as entries:
+                for entry in entries:
+                    if entry.name[-4:] == '.xml' and entry.is_file():
+                        stamps[entry.name[:-4]] = entry.stat().st_mtime_ns
+        
+        # Skip records deleted since they were listed
+        def loader(names):
+            return [self._load(record_style, name) for name in names
+                    if Path(self.host, record_style, name+'.xml').is_file()]
+        
+        snapshot = RecordsSnapshot(Path(self.host, '.index'), record_style,
+                                   full=full, flat=flat)
+        df = snapshot.update(stamps, loader)
+        return snapshot.select(df, names, loader)
+    
     def get_record(self, name=None, style=None, query=None, **kwargs):
         """
         Returns a single matching record from the database.
@@ -186,8 +432,16 @@ class Local(Database):
             If multiple or no matching records found.
         """
         
+        # Use direct file lookup for single names
+        if isinstance(name, str) and query is None and len(kwargs) == 0:
+            record_styles_found = self._find(name, style)
+            if len(record_styles_found) == 1:
+                return self._load(record_styles_found[0], name, cache=True)
+            record = record_styles_found
+        
         # Get records
-        record = self.get_records(name=name, style=style, query=None, **kwargs)
+        else:
+            record = self.get_records(name=name, style=style, query=None, **kwargs)
         
         # Verify that there is only one matching record
         if len(record) == 1:
@@ -196,6 +450,45 @@ class Local(Database):
             raise ValueError(f'Cannot find matching record {name} ({style})')
         else:
             raise ValueError('Multiple matching records found')
+    
+    def _find(self, name, style=None):
+        """
+        Checks which record styles have a record file with the given name.
+        
+        Parameters
+        ----------
+        name : str
+            The record name to search for.
+        style : str or list, optional
+            The record style(s) to limit the search to.
+        
+        Returns
+        -------
+        list of str
+            The record styles with a matching record file.
+        """
+        if style is None:
+            style = list(record_styles.keys())
+        else:
+            style = aslist(style)
+        
+        found = []
+        for record_style in style:
+            if Path(self.host, record_style, name+'.xml').is_file():
+                found.append(record_style)
+        return found
+    
+    def _verify(self, record):
+        """
+        Verifies that a record exists in the database without reloading it.
+        
+        Raises
+        ------
+        ValueError
+            If no matching record is found.
+        """
+        if len(self._find(record.name, record.style)) == 0:
+            raise ValueError(f'Cannot find matching record {record.name} ({record.style})')
 
     def add_record(self, record=None, style=None, name=None, content=None):
         """
@@ -238,7 +531,7 @@ class Local(Database):
             raise ValueError('kwargs style, name, and content cannot be given with kwarg record')
         
         # Verify that there isn't already a record with a matching name
-        if len(self.get_records(name=record.name, style=record.style)) > 0:
+        if len(self._find(record.name, record.style)) > 0:
             raise ValueError(f'Record {record.name} already exists')
         
         # Make record style directory if needed
@@ -250,9 +543,69 @@ class Local(Database):
         xml_file = Path(style_dir, record.name+'.xml')
         with open(xml_file, 'w') as f:
             record.content.xml(fp=f)
+        content_cache.invalidate(self.host, record.name)
+        
+        # Add record to the index
+        if self.index:
+            self._index(record.style).add(record)
         
         return record
 
+    def add_records(self, records, skip_existing=True, existing=None):
+        """
+        Adds multiple new records to the database.  The existing names are
+        listed once per record style, and the index entries of each style are
+        added in a single transaction.
+        
+        Parameters
+        ----------
+        records : list of iprPy.Record
+            The new records to add to the database.
+        skip_existing : bool, optional
+            If True (default), records whose names match existing records or
+            earlier records in the list are skipped.  If False, an error is
+            issued if any matching records are found.
+        existing : dict, optional
+            The names of the existing records for each record style, if
+            already known.  Styles included here are not listed again, and
+            the sets are updated with the added names.
+        
+        Returns
+        ------
+        list of iprPy.Record
+            The records that were added.
+        
+        Raises
+        ------
+        ValueError
+            If skip_existing is False and a matching record already exists.
+        """
+        records = self._new_records(records, skip_existing, existing)
+        
+        styles = {}
+        for record in records:
+            styles.setdefault(record.style, []).append(record)
+        
+        for record_style, style_records in styles.items():
+            
+            # Make record style directory if needed
+            style_dir = Path(self.host, record_style)
+            if not style_dir.is_dir():
+                style_dir.mkdir()
+            
+            # Save content to .xml files
+            for record in style_records:
+                xml_file = Path(style_dir, record.name+'.xml')
+                with open(xml_file, 'w') as f:
+                    record.content.xml(fp=f)
+                content_cache.invalidate(self.host, record.name)
+            
+            # Add records to the index
+            if self.index:
+                self._index(record_style).add_many(style_records)
+        
+        return records
+    
     def update_record(self, record=None, style=None, name=None, content=None):
         """
         Replaces an existing record with a new record of matching name and
@@ -290,27 +643,34 @@ class Local(Database):
         if record is None:
             if content is None:
                 raise TypeError('no new content given')
-            oldrecord = self.get_record(name=name, style=style)
-            record = load_record(oldrecord.style, oldrecord.name, content)
+            record_styles_found = self._find(name, style)
+            if len(record_styles_found) == 0:
+                raise ValueError(f'Cannot find matching record {name} ({style})')
+            elif len(record_styles_found) > 1:
+                raise ValueError('Multiple matching records found')
+            record = load_record(record_styles_found[0], name, content)
         
         # Issue a ValueError for competing kwargs
         elif style is not None or name is not None:
             raise ValueError('kwargs style and name cannot be given with kwarg record')
         
         # Replace content in record object
-        elif content is not None:
-            oldrecord = record
-            record = load_record(oldrecord.style, oldrecord.name, content)
-            
-        # Find oldrecord matching record
         else:
-            oldrecord = self.get_record(name=record.name, style=record.style)
-        
-        # Delete oldrecord
-        self.delete_record(record=oldrecord)
+            self._verify(record)
+            if content is not None:
+                record = load_record(record.style, record.name, content)
+        
+        # Write the new content next to the old file then replace it
+        xml_file = Path(self.host, record.style, record.name+'.xml')
+        temp_file = Path(self.host, record.style, f'.{record.name}.xml.{uuid.uuid4()}')
+        with open(temp_file, 'w') as f:
+            record.content.xml(fp=f)
+        os.replace(temp_file, xml_file)
+        content_cache.invalidate(self.host, record.name)
         
-        # Add new record
-        self.add_record(record=record)
+        # Update the record's index entry
+        if self.index:
+            self._index(record.style).add(record)
         
         return record
     
@@ -345,13 +705,18 @@ class Local(Database):
         
         # Verify that record exists
         else:
-            record = self.get_record(name=record.name, style=record.style)
+            self._verify(record)
         
         # Build path to record
         xml_path = Path(self.host, record.style, record.name+'.xml')
         
         # Delete record file
         xml_path.unlink()
+        content_cache.invalidate(self.host, record.name)
+        
+        # Remove record from the index
+        if self.index:
+            self._index(record.style).remove(record.name)
 
     def add_tar(self, record=None, name=None, style=None, tar=None, root_dir=None):
         """
@@ -371,9 +736,10 @@ class Local(Database):
             .The name to use in uniquely identifying the record.
         style : str, optional
             .The style to use in uniquely identifying the record.
-        tar : bytes, optional
-            The bytes content of a tar file to save.  tar cannot be given
-            with root_dir.
+        tar : bytes or file-like object, optional
+            The bytes content of a tar file to save, or an open binary
+            file-like object to read it from.  tar cannot be given with
+            root_dir.
         root_dir : str, optional
             Specifies the root directory for finding the directory to archive.
             The directory to archive is at <root_dir>/<name>.  (Default is to
@@ -397,33 +763,65 @@ class Local(Database):
         
         # Verify that record exists
         else:
-            record = self.get_record(name=record.name, style=record.style)
+            self._verify(record)
         
         # Build path to record
         record_path = Path(self.host, record.style, record.name)
-        tar_path = Path(self.host, record.style, f'{record.name}.tar.gz')
+        manifest_path = self._manifest_path(record.style, record.name)
         
         # Check if an archive already exists
-        if tar_path.is_file():
+        if (self._tar_path(record.style, record.name) is not None
+            or manifest_path.is_file()):
             raise ValueError('Record already has an archive')
         
+        if tar is not None and root_dir is not None:
+            raise ValueError('tar and root_dir cannot both be given')
+        
+        # Store files in the blob store and save the manifest
+        if self.blob_store:
+            if tar is None:
+                if root_dir is None:
+                    root_dir = '.'
+                manifest = self.blobs.add_directory(Path(root_dir, record.name))
+            else:
+                manifest = self.blobs.add_tar(tar)
+            
+            temp_path = Path(manifest_path.parent, f'.{manifest_path.name}.{uuid.uuid4()}')
+            with open(temp_path, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(temp_path, manifest_path)
+        
         # Make archive
-        if tar is None:
+        elif tar is None:
             if root_dir is None:
                 root_dir = '.'
             target = Path(root_dir, record.name)
+            tar_path = Path(self.host, record.style,
+                            record.name + self.archive_codec.extension)
 
-            tar = tarfile.open(tar_path, 'w:gz')
-            tar.add(target, target.name)
-            tar.close()
-            
-        elif root_dir is None:
             with open(tar_path, 'wb') as f:
-                f.write(tar)
+                index = write_archive(f, target, codec=self.archive_codec)
+            self._save_tar_index(record.style, record.name, index)
+            
+        # Save given archive content with the extension of its format
         else:
-            raise ValueError('tar and root_dir cannot both be given')
+            temp_path = Path(self.host, record.style, f'.{record.name}.{uuid.uuid4()}')
+            try:
+                with open(temp_path, 'w+b') as f:
+                    if hasattr(tar, 'read'):
+                        shutil.copyfileobj(tar, f)
+                    else:
+                        f.write(tar)
+                    f.seek(0)
+                    codec = ArchiveCodec.detect(f)
+                tar_path = Path(self.host, record.style, record.name + codec.extension)
+                os.replace(temp_path, tar_path)
+            finally:
+                if temp_path.is_file():
+                    temp_path.unlink()
     
-    def get_tar(self, record=None, name=None, style=None, raw=False):
+    def get_tar(self, record=None, name=None, style=None, raw=False,
+                stream=False):
         """
         Retrives the tar archive associated with a record in the database.
         Issues an error if exactly one matching record is not found in the 
@@ -440,6 +838,10 @@ class Local(Database):
         raw : bool, optional
             If True, return the archive as raw binary content. If 
             False, return as an open tarfile. (Default is False)
+        stream : bool, optional
+            If True and raw is True, the raw content is returned as an open
+            binary file-like object rather than as bytes, allowing for it to
+            be read in chunks. (Default is False)
         
         Returns
         -------
@@ -463,17 +865,35 @@ class Local(Database):
         
         # Verify that record exists
         else:
-            record = self.get_record(name=record.name, style=record.style)
+            self._verify(record)
+        
+        # Rebuild archives kept in the blob store
+        manifest = self._load_manifest(record.style, record.name)
+        if manifest is not None:
+            if raw is True:
+                temp = tempfile.TemporaryFile()
+                self.blobs.write_tar(manifest, temp)
+                temp.seek(0)
+                if stream is True:
+                    return temp
+                with temp:
+                    return temp.read()
+            else:
+                return self.blobs.open_tar(manifest)
         
         # Build path to record
-        tar_path = Path(self.host, record.style, record.name+'.tar.gz')
+        tar_path = self._tar_path(record.style, record.name)
+        if tar_path is None:
+            raise FileNotFoundError(f'No tar found for the record {record.name}')
         
         # Return content
         if raw is True:
+            if stream is True:
+                return open(tar_path, 'rb')
             with open(tar_path, 'rb') as f:
                 return f.read()
         else:
-            return tarfile.open(tar_path)
+            return open_archive(tar_path)
 
     def delete_tar(self, record=None, name=None, style=None):
         """
@@ -507,15 +927,198 @@ class Local(Database):
         
         # Verify that record exists
         else:
-            record = self.get_record(name=record.name, style=record.style)
-        
-        # Build path to tar file
-        tar_path = Path(self.host, record.style, record.name+'.tar.gz')
+            self._verify(record)
         
-        # Delete record if it exists
-        if tar_path.is_file():
+        # Delete tar file if it exists
+        tar_path = self._tar_path(record.style, record.name)
+        if tar_path is not None:
             tar_path.unlink()
+        index_path = self._tar_index_path(record.style, record.name)
+        if index_path.is_file():
+            index_path.unlink()
+        manifest_path = self._manifest_path(record.style, record.name)
+        if manifest_path.is_file():
+            manifest_path.unlink()
 
+    def get_tar_member(self, record=None, name=None, style=None, path=None):
+        """
+        Retrieves a single file from the tar archive associated with a record
+        in the database.  Only the part of the archive holding the file is
+        decompressed, using the archive's member index.  Indexes are saved
+        when archives are added, and are built on first use for archives
+        added as raw content or by older versions.
+        
+        Parameters
+        ----------
+        record : iprPy.Record, optional
+            The record to retrive the associated tar archive for.
+        name : str, optional
+            .The name to use in uniquely identifying the record.
+        style : str, optional
+            .The style to use in uniquely identifying the record.
+        path : str
+            The path of the file in the archive, which starts with the record's
+            name.
+        
+        Returns
+        -------
+        io.BufferedReader
+            The file's content.
+        
+        Raises
+        ------
+        ValueError
+            If style and/or name content given with record.
+        KeyError
+            If the archive does not contain the file.
+        """
+        
+        # Create Record object if not given
+        if record is None:
+            record = self.get_record(name=name, style=style)
+        
+        # Issue a ValueError for competing kwargs
+        elif style is not None or name is not None:
+            raise ValueError('kwargs style and name cannot be given with kwarg record')
+        
+        # Verify that record exists
+        else:
+            self._verify(record)
+        
+        # Read files of archives kept in the blob store directly
+        manifest = self._load_manifest(record.style, record.name)
+        if manifest is not None:
+            return self.blobs.open_member(manifest, path)
+        
+        tar_path = self._tar_path(record.style, record.name)
+        if tar_path is None:
+            raise FileNotFoundError(f'No tar found for the record {record.name}')
+        f = open(tar_path, 'rb')
+        try:
+            index = self._load_tar_index(record.style, record.name, f)
+            return open_member(f, index, path, closefd=True)
+        except:
+            f.close()
+            raise
+
+    def _tar_path(self, record_style, record_name):
+        """
+        Returns the path to a record's tar archive, whichever format it is
+        saved in, or None if the record has no tar archive.
+        """
+        for extension in ArchiveCodec.extensions.values():
+            tar_path = Path(self.host, record_style, record_name+extension)
+            if tar_path.is_file():
+                return tar_path
+        return None
+
+    def _manifest_path(self, record_style, record_name):
+        """Returns the path to the blob store manifest of a record's archive"""
+        return Path(self.host, record_style, record_name+'.blobs.json')
+
+    def _load_manifest(self, record_style, record_name):
+        """
+        Loads the blob store manifest of a record's archive, or returns None
+        if the archive is not kept in the blob store.
+        """
+        try:
+            with open(self._manifest_path(record_style, record_name), 'rb') as f:
+                return load_manifest(f)
+        except FileNotFoundError:
+            return None
+
+    def prune_blobs(self, grace=3600):
+        """
+        Deletes the blob store chunks that are not used by any archive.
+        Chunks are left in place when archives are deleted, as other
+        archives may share them, until this is called.
+        
+        Parameters
+        ----------
+        grace : float, optional
+            Chunks stored or reused less than this many seconds ago are
+            kept, as they may belong to an archive that is being added.  Default value is
+            3600.
+        
+        Returns
+        -------
+        int
+            The number of chunks deleted.
+        """
+        def manifests():
+            for manifest_path in Path(self.host).glob('*/*.blobs.json'):
+                try:
+                    with open(manifest_path, 'rb') as f:
+                        yield load_manifest(f)
+                except FileNotFoundError:
+                    pass
+        
+        return self.blobs.prune(manifests(), grace=grace)
+
+    def _tar_index_path(self, record_style, record_name):
+        """Returns the path to the member index of a record's tar archive"""
+        return Path(self.host, '.index', 'tar', record_style, record_name+'.json')
+
+    def _save_tar_index(self, record_style, record_name, index):
+        """
+        Saves the member index of a record's tar archive along with the
+        archive's size and modification time.
+        """
+        tar_path = self._tar_path(record_style, record_name)
+        stat = tar_path.stat()
+        index = dict(index, stamp=[stat.st_size, stat.st_mtime_ns])
+
+        index_path = self._tar_index_path(record_style, record_name)
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = Path(index_path.parent, f'.{index_path.name}.{uuid.uuid4()}')
+        with open(temp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(temp_path, index_path)
+        return index
+
+    def _load_tar_index(self, record_style, record_name, fileobj):
+        """
+        Loads the member index of a record's tar archive, building it from the
+        open archive fileobj if it is missing or out of date.
+        """
+        stat = os.fstat(fileobj.fileno())
+        index_path = self._tar_index_path(record_style, record_name)
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            pass
+        else:
+            if index.get('stamp') == [stat.st_size, stat.st_mtime_ns]:
+                return index
+        
+        index = index_archive(fileobj)
+        fileobj.seek(0)
+        return self._save_tar_index(record_style, record_name, index)
+
+    def get_tar_names(self, style):
+        """
+        Lists the names of all records of a given style in the database that
+        have an associated tar archive.
+        
+        Parameters
+        ----------
+        style : str
+            The record style to list the names of.
+            
+        Returns
+        ------
+        set of str
+            The names of all records of the style with tar archives.
+        """
+        names = set()
+        for extension in ArchiveCodec.extensions.values():
+            names.update(tar_file.name[:-len(extension)] for tar_file
+                         in Path(self.host, style).glob('*'+extension))
+        names.update(manifest_file.name[:-11] for manifest_file
+                     in Path(self.host, style).glob('*.blobs.json'))
+        return names
+    
     def update_tar(self, record=None, name=None, style=None, tar=None, root_dir=None):
         """
         Replaces an existing tar archive for a record with a new one.  Issues
@@ -532,9 +1135,10 @@ class Local(Database):
             .The name to use in uniquely identifying the record.
         style : str, optional
             .The style to use in uniquely identifying the record.
-        tar : bytes, optional
-            The bytes content of a tar file to save.  tar cannot be given
-            with root_dir.
+        tar : bytes or file-like object, optional
+            The bytes content of a tar file to save, or an open binary
+            file-like object to read it from.  tar cannot be given with
+            root_dir.
         root_dir : str, optional
             Specifies the root directory for finding the directory to archive.
             The directory to archive is at <root_dir>/<name>.  (Default is to
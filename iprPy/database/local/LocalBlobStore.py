@@ -0,0 +1,65 @@
+# Standard Python libraries
+from pathlib import Path
+import os
+import uuid
+
+# iprPy imports
+from ..blobstore import BlobStore
+
+class LocalBlobStore(BlobStore):
+    """Chunks kept as files named by hash in a local directory."""
+
+    def __init__(self, directory, codec=None):
+        """
+        Initializes the store.
+
+        Parameters
+        ----------
+        directory : path-like object
+            The directory to keep the chunks in.
+        codec : iprPy.database.archive.ArchiveCodec, optional
+            The compression of new chunks and of rebuilt archives.
+        """
+        self.__directory = Path(directory)
+        BlobStore.__init__(self, codec=codec)
+
+    @property
+    def directory(self):
+        """pathlib.Path: The directory the chunks are kept in."""
+        return self.__directory
+
+    def _path(self, blob):
+        return Path(self.directory, blob[:2], blob)
+
+    def has(self, blob):
+        return self._path(blob).is_file()
+
+    def _touch(self, blob):
+        try:
+            os.utime(self._path(blob))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _put(self, blob, data):
+        path = self._path(blob)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = Path(path.parent, f'.{blob}.{uuid.uuid4()}')
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _get(self, blob):
+        with open(self._path(blob), 'rb') as f:
+            return f.read()
+
+    def _delete(self, blob):
+        try:
+            self._path(blob).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _iter_blobs(self):
+        for path in self.directory.glob('??/*'):
+            if path.name[:1] != '.':
+                yield path.name, path.stat().st_mtime
@@ -0,0 +1,186 @@
+# Standard Python libraries
+from pathlib import Path
+import os
+import json
+import sqlite3
+from contextlib import contextmanager
+
+# http://www.numpy.org/
+import numpy as np
+
+# https://pandas.pydata.org/
+import pandas as pd
+
+# iprPy imports
+from ... import load_record
+
+class LocalIndex(object):
+    """
+    Sidecar metadata index for one record style directory of a Local
+    database.  For every record file, the index stores the file's
+    modification time along with the record's todict(full=False, flat=True)
+    row.  This allows for records to be listed and filtered without parsing
+    every record file.
+    """
+
+    def __init__(self, style_dir, record_style):
+        """
+        Initializes the index for a record style directory.  The index file
+        is kept in a hidden .index directory next to the style directory so
+        that writing to it does not change the style directory's
+        modification time.
+
+        Parameters
+        ----------
+        style_dir : path-like object
+            The path to the record style directory being indexed.
+        record_style : str
+            The record style of the records in the directory.
+        """
+        self.__style_dir = Path(style_dir)
+        self.__record_style = record_style
+
+    @property
+    def style_dir(self):
+        """pathlib.Path: The record style directory being indexed."""
+        return self.__style_dir
+
+    @property
+    def record_style(self):
+        """str: The record style of the indexed records."""
+        return self.__record_style
+
+    @property
+    def path(self):
+        """pathlib.Path: The path to the index file."""
+        return Path(self.style_dir.parent, '.index', f'{self.record_style}.sqlite')
+
+    @contextmanager
+    def connect(self):
+        """
+        Opens a connection to the index file, creating the tables if needed.
+        The yielded connection is committed and closed on exit.
+
+        Yields
+        ------
+        sqlite3.Connection
+            The open connection.
+        """
+        if not self.path.parent.is_dir():
+            self.path.parent.mkdir(parents=True)
+
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            with conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS records '
+                             '(name TEXT PRIMARY KEY, mtime INTEGER, row TEXT)')
+                conn.execute('CREATE TABLE IF NOT EXISTS meta '
+                             '(key TEXT PRIMARY KEY, value INTEGER)')
+                yield conn
+        finally:
+            conn.close()
+
+    def sync(self):
+        """
+        Brings the index up to date with the record files.  Files are only
+        parsed if they are new or their modification times have changed.
+        The modification time of every file is checked, as editing a file in
+        place does not change the modification time of the directory.
+        """
+        if not self.style_dir.is_dir():
+            return
+
+        with self.connect() as conn:
+
+            # Collect the modification times of all record files
+            mtimes = {}
+            with os.scandir(self.style_dir) as entries:
+                for entry in entries:
+                    if entry.name[-4:] == '.xml' and entry.is_file():
+                        mtimes[entry.name[:-4]] = entry.stat().st_mtime_ns
+
+            indexed = dict(conn.execute('SELECT name, mtime FROM records'))
+
+            # Remove entries for deleted files
+            stale = [(name,) for name in indexed if name not in mtimes]
+            conn.executemany('DELETE FROM records WHERE name=?', stale)
+
+            # Parse new and modified files
+            for name, mtime in mtimes.items():
+                if indexed.get(name) != mtime:
+                    record_file = Path(self.style_dir, name+'.xml')
+                    record = load_record(self.record_style, name, record_file)
+                    self._upsert(conn, name, mtime, record.todict(full=False, flat=True))
+
+    def add(self, record):
+        """
+        Adds or updates the index entry for a record whose file has just been
+        saved.
+
+        Parameters
+        ----------
+        record : iprPy.Record
+            The saved record.
+        """
+        self.add_many([record])
+
+    def add_many(self, records):
+        """
+        Adds or updates the index entries for multiple records whose files
+        have just been saved using a single transaction.
+
+        Parameters
+        ----------
+        records : list of iprPy.Record
+            The saved records.
+        """
+        with self.connect() as conn:
+            for record in records:
+                record_file = Path(self.style_dir, record.name+'.xml')
+                mtime = record_file.stat().st_mtime_ns
+                self._upsert(conn, record.name, mtime, record.todict(full=False, flat=True))
+
+    def remove(self, name):
+        """
+        Removes the index entry for a record.
+
+        Parameters
+        ----------
+        name : str
+            The name of the record to remove.
+        """
+        with self.connect() as conn:
+            conn.execute('DELETE FROM records WHERE name=?', (name,))
+
+    def rows(self):
+        """
+        Returns all indexed rows after syncing the index.
+
+        Returns
+        -------
+        names : list of str
+            The record names.
+        df : pandas.DataFrame
+            The todict(full=False, flat=True) rows for the records.
+        """
+        if not self.style_dir.is_dir():
+            return [], pd.DataFrame()
+        self.sync()
+
+        with self.connect() as conn:
+            entries = conn.execute('SELECT name, row FROM records').fetchall()
+
+        names = [entry[0] for entry in entries]
+        df = pd.DataFrame([json.loads(entry[1]) for entry in entries])
+        return names, df
+
+    def _upsert(self, conn, name, mtime, row):
+        """Inserts or replaces a single index entry."""
+        conn.execute('INSERT OR REPLACE INTO records VALUES (?, ?, ?)',
+                     (name, mtime, json.dumps(row, default=_jsonvalue)))
+
+def _jsonvalue(value):
+    """Converts numpy scalars to native Python for json serialization."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'{type(value)} not JSON serializable')
@@ -1,8 +1,8 @@
 # Standard Python libraries
 from pathlib import Path
-import shutil
-import tarfile
+import tempfile
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 
 from mdcs import MDCS
 
@@ -20,10 +20,12 @@ from ...tools import aslist, iaslist
 from .. import Database
 from ... import load_record
 from ...record import loaded as record_styles
+from ..archive import ArchiveCodec, write_archive, open_archive
 
 class MDCSDatabase(Database):
     
-    def __init__(self, host, user=None, pswd=None, cert=None):
+    def __init__(self, host, user=None, pswd=None, cert=None,
+                 archive_codec='gzip', archive_level=None, archive_threads=None):
         """
         Initializes a database of style curator.
         
@@ -41,6 +43,17 @@ class MDCSDatabase(Database):
             password.
         cert : str, optional
             The path to a certification file if needed for accessing the database.
+        archive_codec : str, optional
+            The compression format of the tar archives created by add_tar:
+            'gzip' (default), 'xz' or 'zstd'.  Archives are uploaded with the
+            matching .tar.gz, .tar.xz or .tar.zst extension, and archives of
+            any format can be read.
+        archive_level : int, optional
+            The compression level of created archives.  Default value depends
+            on the format.
+        archive_threads : int, optional
+            The number of threads to compress created archives with.  Default
+            value is 1.
         """
         
         # Pass parameters to mdcs object
@@ -48,10 +61,17 @@ class MDCSDatabase(Database):
             with open(pswd) as f:
                 pswd = f.read().strip()
         self.mdcs = MDCS(host=host, user=user, pswd=pswd, cert=cert)
+        self.__archive_codec = ArchiveCodec(archive_codec, level=archive_level,
+                                            threads=archive_threads)
         
         # Pass host to Database initializer
         Database.__init__(self, host)
     
+    @property
+    def archive_codec(self):
+        """iprPy.database.archive.ArchiveCodec: The compression of created archives."""
+        return self.__archive_codec
+    
     def get_records(self, name=None, style=None, query=None, return_df=False,
                     **kwargs):
         """
@@ -110,6 +130,48 @@ class MDCSDatabase(Database):
         else:
             return list(records[df.index.tolist()])
     
+    def iget_records(self, name=None, style=None, query=None, batch_size=None,
+                     **kwargs):
+        """
+        Iterates over all matching records in the database.  Each style and
+        name is selected separately, and the records are only built from the
+        returned content as they are iterated over.
+        
+        Parameters
+        ----------
+        name : str, optional
+            The record name or id to limit the search by.
+        style : str, optional
+            The record style to limit the search by.
+        batch_size : int, optional
+            Not used by this style.
+            
+        Yields
+        ------
+        iprPy.Record
+            Each record from the database matching the given parameters.
+        """
+        types = {}
+        
+        def iterrows(data):
+            for row in data.itertuples():
+                if row.schema not in types:
+                    types[row.schema] = self.mdcs.template_select_one(id=row.schema).title
+                
+                # Load as Record object
+                record = load_record(types[row.schema], row.title, row.content)
+                if self._ismatch(record, **kwargs):
+                    yield record
+        
+        if query is not None:
+            # Get data using query
+            yield from iterrows(self.mdcs.query(query))
+        else:
+            # Iterate through all files matching style, name values
+            for s in iaslist(style):
+                for n in iaslist(name):
+                    yield from iterrows(self.mdcs.select(template=s, title=n))
+    
     def get_records_df(self, name=None, style=None, query=None, full=True,
                        flat=False, **kwargs):
         """
@@ -139,6 +201,10 @@ class MDCSDatabase(Database):
                 
                 # Load as Record object
                 record = load_record(types[row.schema], row.title, row.content)
+                
+                # Skip records with mismatched querypaths values
+                if record.queryextractor.mismatch(record.content, **kwargs)[0]:
+                    continue
                 df.append(record.todict(full=full, flat=flat))
         else:
             # Iterate through all files matching style, name values
@@ -151,6 +217,10 @@ class MDCSDatabase(Database):
                         
                         # Load as Record object
                         record = load_record(types[row.schema], row.title, row.content)
+                        
+                        # Skip records with mismatched querypaths values
+                        if record.queryextractor.mismatch(record.content, **kwargs)[0]:
+                            continue
                         df.append(record.todict(full=full, flat=flat))
         df = pd.DataFrame(df)
         
@@ -160,6 +230,23 @@ class MDCSDatabase(Database):
         
         return df.reset_index(drop=True)
     
+    def get_record_names(self, style):
+        """
+        Lists the names of all records of a given style in the database
+        without loading the records.
+        
+        Parameters
+        ----------
+        style : str
+            The record style to list the names of.
+            
+        Returns
+        ------
+        set of str
+            The names of all records of the style.
+        """
+        return set(self.mdcs.select(template=style).title)
+    
     def get_record(self, name=None, style=None, query=None, **kwargs):
         """
         Returns a single matching record from the database.
@@ -182,8 +269,20 @@ class MDCSDatabase(Database):
             If multiple or no matching records found.
         """
         
+        # Use a direct title select for single names
+        if isinstance(name, str) and query is None and len(kwargs) == 0:
+            record = []
+            types = {}
+            for s in iaslist(style):
+                data = self.mdcs.select(template=s, title=name)
+                for row in data.itertuples():
+                    if row.schema not in types:
+                        types[row.schema] = self.mdcs.template_select_one(id=row.schema).title
+                    record.append(load_record(types[row.schema], row.title, row.content))
+        
         # Get records
-        record = self.get_records(name=name, style=style, query=query, **kwargs)
+        else:
+            record = self.get_records(name=name, style=style, query=query, **kwargs)
         
         # Verify that there is only one matching record
         if len(record) == 1:
@@ -235,7 +334,7 @@ class MDCSDatabase(Database):
             raise ValueError('kwargs style, name, and content cannot be given with kwarg record')
             
         # Verify that there isn't already a record with a matching name
-        if len(self.get_records(name=record.name, style=record.style)) > 0:
+        if len(self.mdcs.select(template=record.style, title=record.name)) > 0:
             raise ValueError(f'Record {record.name} already exists')
         
         # Upload record to database
@@ -243,6 +342,50 @@ class MDCSDatabase(Database):
         
         return record
     
+    def add_records(self, records, skip_existing=True, existing=None,
+                    max_workers=4):
+        """
+        Adds multiple new records to the database.  The existing names are
+        checked once per record style, and the new records are uploaded
+        concurrently as the curator has no bulk upload.
+        
+        Parameters
+        ----------
+        records : list of iprPy.Record
+            The new records to add to the database.
+        skip_existing : bool, optional
+            If True (default), records whose names match existing records or
+            earlier records in the list are skipped.  If False, an error is
+            issued if any matching records are found.
+        existing : dict, optional
+            The names of the existing records for each record style, if
+            already known.  Styles included here are not listed again, and
+            the sets are updated with the added names.
+        max_workers : int, optional
+            The number of uploads to run at the same time.  Default value is
+            4.
+        
+        Returns
+        ------
+        list of iprPy.Record
+            The records that were added.
+        
+        Raises
+        ------
+        ValueError
+            If skip_existing is False and a matching record already exists.
+        """
+        records = self._new_records(records, skip_existing, existing)
+        
+        def curate(record):
+            self.mdcs.curate(record.content.xml(), record.name, record.style)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for future in [executor.submit(curate, record) for record in records]:
+                future.result()
+        
+        return records
+    
     def update_record(self, record=None, style=None, name=None, content=None):
         """
         Replaces an existing record with a new record of matching name and 
@@ -361,9 +504,10 @@ class MDCSDatabase(Database):
             .The name to use in uniquely identifying the record.
         style : str, optional
             .The style to use in uniquely identifying the record.
-        tar : bytes, optional
-            The bytes content of a tar file to save.  tar cannot be given
-            with root_dir.
+        tar : bytes or file-like object, optional
+            The bytes content of a tar file to save, or an open binary
+            file-like object to read it from.  tar cannot be given with
+            root_dir.
         root_dir : str, optional
             Specifies the root directory for finding the directory to archive.
             The directory to archive is at <root_dir>/<name>.  (Default is to
@@ -394,32 +538,36 @@ class MDCSDatabase(Database):
             raise ValueError('Record already has an archive')
         
         if tar is None: 
-            filename = Path(record.name + '.tar.gz')
-            
-            # Make archive
-            shutil.make_archive(record.name, 'gztar', root_dir=root_dir,
-                                base_dir=record.name)
-            
-            # Upload archive
-            tries = 0
-            while tries < 2:
-                if True:
-                    url = self.mdcs.blob_upload(filename.as_posix())
-                    break
-                else:
-                    tries += 1
-            if tries == 2:
-                raise ValueError('Failed to upload archive 2 times')
+            if root_dir is None:
+                root_dir = '.'
             
-            # Remove local archive copy
-            filename.unlink()
+            # Make archive in a temporary directory
+            with tempfile.TemporaryDirectory() as tempdir:
+                filename = Path(tempdir, record.name + self.archive_codec.extension)
+                with open(filename, 'wb') as f:
+                    write_archive(f, Path(root_dir, record.name),
+                                  codec=self.archive_codec)
+                
+                # Upload archive
+                tries = 0
+                while tries < 2:
+                    if True:
+                        url = self.mdcs.blob_upload(filename.as_posix())
+                        break
+                    else:
+                        tries += 1
+                if tries == 2:
+                    raise ValueError('Failed to upload archive 2 times')
             
         elif root_dir is None:
             # Upload archive
             tries = 0
             while tries < 2:
                 if True:
-                    url = self.mdcs.blob_upload(BytesIO(tar))
+                    if hasattr(tar, 'read'):
+                        url = self.mdcs.blob_upload(tar)
+                    else:
+                        url = self.mdcs.blob_upload(BytesIO(tar))
                     break
                 else:
                     tries += 1
@@ -436,7 +584,8 @@ class MDCSDatabase(Database):
         
         self.update_record(record=record)
 
-    def get_tar(self, record=None, name=None, style=None, raw=False):
+    def get_tar(self, record=None, name=None, style=None, raw=False,
+                stream=False):
         """
         Retrives the tar archive associated with a record in the database.
         Issues an error if exactly one matching record is not found in the 
@@ -455,6 +604,10 @@ class MDCSDatabase(Database):
         raw : bool, optional
             If True, return the archive as raw binary content. If 
             False, return as an open tarfile. (Default is False)
+        stream : bool, optional
+            If True and raw is True, the raw content is returned as an open
+            binary file-like object rather than as bytes, allowing for it to
+            be read in chunks. (Default is False)
             
         Returns
         -------
@@ -486,9 +639,33 @@ class MDCSDatabase(Database):
         
         # Return content
         if raw is True:
+            if stream is True:
+                return BytesIO(tardata)
             return tardata
         else:
-            return tarfile.open(fileobj = BytesIO(tardata))
+            return open_archive(BytesIO(tardata))
+    
+    def get_tar_names(self, style):
+        """
+        Lists the names of all records of a given style in the database that
+        have an associated tar archive.
+        
+        Parameters
+        ----------
+        style : str
+            The record style to list the names of.
+            
+        Returns
+        ------
+        set of str
+            The names of all records of the style with tar archives.
+        """
+        data = self.mdcs.select(template=style)
+        names = set()
+        for row in data.itertuples():
+            if len(DM(row.content).finds('archive')) > 0:
+                names.add(row.title)
+        return names
     
     def update_tar(self, record=None, name=None, style=None, tar=None, root_dir=None):
         """
@@ -508,9 +685,10 @@ class MDCSDatabase(Database):
             .The name to use in uniquely identifying the record.
         style : str, optional
             .The style to use in uniquely identifying the record.
-        tar : bytes, optional
-            The bytes content of a tar file to save.  tar cannot be given
-            with root_dir.
+        tar : bytes or file-like object, optional
+            The bytes content of a tar file to save, or an open binary
+            file-like object to read it from.  tar cannot be given with
+            root_dir.
         root_dir : str, optional
             Specifies the root directory for finding the directory to archive.
             The directory to archive is at <root_dir>/<name>.  (Default is to
@@ -537,32 +715,36 @@ class MDCSDatabase(Database):
             record = self.get_record(name=record.name, style=record.style)
         
         if tar is None: 
-            filename = Path(record.name+'.tar.gz')
-            
-            # Make archive
-            shutil.make_archive(record.name, 'gztar', root_dir=root_dir,
-                                base_dir=record.name)
+            if root_dir is None:
+                root_dir = '.'
             
-            # Upload archive
-            tries = 0
-            while tries < 2:
-                if True:
-                    url = self.mdcs.blob_upload(filename.as_posix())
-                    break
-                else:
-                    tries += 1
-            if tries == 2:
-                raise ValueError('Failed to upload archive 2 times')
-            
-            # Remove local archive copy
-            filename.unlink()
+            # Make archive in a temporary directory
+            with tempfile.TemporaryDirectory() as tempdir:
+                filename = Path(tempdir, record.name + self.archive_codec.extension)
+                with open(filename, 'wb') as f:
+                    write_archive(f, Path(root_dir, record.name),
+                                  codec=self.archive_codec)
+                
+                # Upload archive
+                tries = 0
+                while tries < 2:
+                    if True:
+                        url = self.mdcs.blob_upload(filename.as_posix())
+                        break
+                    else:
+                        tries += 1
+                if tries == 2:
+                    raise ValueError('Failed to upload archive 2 times')
             
         elif root_dir is None:
             # Upload archive
             tries = 0
             while tries < 2:
                 if True:
-                    url = self.mdcs.blob_upload(BytesIO(tar))
+                    if hasattr(tar, 'read'):
+                        url = self.mdcs.blob_upload(tar)
+                    else:
+                        url = self.mdcs.blob_upload(BytesIO(tar))
                     break
                 else:
                     tries += 1
@@ -1,7 +1,7 @@
 # Standard Python libraries
 from pathlib import Path
-import shutil
-import tarfile
+import tempfile
+import json
 from collections import OrderedDict
 
 # http://www.numpy.org/
@@ -18,13 +18,23 @@ from DataModelDict import DataModelDict as DM
 
 # iprPy imports
 from ...tools import aslist, iaslist
+from ...input import boolean
 from .. import Database
 from ... import load_record
+from .build_query import build_query
+from ..RecordsSnapshot import RecordsSnapshot
+from ..archive import (ArchiveCodec, write_archive, index_archive,
+                       open_archive, open_member)
+from ..blobstore import load_manifest
+from .MongoBlobStore import MongoBlobStore
 from ...record import loaded as record_styles
 
 class Mongo(Database):
     
-    def __init__(self, host='localhost', port=27017, database='iprPy', **kwargs):
+    def __init__(self, host='localhost', port=27017, database='iprPy',
+                 snapshot_directory=None, archive_codec='gzip',
+                 archive_level=None, archive_threads=None, blob_store=False,
+                 **kwargs):
         """
         Initializes a connection to a Mongo database.
         
@@ -38,6 +48,28 @@ class Mongo(Database):
         database : str
             The name of the database in the mongo host to interact with.
             Default value is 'iprPy'
+        snapshot_directory : path-like object, optional
+            A local directory for keeping snapshots of the get_records_df
+            rows of each record style.  If given, get_records_df only builds
+            the rows of records that were added or updated since the last
+            call.  If not given (default), snapshots are not used.
+        archive_codec : str, optional
+            The compression format of the tar archives created by add_tar:
+            'gzip' (default), 'xz' or 'zstd'.  Archives of any format can be
+            read.
+        archive_level : int, optional
+            The compression level of created archives.  Default value depends
+            on the format.
+        archive_threads : int, optional
+            The number of threads to compress created archives with.  Default
+            value is 1.
+        blob_store : bool, optional
+            If True, add_tar stores the files of each archive in a shared
+            content-addressed GridFS collection, 'archive_blobs', with each
+            unique chunk of file content stored once under its hash, and
+            saves a manifest in place of the archive.  get_tar rebuilds the
+            archive from the manifest.  If False (default), archives are
+            stored whole.  Both kinds of archives can be read either way.
         **kwargs : dict, optional
             Any extra keyword arguments needed to initialize a
             pymongo.MongoClient object.
@@ -46,6 +78,18 @@ class Mongo(Database):
         # Connect to underlying class
         self.__mongodb = MongoClient(host=host, port=port, document_class=DM, **kwargs)[database]
         
+        # Track which collections and fields have had indexes created
+        self.__indexed = set()
+        
+        if snapshot_directory is not None:
+            snapshot_directory = Path(snapshot_directory).resolve()
+        self.__snapshot_directory = snapshot_directory
+        
+        self.__archive_codec = ArchiveCodec(archive_codec, level=archive_level,
+                                            threads=archive_threads)
+        self.__blob_store = boolean(blob_store)
+        self.__blobs = MongoBlobStore(self.__mongodb, codec=self.__archive_codec)
+        
         # Define class host using client's host, port and database name
         host = self.mongodb.client.address[0]
         port =self.mongodb.client.address[1]
@@ -55,6 +99,26 @@ class Mongo(Database):
         # Pass host to Database initializer
         Database.__init__(self, host)
     
+    @property
+    def snapshot_directory(self):
+        """pathlib.Path or None: The directory where snapshots are kept."""
+        return self.__snapshot_directory
+    
+    @property
+    def archive_codec(self):
+        """iprPy.database.archive.ArchiveCodec: The compression of created archives."""
+        return self.__archive_codec
+    
+    @property
+    def blob_store(self):
+        """bool: Indicates if add_tar stores archives in the blob store."""
+        return self.__blob_store
+    
+    @property
+    def blobs(self):
+        """iprPy.database.mongo.MongoBlobStore: The content-addressed store of archive files."""
+        return self.__blobs
+    
     @property
     def mongodb(self):
         """pymongo.Database : The underlying database API object."""
@@ -85,21 +149,16 @@ class Mongo(Database):
             style = list(record_styles.keys())
         else:
             style = aslist(style)
-
-        # Handle query-based parameters
-        if query is None:
-            query = {}
-            if name is not None:
-                query['name'] = {}
-                query['name']['$in'] = aslist(name)
-        elif name is not None:
-            raise ValueError('name and query cannot both be given')
         
         df = []
         records = []
+        remaining = {}
         for s in style:
-            collection = self.mongodb[s]
-            for entry in collection.find(query):
+            
+            # Query only the documents matching the translatable kwargs
+            entries, s_remaining = self._find_entries(s, name=name, query=query, **kwargs)
+            remaining.update(s_remaining)
+            for entry in entries:
                 
                 # Load as Record object
                 record = load_record(s, entry['name'], entry['content'])
@@ -110,14 +169,52 @@ class Mongo(Database):
         df = pd.DataFrame(df)
 
         if len(df) > 0:
-            for key in kwargs:
-                df = df[df[key].isin(aslist(kwargs[key]))]
+            for key in remaining:
+                df = df[df[key].isin(aslist(remaining[key]))]
 
         if return_df:
             return list(records[df.index.tolist()]), df.reset_index(drop=True)
         else:
             return list(records[df.index.tolist()])
 
+    def iget_records(self, name=None, style=None, query=None, batch_size=None,
+                     **kwargs):
+        """
+        Iterates over all matching records in the database.  The records are
+        streamed from a database cursor rather than fetched all at once.
+        
+        Parameters
+        ----------
+        name : str, optional
+            The record name or id to limit the search by.
+        style : str, optional
+            The record style to limit the search by.
+        query : dict, optional
+            A Mongo query for identifying records.  Cannot be given with name.
+        batch_size : int, optional
+            The number of documents for the cursor to fetch from the database
+            at a time.  If not given, the pymongo default is used.
+            
+        Yields
+        ------
+        iprPy.Record
+            Each record from the database matching the given parameters.
+        """
+        if style is None:
+            style = list(record_styles.keys())
+        else:
+            style = aslist(style)
+        
+        for s in style:
+            entries, remaining = self._find_entries(s, name=name, query=query, **kwargs)
+            if batch_size is not None:
+                entries = entries.batch_size(batch_size)
+            
+            for entry in entries:
+                record = load_record(s, entry['name'], entry['content'])
+                if self._ismatch(record, **remaining):
+                    yield record
+    
     def get_records_df(self, name=None, style=None, query=None, full=True,
                        flat=False, **kwargs):
         """
@@ -140,20 +237,25 @@ class Mongo(Database):
             style = list(record_styles.keys())
         else:
             style = aslist(style)
-
-        # Handle query-based parameters
-        if query is None:
-            query = {}
-            if name is not None:
-                query['name'] = {}
-                query['name']['$in'] = aslist(name)
-        elif name is not None:
-            raise ValueError('name and query cannot both be given')
         
         df = []
+        remaining = {}
         for s in style:
-            collection = self.mongodb[s]
-            for entry in collection.find(query):
+            
+            # Take the rows of the matching documents from the snapshot
+            if self.snapshot_directory is not None:
+                entries, s_remaining = self._find_entries(s, name=name, query=query,
+                                                          projection={'_id': 0, 'name': 1},
+                                                          **kwargs)
+                remaining.update(s_remaining)
+                names = [entry['name'] for entry in entries]
+                df.extend(self._snapshot(s, names, full, flat).to_dict('records'))
+                continue
+            
+            # Query only the documents matching the translatable kwargs
+            entries, s_remaining = self._find_entries(s, name=name, query=query, **kwargs)
+            remaining.update(s_remaining)
+            for entry in entries:
                     
                 # Load as Record object
                 record = load_record(s, entry['name'], entry['content'])
@@ -162,11 +264,28 @@ class Mongo(Database):
         df = pd.DataFrame(df)
         
         if len(df) > 0:
-            for key in kwargs:
-                df = df[df[key].isin(aslist(kwargs[key]))]
+            for key in remaining:
+                df = df[df[key].isin(aslist(remaining[key]))]
         
         return df.reset_index(drop=True)
     
+    def get_record_names(self, style):
+        """
+        Lists the names of all records of a given style in the database
+        without loading the records.
+        
+        Parameters
+        ----------
+        style : str
+            The record style to list the names of.
+            
+        Returns
+        ------
+        set of str
+            The names of all records of the style.
+        """
+        return set(self._collection(style).distinct('name'))
+    
     def get_record(self, name=None, style=None, query=None, **kwargs):
         """
         Returns a single matching record from the database.
@@ -189,8 +308,21 @@ class Mongo(Database):
             If multiple or no matching records found.
         """
         
+        # Use indexed find_one lookups for single names
+        if isinstance(name, str) and query is None and len(kwargs) == 0:
+            if style is None:
+                styles = list(record_styles.keys())
+            else:
+                styles = aslist(style)
+            record = []
+            for s in styles:
+                entry = self._collection(s).find_one({'name': name})
+                if entry is not None:
+                    record.append(load_record(s, entry['name'], entry['content']))
+        
         # Get records
-        record = self.get_records(name=name, style=style, query=None, **kwargs)
+        else:
+            record = self.get_records(name=name, style=style, query=None, **kwargs)
         
         # Verify that there is only one matching record
         if len(record) == 1:
@@ -199,6 +331,125 @@ class Mongo(Database):
             raise ValueError(f'Cannot find matching record {name} ({style})')
         else:
             raise ValueError('Multiple matching records found')
+    
+    def _collection(self, record_style):
+        """
+        Returns the collection for a record style, creating the index on the
+        name field the first time the collection is accessed.
+        """
+        collection = self.mongodb[record_style]
+        if record_style not in self.__indexed:
+            collection.create_index('name')
+            self.__indexed.add(record_style)
+        return collection
+    
+    def _snapshot(self, record_style, names, full, flat):
+        """
+        Returns the todict rows of the named records of a style from the
+        style's snapshot, building rows only for new and updated documents.  The
+        document ids are used as the change stamps as updating a record
+        replaces its document.
+        """
+        collection = self._collection(record_style)
+        stamps = {}
+        for entry in collection.find({}, projection={'_id': 1, 'name': 1}):
+            stamps[entry['name']] = entry['_id']
+        
+        def loader(names):
+            records = []
+            for i in range(0, len(names), 1000):
+                entries = collection.find({'name': {'$in': names[i:i+1000]}},
+                                          projection={'_id': 0, 'name': 1, 'content': 1})
+                for entry in entries:
+                    records.append(load_record(record_style, entry['name'], entry['content']))
+            return records
+        
+        snapshot = RecordsSnapshot(Path(self.snapshot_directory, self.mongodb.name),
+                                   record_style, full=full, flat=flat)
+        df = snapshot.update(stamps, loader)
+        return snapshot.select(df, names, loader)
+    
+    def _find_entries(self, record_style, name=None, query=None,
+                      projection=None, **kwargs):
+        """
+        Finds the documents of a record style that match the search
+        parameters.  kwargs that map to document fields are added to the
+        Mongo filter, and indexes for those fields are created on first use.
+        
+        Parameters
+        ----------
+        record_style : str
+            The record style to search.
+        name : str or list, optional
+            The record name(s) to limit the search by.
+        query : dict, optional
+            A Mongo query to limit the search by.
+        projection : dict, optional
+            The document fields to return.  Default returns the name and
+            content fields.
+        **kwargs : any
+            todict key-value pairs to limit the search by.
+        
+        Returns
+        -------
+        entries : pymongo.cursor.Cursor
+            The matching documents, limited to the projection fields.
+        remaining : dict
+            The kwargs that were not included in the Mongo filter.
+        """
+        collection = self._collection(record_style)
+        query, paths, remaining = build_query(load_record(record_style),
+                                              query=query, name=name, **kwargs)
+        
+        # Create indexes for the queried fields
+        for path in paths:
+            if (record_style, path) not in self.__indexed:
+                collection.create_index(path)
+                self.__indexed.add((record_style, path))
+        
+        if projection is None:
+            projection = {'_id': 0, 'name': 1, 'content': 1}
+        return collection.find(query, projection=projection), remaining
+    
+    def _find(self, name, style=None):
+        """
+        Checks which record styles have a record with the given name.
+        
+        Parameters
+        ----------
+        name : str
+            The record name to search for.
+        style : str or list, optional
+            The record style(s) to limit the search to.
+        
+        Returns
+        -------
+        list of str
+            The record styles with a matching record.
+        """
+        if style is None:
+            style = list(record_styles.keys())
+        else:
+            style = aslist(style)
+        
+        found = []
+        for record_style in style:
+            collection = self._collection(record_style)
+            if collection.find_one({'name': name}, projection={'_id': 1}) is not None:
+                found.append(record_style)
+        return found
+    
+    def _verify(self, record):
+        """
+        Verifies that a record exists in the database without reloading it.
+        
+        Raises
+        ------
+        ValueError
+            If no matching record is found.
+        """
+        if len(self._find(record.name, record.style)) == 0:
+            raise ValueError(f'Cannot find matching record {record.name} ({record.style})')
 
     def add_record(self, record=None, style=None, name=None, content=None):
         """
@@ -241,7 +492,7 @@ class Mongo(Database):
             raise ValueError('kwargs style, name, and content cannot be given with kwarg record')
 
         # Verify that there isn't already a record with a matching name
-        if len(self.get_records(name=record.name, style=record.style)) > 0:
+        if len(self._find(record.name, record.style)) > 0:
             raise ValueError(f'Record {record.name} already exists')
 
         # Create meta mongo entry
@@ -254,6 +505,74 @@ class Mongo(Database):
 
         return record
 
+    def add_records(self, records, skip_existing=True, existing=None):
+        """
+        Adds multiple new records to the database.  The existing names are
+        checked once per record style, and the new records of each style are
+        uploaded together with a single unordered insert_many call.
+        
+        Parameters
+        ----------
+        records : list of iprPy.Record
+            The new records to add to the database.
+        skip_existing : bool, optional
+            If True (default), records whose names match existing records or
+            earlier records in the list are skipped.  If False, an error is
+            issued if any matching records are found.
+        existing : dict, optional
+            The names of the existing records for each record style, if
+            already known.  Styles included here are not listed again, and
+            the sets are updated with the added names.
+        
+        Returns
+        ------
+        list of iprPy.Record
+            The records that were added.
+        
+        Raises
+        ------
+        ValueError
+            If skip_existing is False and a matching record already exists.
+        """
+        # Group records by record style
+        styles = OrderedDict()
+        for record in records:
+            styles.setdefault(record.style, []).append(record)
+        
+        if existing is None:
+            existing = {}
+        
+        newrecords = []
+        for record_style, style_records in styles.items():
+            collection = self._collection(record_style)
+            
+            # Find the existing names with one query
+            if record_style in existing:
+                names = existing[record_style]
+            else:
+                names = set(collection.distinct('name', {'name': {'$in': 
+                            [record.name for record in style_records]}}))
+            
+            entries = []
+            for record in style_records:
+                if record.name in names:
+                    if skip_existing:
+                        continue
+                    raise ValueError(f'Record {record.name} already exists')
+                names.add(record.name)
+                
+                entry = OrderedDict()
+                entry['name'] = record.name
+                entry['content'] = record.content
+                entries.append(entry)
+                newrecords.append(record)
+            
+            # Upload to mongodb
+            if len(entries) > 0:
+                collection.insert_many(entries, ordered=False)
+        
+        return newrecords
+    
     def update_record(self, record=None, style=None, name=None, content=None):
         """
         Replaces an existing record with a new record of matching name and
@@ -305,7 +624,8 @@ class Mongo(Database):
             
         # Find oldrecord matching record
         else:
-            oldrecord = self.get_record(name=record.name, style=record.style)
+            self._verify(record)
+            oldrecord = record
         
         # Delete oldrecord
         self.delete_record(record=oldrecord)
@@ -346,7 +666,7 @@ class Mongo(Database):
         
         # Verify that record exists
         else:
-            record = self.get_record(name=record.name, style=record.style)
+            self._verify(record)
 
         # Build delete query
         query = {}
@@ -373,9 +693,10 @@ class Mongo(Database):
             .The name to use in uniquely identifying the record.
         style : str, optional
             .The style to use in uniquely identifying the record.
-        tar : bytes, optional
-            The bytes content of a tar file to save.  tar cannot be given
-            with root_dir.
+        tar : bytes or file-like object, optional
+            The bytes content of a tar file to save, or an open binary
+            file-like object to read it from.  tar cannot be given with
+            root_dir.
         root_dir : str, optional
             Specifies the root directory for finding the directory to archive.
             The directory to archive is at <root_dir>/<name>.  (Default is to
@@ -398,7 +719,7 @@ class Mongo(Database):
 
         # Verify that record exists
         else:
-            record = self.get_record(name=record.name, style=record.style)
+            self._verify(record)
         
         # Define mongofs
         mongofs = GridFS(self.mongodb, collection=record.style)
@@ -407,27 +728,40 @@ class Mongo(Database):
         if mongofs.exists({"recordname": record.name}):
             raise ValueError('Record already has an archive')
         
-        if tar is None:
+        if tar is not None and root_dir is not None:
+            raise ValueError('tar and root_dir cannot both be given')
         
-            # Make archive
-            shutil.make_archive(record.name, 'gztar', root_dir=root_dir,
-                                base_dir=record.name)
+        # Store files in the blob store and upload the manifest
+        if self.blob_store:
+            if tar is None:
+                if root_dir is None:
+                    root_dir = '.'
+                manifest = self.blobs.add_directory(Path(root_dir, record.name))
+            else:
+                manifest = self.blobs.add_tar(tar)
+            mongofs.put(json.dumps(manifest).encode('UTF-8'),
+                        recordname=record.name, blobmanifest=True)
         
-            # Upload archive
-            filename = Path(record.name + '.tar.gz')
-            with open(filename, 'rb') as f:
+        elif tar is None:
+        
+            if root_dir is None:
+                root_dir = '.'
+        
+            # Make archive in a temporary file and upload it with its member index
+            with tempfile.TemporaryFile() as f:
+                index = write_archive(f, Path(root_dir, record.name),
+                                      codec=self.archive_codec)
+                f.seek(0)
                 tries = 0
                 while tries < 2:
                     if True:
-                        mongofs.put(f, recordname=record.name)
+                        mongofs.put(f, recordname=record.name,
+                                    memberindex=json.dumps(index))
                         break
                     else:
                         tries += 1
                 if tries == 2:
                     raise ValueError('Failed to upload archive 2 times')
-        
-            # Remove local archive copy
-            filename.unlink()
             
         elif root_dir is None:
             # Upload archive
@@ -440,10 +774,9 @@ class Mongo(Database):
                     tries += 1
             if tries == 2:
                 raise ValueError('Failed to upload archive 2 times')
-        else:
-            raise ValueError('tar and root_dir cannot both be given')
         
-    def get_tar(self, record=None, name=None, style=None, raw=False):
+    def get_tar(self, record=None, name=None, style=None, raw=False,
+                stream=False):
         """
         Retrives the tar archive associated with a record in the database.
         Issues an error if exactly one matching record is not found in the 
@@ -460,6 +793,10 @@ class Mongo(Database):
         raw : bool, optional
             If True, return the archive as raw binary content. If 
             False, return as an open tarfile. (Default is False)
+        stream : bool, optional
+            If True and raw is True, the raw content is returned as an open
+            binary file-like object rather than as bytes, allowing for it to
+            be read in chunks. (Default is False)
         
         Returns
         -------
@@ -483,7 +820,7 @@ class Mongo(Database):
         
         # Verify that record exists
         else:
-            record = self.get_record(name=record.name, style=record.style)
+            self._verify(record)
         
         # Define mongofs
         mongofs = GridFS(self.mongodb, collection=record.style)
@@ -500,12 +837,28 @@ class Mongo(Database):
             raise ValueError('No tar found for the record')
         else:
             raise ValueError('Multiple tars found for the record')
+        
+        # Rebuild archives kept in the blob store
+        if getattr(tar, 'blobmanifest', False):
+            manifest = load_manifest(tar)
+            if raw is True:
+                temp = tempfile.TemporaryFile()
+                self.blobs.write_tar(manifest, temp)
+                temp.seek(0)
+                if stream is True:
+                    return temp
+                with temp:
+                    return temp.read()
+            else:
+                return self.blobs.open_tar(manifest)
 
         # Return content
         if raw is True:
+            if stream is True:
+                return tar
             return tar.read()
         else:
-            return tarfile.open(fileobj=tar)
+            return open_archive(tar)
 
     def delete_tar(self, record=None, name=None, style=None):
         """
@@ -539,7 +892,7 @@ class Mongo(Database):
         
         # Verify that record exists
         else:
-            record = self.get_record(name=record.name, style=record.style)
+            self._verify(record)
         
         # Define mongofs
         mongofs = GridFS(self.mongodb, collection=record.style)
@@ -560,6 +913,109 @@ class Mongo(Database):
         # Delete tar
         mongofs.delete(tar._id)
     
+    def get_tar_member(self, record=None, name=None, style=None, path=None):
+        """
+        Retrieves a single file from the tar archive associated with a record
+        in the database.  Only the chunks of the archive holding the file are
+        downloaded, using the member index saved with the archive.  Indexes
+        are built on first use for archives added as raw content or by older
+        versions.
+        
+        Parameters
+        ----------
+        record : iprPy.Record, optional
+            The record to retrive the associated tar archive for.
+        name : str, optional
+            .The name to use in uniquely identifying the record.
+        style : str, optional
+            .The style to use in uniquely identifying the record.
+        path : str
+            The path of the file in the archive, which starts with the record's
+            name.
+        
+        Returns
+        -------
+        io.BufferedReader
+            The file's content.
+        
+        Raises
+        ------
+        ValueError
+            If style and/or name content given with record.
+        KeyError
+            If the archive does not contain the file.
+        """
+        # Create Record object if not given
+        if record is None:
+            record = self.get_record(name=name, style=style)
+        
+        # Issue a ValueError for competing kwargs
+        elif style is not None or name is not None:
+            raise ValueError('kwargs style and name cannot be given with kwarg record')
+        
+        # Read files of archives kept in the blob store directly
+        entry = self.mongodb[f'{record.style}.files'].find_one(
+            {'recordname': record.name, 'blobmanifest': True})
+        if entry is not None:
+            mongofs = GridFS(self.mongodb, collection=record.style)
+            manifest = load_manifest(mongofs.get(entry['_id']))
+            return self.blobs.open_member(manifest, path)
+        
+        tar = self.get_tar(record=record, raw=True, stream=True)
+        try:
+            index = json.loads(tar.memberindex)
+        except AttributeError:
+            index = index_archive(tar)
+            tar.seek(0)
+            self.mongodb[f'{record.style}.files'].update_one(
+                {'_id': tar._id}, {'$set': {'memberindex': json.dumps(index)}})
+        return open_member(tar, index, path, closefd=True)
+
+    def prune_blobs(self, grace=3600):
+        """
+        Deletes the blob store chunks that are not used by any archive.
+        Chunks are left in place when archives are deleted, as other
+        archives may share them, until this is called.
+        
+        Parameters
+        ----------
+        grace : float, optional
+            Chunks stored or reused less than this many seconds ago are
+            kept, as they may belong to an archive that is being added.
+            Default value is 3600.
+        
+        Returns
+        -------
+        int
+            The number of chunks deleted.
+        """
+        def manifests():
+            for collection in self.mongodb.list_collection_names():
+                if collection[-6:] != '.files' or collection == 'archive_blobs.files':
+                    continue
+                mongofs = GridFS(self.mongodb, collection=collection[:-6])
+                for entry in self.mongodb[collection].find({'blobmanifest': True}, {'_id': True}):
+                    yield load_manifest(mongofs.get(entry['_id']))
+        
+        return self.blobs.prune(manifests(), grace=grace)
+
+    def get_tar_names(self, style):
+        """
+        Lists the names of all records of a given style in the database that
+        have an associated tar archive.
+        
+        Parameters
+        ----------
+        style : str
+            The record style to list the names of.
+            
+        Returns
+        ------
+        set of str
+            The names of all records of the style with tar archives.
+        """
+        return set(self.mongodb[f'{style}.files'].distinct('recordname'))
+    
     def update_tar(self, record=None, name=None, style=None, tar=None, root_dir=None):
         """
         Replaces an existing tar archive for a record with a new one.  Issues
@@ -576,9 +1032,10 @@ class Mongo(Database):
             .The name to use in uniquely identifying the record.
         style : str, optional
             .The style to use in uniquely identifying the record.
-        tar : bytes, optional
-            The bytes content of a tar file to save.  tar cannot be given
-            with root_dir.
+        tar : bytes or file-like object, optional
+            The bytes content of a tar file to save, or an open binary
+            file-like object to read it from.  tar cannot be given with
+            root_dir.
         root_dir : str, optional
             Specifies the root directory for finding the directory to archive.
             The directory to archive is at <root_dir>/<name>.  (Default is to
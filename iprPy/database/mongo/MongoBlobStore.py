@@ -0,0 +1,55 @@
+# Standard Python libraries
+from datetime import datetime, timezone
+
+# https://api.mongodb.com/python/current/
+from gridfs import GridFS
+from gridfs.errors import FileExists
+
+# iprPy imports
+from ..blobstore import BlobStore
+
+class MongoBlobStore(BlobStore):
+    """Chunks kept in a GridFS collection with their hashes as ids."""
+
+    def __init__(self, mongodb, collection='archive_blobs', codec=None):
+        """
+        Initializes the store.
+
+        Parameters
+        ----------
+        mongodb : pymongo.database.Database
+            The Mongo database.
+        collection : str, optional
+            The GridFS collection to keep the chunks in.  Default value is
+            'archive_blobs'.
+        codec : iprPy.database.archive.ArchiveCodec, optional
+            The compression of new chunks and of rebuilt archives.
+        """
+        self.__mongofs = GridFS(mongodb, collection=collection)
+        self.__files = mongodb[f'{collection}.files']
+        BlobStore.__init__(self, codec=codec)
+
+    def has(self, blob):
+        return self.__mongofs.exists(blob)
+
+    def _touch(self, blob):
+        result = self.__files.update_one({'_id': blob},
+                                         {'$set': {'uploadDate': datetime.now(timezone.utc)}})
+        return result.matched_count == 1
+
+    def _put(self, blob, data):
+        try:
+            self.__mongofs.put(data, _id=blob)
+        except FileExists:
+            pass
+
+    def _get(self, blob):
+        return self.__mongofs.get(blob).read()
+
+    def _delete(self, blob):
+        self.__mongofs.delete(blob)
+
+    def _iter_blobs(self):
+        for entry in self.__files.find({}, {'uploadDate': True}):
+            stored = entry['uploadDate'].replace(tzinfo=timezone.utc)
+            yield entry['_id'], stored.timestamp()
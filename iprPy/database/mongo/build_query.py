@@ -0,0 +1,69 @@
+# iprPy imports
+from ...tools import aslist
+
+__all__ = ['build_query']
+
+def build_query(record, query=None, name=None, **kwargs):
+    """
+    Translates get_records parameters into a Mongo filter for a record style.
+    Any kwargs keys that are listed in the record's querypaths are converted
+    into conditions on the associated document fields.
+
+    Parameters
+    ----------
+    record : iprPy.Record
+        A Record object of the style being searched.  Used to access the
+        querypaths and querydefaults of the style.
+    query : dict, optional
+        A Mongo query to start from.  Cannot be given with name.
+    name : str or list, optional
+        The record name(s) to limit the search by.
+    **kwargs : any
+        todict key-value pairs to limit the search by.
+
+    Returns
+    -------
+    query : dict
+        The Mongo filter.
+    paths : list of str
+        The document field paths used by the kwargs conditions.
+    remaining : dict
+        The kwargs that could not be translated and must be filtered after
+        the records are loaded.
+    """
+    conditions = []
+    paths = []
+    remaining = {}
+
+    if query is not None:
+        if name is not None:
+            raise ValueError('name and query cannot both be given')
+        conditions.append(query)
+    elif name is not None:
+        conditions.append({'name': {'$in': aslist(name)}})
+
+    querypaths = record.querypaths
+    querydefaults = record.querydefaults
+    for key, value in kwargs.items():
+        if key not in querypaths:
+            remaining[key] = value
+            continue
+
+        path = f'content.{record.contentroot}.{querypaths[key]}'
+        paths.append(path)
+        values = aslist(value)
+        condition = {path: {'$in': values}}
+
+        # Missing elements match if the todict default value is allowed
+        if key in querydefaults and querydefaults[key] in values:
+            condition = {'$or': [condition, {path: {'$exists': False}}]}
+        conditions.append(condition)
+
+    if len(conditions) == 0:
+        query = {}
+    elif len(conditions) == 1:
+        query = conditions[0]
+    else:
+        query = {'$and': conditions}
+
+    return query, paths, remaining
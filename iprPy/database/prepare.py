@@ -1,19 +1,31 @@
 # Standard Python libraries
 from pathlib import Path
+import os
 import uuid
+import json
 import shutil
 from copy import deepcopy
-
-import atomman as am
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 import pandas as pd
 
 # iprPy imports
 from ..tools import aslist, filltemplate
-from .. import load_record
+from .. import load_record, load_calculation
 from ..input import buildcombos, parse
-
-def prepare(database, run_directory, calculation, input_script=None, **kwargs):
+from .workqueue import load_queue
+from .dependencies import Dependencies
+from .DuplicateIndex import DuplicateIndex
+from .retention import manifest_filename, file_hash
+
+# Cached DuplicateIndex of existing records for each database, record style
+# and script, used by existing_records
+_duplicate_indexes = {}
+
+def prepare(database, run_directory, calculation, input_script=None,
+            queue=None, priority=0, max_workers=None, dry_run=False,
+            **kwargs):
     """
     Function for preparing any iprPy calculation for high-throughput execution.
     Input parameters for preparing can either be given within an input script
@@ -31,6 +43,23 @@ def prepare(database, run_directory, calculation, input_script=None, **kwargs):
     input_script : str or file-like object, optional
         The file, path to file, or contents of an input script containing
         parameters for preparing the calculation.  Cannot be given with kwargs.
+    queue : str, bool or iprPy.database.workqueue.WorkQueue, optional
+        The work queue to add the prepared calculations to: 'sqlite' or
+        'mongo'.  If None (default), the calculations are added to the
+        sqlite queue only if one already exists in run_directory.  False
+        disables the queue.
+    priority : float, optional
+        The queue priority to assign to the prepared calculations.  Larger
+        values are run first.  (Default is 0).
+    max_workers : int, optional
+        The number of processes to use for building the records to check, and
+        the number of threads to use for creating the calculation folders.
+        If not given, large numbers of combinations are split across up to
+        one process per CPU, and the default number of threads is used.
+    dry_run : bool, optional
+        If True, the numbers of record combinations and new records are
+        reported without creating any calculation folders or records.
+        Default value is False.
     **kwargs : str or list
         Input parameters for preparing the calculation.  Values must be strings
         or list of strings if allowed by the calculation.
@@ -45,67 +74,273 @@ def prepare(database, run_directory, calculation, input_script=None, **kwargs):
         else:
             raise ValueError('input_script cannot be given with other keyword parameters')
     
-    # Build dataframe of all existing records for the calculation style
-    record_df = database.get_records_df(style=calculation.record_style,
-                                        full=False, flat=True,
-                                        script='calc_' + calculation.style)
-    print(len(record_df), 'existing calculation records found', flush=True)
+    # Index the compare terms of all existing records for the calculation style
+    duplicates = existing_records(database, record, 'calc_' + calculation.style)
+    print(len(duplicates), 'existing calculation records found', flush=True)
     
     # Complete kwargs with default values and buildcombos actions
     kwargs, content_dict = fill_kwargs(database, calculation, kwargs)
 
-    # Build all combinations
-    test_records, test_record_df, test_inputfiles, test_contents, content_dict = build_testrecords(database, calculation, content_dict, **kwargs)
-    print(len(test_record_df), 'record combinations to check', flush=True)
-    if len(test_record_df) == 0:
-        return
+    # Check dry runs against a copy so the cached index is unchanged
+    if dry_run:
+        duplicates = deepcopy(duplicates)
     
-    # Find new unique combinations
-    newrecord_df = new_calculations(record_df, test_record_df, record.compare_terms, record.compare_fterms)
-    print(len(newrecord_df), 'new records to prepare', flush=True)
-
-    # Iterate over new records and prepare
-    for i, newrecord_series in newrecord_df.iterrows():
-        newrecord = test_records[i]
-        inputfile = test_inputfiles[i]
-        copy_content = test_contents[i]
-        
-        # Generate calculation folder
-        calc_directory = Path(run_directory, newrecord_series.key)
-        if not calc_directory.is_dir():
-            calc_directory.mkdir(parents=True)
-
-        # Save inputfile to calculation folder
-        with open(Path(calc_directory, f'calc_{calculation.style}.in'), 'w') as f:
-            f.write(inputfile)
+    # Get the work queue if one is used
+    else:
+        queue = load_queue(database, run_directory, queue=queue)
+    
+    # Calculations that the new calculations may have to wait for
+    dependencies = Dependencies(run_directory)
+    pending = dependencies.pending()
+    
+    # Build, check and prepare the combinations one chunk at a time
+    numchecked = 0
+    numnew = 0
+    chunks = iter_testrecords(database, calculation, content_dict,
+                              max_workers=max_workers, **kwargs)
+    stage_directory = Path(run_directory, f'.prepare.{uuid.uuid4()}')
+    staged = None
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for test_records, test_record_df, test_inputfiles, test_contents in chunks:
+                numchecked += len(test_record_df)
+                if len(test_record_df) == 0:
+                    continue
+                
+                # Find new unique combinations
+                newrecord_df = test_record_df[duplicates.new(test_record_df)]
+                numnew += len(newrecord_df)
+                if len(newrecord_df) == 0 or dry_run:
+                    continue
+                
+                # Extract and write the shared files once to a staging directory
+                if staged is None:
+                    stage_directory.mkdir(parents=True)
+                staged = stage_files(database, calculation, stage_directory,
+                                     [test_contents[i] for i in newrecord_df.index],
+                                     content_dict, executor, staged=staged)
+                
+                # Build the calculation folders by linking to the staged files
+                futures = []
+                for i, newrecord_series in newrecord_df.iterrows():
+                    calc_directory = Path(run_directory, newrecord_series.key)
+                    futures.append(executor.submit(build_calc_directory, calc_directory,
+                                                   calculation.style, test_inputfiles[i],
+                                                   test_contents[i], staged))
+                
+                # Add the records of the completed folders to the database
+                newrecords = []
+                queue_items = []
+                dependency_items = []
+                for i, future in zip(newrecord_df.index, futures):
+                    future.result()
+                    newrecords.append(test_records[i])
+                    parents = [content.split()[1] for content in test_contents[i]]
+                    queue_items.append((test_records[i].name, parents, priority))
+                    if not pending.isdisjoint(parents):
+                        dependency_items.append((test_records[i].name, parents))
+                database.add_records(newrecords)
+                
+                # Add the new calculations to the work queue
+                if queue is not None:
+                    queue.enqueue(queue_items)
+                
+                # Record the calculations that depend on unfinished parents
+                if len(dependency_items) > 0:
+                    dependencies.add(dependency_items)
+    
+    finally:
+        chunks.close()
+        shutil.rmtree(stage_directory, ignore_errors=True)
+    
+    print(numchecked, 'record combinations checked', flush=True)
+    print(numnew, 'new records', 'found' if dry_run else 'prepared', flush=True)
 
-        # Copy calculation files to calculation folder
+def stage_files(database, calculation, stage_directory, contents,
+                content_dict, executor, staged=None):
+    """
+    Copies the calculation files, writes the parent records and extracts the
+    tar archives used by a set of calculations to a staging directory.  Each
+    is only done once regardless of how many calculations use it.  For
+    archives that only single files are used from, only those files are
+    read from the database.
+    
+    Parameters
+    ----------
+    database : iprPy.database.Database
+        The database to get the tar archives from.
+    calculation : iprPy.calculation.Calculation
+        The calculation being prepared.
+    stage_directory : path-like object
+        The directory to place the staged files in.  This should be on the
+        same filesystem as the run_directory so that the staged files can be
+        hard linked.
+    contents : list of list of str
+        The content terms of each calculation.
+    content_dict : dict
+        The loaded content of the records.
+    executor : concurrent.futures.Executor
+        Executor to extract the tar archives with.
+    staged : dict, optional
+        The dict returned by a previous call for the same stage_directory.
+        Only the files not already staged are added to it.
+    
+    Returns
+    -------
+    dict
+        The staged path for each calculation file (key 'files'), each
+        'record' and 'tar' content name, and each (tar name, file path) of
+        the 'tarfile' contents.
+    """
+    # Copy the calculation files
+    if staged is None:
+        staged = {'files': [], 'record': {}, 'tar': {}, 'tarfile': {}, 'hash': {}}
+        files_directory = Path(stage_directory, 'files')
+        files_directory.mkdir()
         for calc_file in calculation.files:
-            shutil.copy(calc_file, calc_directory)
-
-        # Copy/generate content files keys
+            staged_file = Path(files_directory, Path(calc_file).name)
+            shutil.copy(calc_file, staged_file)
+            staged['files'].append(staged_file)
+    
+    # Identify the distinct records, tars and single tar files
+    record_names = set()
+    tar_names = set()
+    tar_files = set()
+    for copy_content in contents:
         for content in copy_content:
             terms = content.split()
-
-            if terms[0] == 'record':
-                record_name = terms[1]
-                record_file = Path(calc_directory, record_name+'.json')
-                with open(record_file, 'w') as f:
-                    content_dict[record_name].json(fp=f, indent=4)
-
+            if terms[0] == 'record' and terms[1] not in staged['record']:
+                record_names.add(terms[1])
+            elif terms[0] == 'tar' and terms[1] not in staged['tar']:
+                tar_names.add(terms[1])
             elif terms[0] == 'tarfile':
-                tar = database.get_tar(name=terms[1])
-                file_name = terms[1] + '/' + ' '.join(terms[2:])
-                tar.extract(file_name, calc_directory)
-                tar.close()
-            
-            elif terms[0] == 'tar':
-                tar = database.get_tar(name=terms[1])
-                tar.extractall(calc_directory)
-                tar.close()
+                file_name = Path(terms[1], ' '.join(terms[2:])).as_posix()
+                if (terms[1], file_name) not in staged['tarfile']:
+                    tar_files.add((terms[1], file_name))
+    
+    # Write the records
+    records_directory = Path(stage_directory, 'record')
+    records_directory.mkdir(exist_ok=True)
+    for record_name in record_names:
+        record_file = Path(records_directory, record_name+'.json')
+        with open(record_file, 'w') as f:
+            content_dict[record_name].json(fp=f, indent=4)
+        staged['record'][record_name] = record_file
+    
+    # Extract the tars
+    def extract(tar_name):
+        tar_directory = Path(stage_directory, 'tar', tar_name)
+        tar_directory.mkdir(parents=True)
+        tar = database.get_tar(name=tar_name)
+        try:
+            tar.extractall(tar_directory)
+        finally:
+            tar.close()
+        for staged_file in tar_directory.glob('**/*'):
+            if staged_file.is_file():
+                staged['hash'][staged_file] = file_hash(staged_file)
+        return tar_directory
+    
+    tar_names = sorted(tar_names)
+    for tar_name, tar_directory in zip(tar_names, executor.map(extract, tar_names)):
+        staged['tar'][tar_name] = tar_directory
+    
+    # Extract only the needed file of tars that are not fully extracted
+    def extract_file(tar_file):
+        tar_name, file_name = tar_file
+        if tar_name in staged['tar']:
+            return Path(staged['tar'][tar_name], file_name)
+        staged_file = Path(stage_directory, 'tarfile', file_name)
+        staged_file.parent.mkdir(parents=True, exist_ok=True)
+        member = database.get_tar_member(name=tar_name, path=file_name)
+        try:
+            with open(staged_file, 'wb') as f:
+                shutil.copyfileobj(member, f)
+        finally:
+            member.close()
+        staged['hash'][staged_file] = file_hash(staged_file)
+        return staged_file
+    
+    tar_files = sorted(tar_files)
+    for tar_file, staged_file in zip(tar_files, executor.map(extract_file, tar_files)):
+        staged['tarfile'][tar_file] = staged_file
+    
+    return staged
+
+def build_calc_directory(calc_directory, calc_style, inputfile, copy_content,
+                         staged):
+    """
+    Creates a calculation folder using the files from stage_files.
+    
+    Parameters
+    ----------
+    calc_directory : path-like object
+        The calculation folder to create.
+    calc_style : str
+        The calculation style.
+    inputfile : str
+        The contents of the calculation's input file.
+    copy_content : list of str
+        The content terms of the calculation.
+    staged : dict
+        The staged file paths returned by stage_files.
+    """
+    if not calc_directory.is_dir():
+        calc_directory.mkdir(parents=True)
+
+    # Save inputfile to calculation folder
+    with open(Path(calc_directory, f'calc_{calc_style}.in'), 'w') as f:
+        f.write(inputfile)
+
+    # Link calculation files to calculation folder
+    for staged_file in staged['files']:
+        link_file(staged_file, Path(calc_directory, staged_file.name))
+
+    # Link content files, listing the ones copied from database archives
+    manifest = {}
+    for content in copy_content:
+        terms = content.split()
+
+        if terms[0] == 'record':
+            staged_file = staged['record'][terms[1]]
+            link_file(staged_file, Path(calc_directory, staged_file.name))
+
+        elif terms[0] == 'tarfile':
+            file_name = Path(terms[1], ' '.join(terms[2:]))
+            staged_file = staged['tarfile'][(terms[1], file_name.as_posix())]
+            calc_file = Path(calc_directory, file_name)
+            calc_file.parent.mkdir(parents=True, exist_ok=True)
+            link_file(staged_file, calc_file)
+            manifest[file_name.as_posix()] = [terms[1], staged['hash'][staged_file]]
         
-        # Add record to database
-        database.add_record(record=newrecord)
+        elif terms[0] == 'tar':
+            tar_directory = staged['tar'][terms[1]]
+            for staged_file in tar_directory.glob('**/*'):
+                calc_file = Path(calc_directory, staged_file.relative_to(tar_directory))
+                if staged_file.is_dir():
+                    calc_file.mkdir(parents=True, exist_ok=True)
+                else:
+                    calc_file.parent.mkdir(parents=True, exist_ok=True)
+                    link_file(staged_file, calc_file)
+                    relpath = calc_file.relative_to(calc_directory).as_posix()
+                    manifest[relpath] = [terms[1], staged['hash'][staged_file]]
+    
+    # Save the list so the runner can leave unchanged copies out of archives
+    if len(manifest) > 0:
+        with open(Path(calc_directory, manifest_filename), 'w') as f:
+            json.dump(manifest, f)
+
+def link_file(src, dst):
+    """
+    Hard links a file, falling back to copying it if links are not supported.
+    Any existing dst file is replaced.
+    """
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy(src, dst)
 
 def fill_kwargs(database, calculation, kwargs):
     """
@@ -183,20 +418,198 @@ def fill_kwargs(database, calculation, kwargs):
     
     return kwargs, content_dict
 
-def build_testrecords(database, calculation, content_dict, **kwargs):
+def build_testrecords(database, calculation, content_dict, max_workers=None,
+                      chunksize=500, **kwargs):
+    """
+    Builds the incomplete records for all combinations of the prepare
+    parameters.  See iter_testrecords for building the records in chunks
+    without holding all of them in memory.
+
+    Parameters
+    ----------
+    database : iprPy.database.Database
+        The database hosting the records referenced by the *_content
+        parameters.
+    calculation : iprPy.calculation.Calculation
+        The calculation being prepared.
+    content_dict : dict
+        Contains loaded record content.  Any referenced records not in
+        content_dict are fetched from the database and added.
+    max_workers : int, optional
+        The number of processes to use.  If not given, one process is used
+        for each chunk up to the number of CPUs.
+    chunksize : int, optional
+        The number of combinations built at a time by each process.
+        (Default is 500).
+    **kwargs : str or list
+        The filled prepare parameters.
+
+    Returns
+    -------
+    new_records : list of iprPy.Record
+        The valid incomplete records.
+    new_record_df : pandas.DataFrame
+        The todict(full=False, flat=True) rows of new_records.
+    new_inputfiles : list of str
+        The calculation input file contents for new_records.
+    copy_contents : list of list
+        The *_content values for new_records.
+    content_dict : dict
+        The updated content_dict.
+    """
+    new_records = []
+    new_record_dfs = []
+    new_inputfiles = []
+    copy_contents = []
+    for chunk in iter_testrecords(database, calculation, content_dict,
+                                  max_workers=max_workers, chunksize=chunksize,
+                                  **kwargs):
+        new_records.extend(chunk[0])
+        new_record_dfs.append(chunk[1])
+        new_inputfiles.extend(chunk[2])
+        copy_contents.extend(chunk[3])
+    
+    if len(new_record_dfs) > 0:
+        new_record_df = pd.concat(new_record_dfs, ignore_index=True, sort=False)
+    else:
+        new_record_df = pd.DataFrame()
+    
+    return new_records, new_record_df, new_inputfiles, copy_contents, content_dict
+
+def iter_testrecords(database, calculation, content_dict, max_workers=None,
+                     chunksize=500, **kwargs):
+    """
+    Builds the incomplete records for all combinations of the prepare
+    parameters in chunks.  Each chunk is a range of combination indices, so
+    the combinations are never all held in memory.  Large numbers of
+    combinations are built on a process pool, with only a few chunks per
+    process in progress at a time, and the chunks are yielded in
+    combination order.
+
+    Parameters
+    ----------
+    database : iprPy.database.Database
+        The database hosting the records referenced by the *_content
+        parameters.
+    calculation : iprPy.calculation.Calculation
+        The calculation being prepared.
+    content_dict : dict
+        Contains loaded record content.  Any referenced records not in
+        content_dict are fetched from the database and added.
+    max_workers : int, optional
+        The number of processes to use.  If not given, one process is used
+        for each chunk up to the number of CPUs.
+    chunksize : int, optional
+        The number of combinations in each chunk.  (Default is 500).
+    **kwargs : str or list
+        The filled prepare parameters.
+
+    Yields
+    ------
+    new_records : list of iprPy.Record
+        The valid incomplete records of the chunk.
+    new_record_df : pandas.DataFrame
+        The todict(full=False, flat=True) rows of new_records.
+    new_inputfiles : list of str
+        The calculation input file contents for new_records.
+    copy_contents : list of list
+        The *_content values for new_records.
+    """
 
     # Start calculation_dict with all singularkeys
     calculation_dict = {}
     for key in calculation.singularkeys:
         calculation_dict[key] = kwargs[key]
 
+    # Limit kwargs to the multikeys
+    multikwargs = {}
+    for keyset in calculation.multikeys:
+        for key in keyset:
+            multikwargs[key] = kwargs[key]
+
+    # Load all referenced records now so content_dict can be shared
+    for key in kwargs:
+        if key[-8:] == '_content':
+            for value in aslist(kwargs[key]):
+                terms = value.split()
+                if len(terms) > 1 and terms[0] == 'record' and terms[1] not in content_dict:
+                    content_dict[terms[1]] = database.get_record(name=terms[1]).content
+    content_json = {}
+    for record_name in content_dict:
+        content_json[record_name] = content_dict[record_name].json()
+
+    # Split combinations into chunks and set number of processes
+    numcombos = countmultidict(calculation.multikeys, **multikwargs)
+    chunks = [(start, min(start + chunksize, numcombos))
+              for start in range(0, numcombos, chunksize)]
+    if max_workers is None:
+        max_workers = min(os.cpu_count(), len(chunks))
+
+    # Build the chunks in this process
+    if max_workers <= 1 or len(chunks) <= 1:
+        for start, stop in chunks:
+            subdicts = itermultidict(calculation.multikeys, start=start,
+                                     stop=stop, **multikwargs)
+            yield testrecord_chunk_results(build_testrecord_chunk(
+                calculation, calculation_dict, subdicts, content_json))
+
+    # Build the chunks in a process pool
+    else:
+        initargs = (calculation.style, calculation_dict, multikwargs, content_json)
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_init_testrecord_worker,
+                                 initargs=initargs) as executor:
+            pending = deque()
+            for start, stop in chunks:
+                pending.append(executor.submit(_build_testrecord_chunk, start, stop))
+                if len(pending) >= 2 * max_workers:
+                    yield testrecord_chunk_results(pending.popleft().result())
+            while len(pending) > 0:
+                yield testrecord_chunk_results(pending.popleft().result())
+
+def testrecord_chunk_results(results):
+    """
+    Splits the results of build_testrecord_chunk into the records, their
+    todict(full=False, flat=True) rows, input files and content values.
+    """
     new_records = []
     new_record_df = []
     new_inputfiles = []
     copy_contents = []
+    for new_record, inputfile, copy_content in results:
+        new_records.append(new_record)
+        new_record_df.append(new_record.todict(full=False, flat=True))
+        new_inputfiles.append(inputfile)
+        copy_contents.append(copy_content)
     
+    return new_records, pd.DataFrame(new_record_df), new_inputfiles, copy_contents
+
+def build_testrecord_chunk(calculation, calculation_dict, subdicts, content_json):
+    """
+    Builds the incomplete records for a set of parameter combinations.
+
+    Parameters
+    ----------
+    calculation : iprPy.calculation.Calculation
+        The calculation being prepared.
+    calculation_dict : dict
+        The singular prepare parameters.
+    subdicts : iterable of dict
+        The multikey parameter combinations.
+    content_json : dict
+        The JSON content of all records referenced by the *_content
+        parameters.
+
+    Returns
+    -------
+    list of tuple
+        The (record, inputfile, copy_content) for each valid record.
+    """
+    calculation_dict = deepcopy(calculation_dict)
+    results = []
+
     # Iterate over multidict combinations
-    for subdict in itermultidict(calculation.multikeys, **kwargs):
+    for subdict in subdicts:
         calculation_dict.update(subdict)
         
         # Generate inputfile
@@ -217,53 +630,87 @@ def build_testrecords(database, calculation, content_dict, **kwargs):
                     terms = calculation_dict[key].split()
 
                     if terms[0] == 'record':
-                        record_name = terms[1]
-                        try:
-                            input_dict[key] = content_dict[record_name].json()
-                        except:
-                            crecord = database.get_record(name=record_name)
-                            input_dict[key] = crecord.content.json()
-                            content_dict[record_name] = crecord.content
+                        input_dict[key] = content_json[terms[1]]
 
         # Build incomplete record
-        #try:
         calculation.process_input(input_dict, calc_key, build=False)
-        #except:
-        #    continue
         
         new_record = load_record(style=calculation.record_style, name=calc_key)
         new_record.buildcontent('calc_' + calculation.style, input_dict)
 
         # Check if record is valid
         if new_record.isvalid():
-            new_records.append(new_record)
-            new_record_df.append(new_record.todict(full=False, flat=True))
-            new_inputfiles.append(inputfile)
-            copy_contents.append(copy_content)
-            
-    new_record_df = pd.DataFrame(new_record_df)
-    
-    return new_records, new_record_df, new_inputfiles, copy_contents, content_dict
+            results.append((new_record, inputfile, copy_content))
+
+    return results
+
+# Shared parameters of the process pool workers, set by _init_testrecord_worker
+_testrecord_worker = {}
+
+def _init_testrecord_worker(calculation_style, calculation_dict, multikwargs,
+                            content_json):
+    """Process pool initializer that stores the shared chunk parameters."""
+    _testrecord_worker['calculation'] = load_calculation(calculation_style)
+    _testrecord_worker['calculation_dict'] = calculation_dict
+    _testrecord_worker['multikwargs'] = multikwargs
+    _testrecord_worker['content_json'] = content_json
+
+def _build_testrecord_chunk(start, stop):
+    """Process pool wrapper for build_testrecord_chunk."""
+    calculation = _testrecord_worker['calculation']
+    subdicts = itermultidict(calculation.multikeys, start=start, stop=stop,
+                             **_testrecord_worker['multikwargs'])
+    return build_testrecord_chunk(calculation,
+                                  _testrecord_worker['calculation_dict'],
+                                  subdicts, _testrecord_worker['content_json'])
+
+def countmultidict(multikeys, **kwargs):
+    """
+    Returns the number of combinations generated by itermultidict.
+    """
+    numcombos = 1
+    for keyset in multikeys:
+        numcombos *= len(kwargs[keyset[0]])
+    return numcombos
 
-def itermultidict(multikeys, **kwargs):
+def itermultidict(multikeys, start=0, stop=None, **kwargs):
     """
     Generates each combination of kwargs by iterating over 
-    multikeys sets.
+    multikeys sets.  The combinations are ordered with the last keyset
+    varying fastest, and each combination is found from its index so that
+    any range of combinations can be generated directly.
+
+    Parameters
+    ----------
+    multikeys : list of list of str
+        The sets of keys whose values are iterated over together.
+    start : int, optional
+        The index of the first combination to generate.  Default value is 0.
+    stop : int, optional
+        The index to stop generating combinations at.  If not given, all
+        remaining combinations are generated.
+    **kwargs : list
+        The values for each key.
     """
-    # End recursion
-    if len(multikeys) == 0:
-        yield {}
-    else:
-        # Iterate over all options for first keyset
-        keyset = multikeys[0]
-        for i in range(len(kwargs[keyset[0]])):
-            multidict = {}
+    sizes = [len(kwargs[keyset[0]]) for keyset in multikeys]
+    numcombos = countmultidict(multikeys, **kwargs)
+    if stop is None or stop > numcombos:
+        stop = numcombos
+
+    for n in range(start, stop):
+        
+        # Convert the combination index to an index for each keyset
+        indices = []
+        for size in reversed(sizes):
+            n, i = divmod(n, size)
+            indices.append(i)
+        
+        multidict = {}
+        for keyset, i in zip(multikeys, reversed(indices)):
             for key in keyset:
                 multidict[key] = kwargs[key][i]
-            
-            # Recursively add subsequent keysets
-            for subdict in itermultidict(multikeys[1:], **kwargs):
-                yield merge_dicts(multidict, subdict)
+        
+        yield multidict
 
 def merge_dicts(dict1, dict2):
     """
@@ -273,18 +720,54 @@ def merge_dicts(dict1, dict2):
     newdict.update(dict2)
     return newdict
 
+def existing_records(database, record, script):
+    """
+    Builds a DuplicateIndex of the existing records of a calculation.  The
+    index is cached, and later calls only fetch the records that have been
+    added to the database since.  The index is rebuilt if any indexed
+    records are no longer in the database.
+
+    Parameters
+    ----------
+    database : iprPy.database.Database
+        The database hosting the records.
+    record : iprPy.record.Record
+        A record of the calculation's record style.
+    script : str
+        The calculation script name the records are limited to.
+
+    Returns
+    -------
+    DuplicateIndex
+        The index of the existing records.
+    """
+    cache_key = (database.style, str(database.host), record.style, script)
+    names = database.get_record_names(record.style)
+
+    # Reuse the cached index if all of its records still exist
+    if cache_key in _duplicate_indexes:
+        duplicates, checked = _duplicate_indexes[cache_key]
+        if duplicates.names.issubset(names):
+            new_names = names.difference(checked)
+            if len(new_names) > 0:
+                duplicates.add(database.get_records_df(name=list(new_names),
+                                                       style=record.style,
+                                                       full=False, flat=True,
+                                                       script=script))
+            _duplicate_indexes[cache_key] = (duplicates, names)
+            return duplicates
+
+    duplicates = DuplicateIndex(record.compare_terms, record.compare_fterms)
+    duplicates.add(database.get_records_df(style=record.style, full=False,
+                                           flat=True, script=script))
+    _duplicate_indexes[cache_key] = (duplicates, names)
+    return duplicates
+
 def new_calculations(old, test, dterms, fterms):
-    old_count = len(old)
-    allrecords = pd.concat([old, test], ignore_index=True)
-    
-    if 'a_mult' in dterms:
-        allrecords['a_mult'] = allrecords.a_mult2 - allrecords.a_mult1
-    if 'b_mult' in dterms:
-        allrecords['b_mult'] = allrecords.b_mult2 - allrecords.b_mult1
-    if 'c_mult' in dterms:
-        allrecords['c_mult'] = allrecords.c_mult2 - allrecords.c_mult1
-    
-    isdup = am.tools.duplicates_allclose(allrecords, dterms, fterms)
-    
-    isnew = ~isdup[old_count:].values
-    return test[isnew]
\ No newline at end of file
+    """
+    Returns the rows of test that do not duplicate rows of old or earlier
+    rows of test.
+    """
+    duplicates = DuplicateIndex(dterms, fterms)
+    duplicates.add(old)
+    return test[duplicates.new(test)]
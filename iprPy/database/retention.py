@@ -0,0 +1,194 @@
+# Standard Python libraries
+from pathlib import Path
+from fnmatch import fnmatchcase
+import hashlib
+import json
+import os
+
+# https://github.com/usnistgov/DataModelDict
+from DataModelDict import DataModelDict as DM
+
+__all__ = ['Retention', 'manifest_filename', 'file_hash']
+
+# Name of the file prepare uses to list the database files copied into a
+# calculation folder
+manifest_filename = '.prepared-files.json'
+
+def file_hash(path):
+    """
+    Returns the sha256 hex digest of a file's content.
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1048576), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+class Retention(object):
+    """
+    Rules for which files of a finished calculation are kept in its archive.
+    Files matching an exclude pattern are pruned unless they also match a
+    keep pattern, and files that prepare copied from database archives are
+    pruned if they are unchanged.  Files named in the calculation's results
+    record are always kept.  Patterns are matched against the paths relative
+    to the calculation folder using fnmatch, where '*' also matches '/'.
+    """
+
+    def __init__(self, exclude=None, keep=None, dedupe=True):
+        """
+        Initializes the rules.
+
+        Parameters
+        ----------
+        exclude : list of str, optional
+            Patterns of the files to prune.
+        keep : list of str, optional
+            Patterns of the files to keep even if they match exclude.
+        dedupe : bool, optional
+            If True (default), unchanged files copied from database archives
+            by prepare are pruned.
+        """
+        self.exclude = list(exclude) if exclude is not None else []
+        self.keep = list(keep) if keep is not None else []
+        self.dedupe = dedupe
+
+    @classmethod
+    def fromcalculation(cls, calculation, input_dict=None):
+        """
+        Builds the rules of a calculation.  The archive_exclude and
+        archive_keep patterns of the calculation class are replaced by the
+        patterns of the same name in the calculation's input, if given.
+
+        Parameters
+        ----------
+        calculation : iprPy.calculation.Calculation
+            The calculation.
+        input_dict : dict, optional
+            The parsed input file of the calculation.
+
+        Returns
+        -------
+        Retention
+            The rules.
+        """
+        if input_dict is None:
+            input_dict = {}
+        exclude = calculation.archive_exclude
+        keep = calculation.archive_keep
+        if input_dict.get('archive_exclude', '') != '':
+            exclude = input_dict['archive_exclude'].split()
+        if input_dict.get('archive_keep', '') != '':
+            keep = input_dict['archive_keep'].split()
+        return cls(exclude=exclude, keep=keep)
+
+    def select(self, calc_directory, content=None):
+        """
+        Finds the files of a calculation folder to prune.
+
+        Parameters
+        ----------
+        calc_directory : path-like object
+            The calculation folder.
+        content : DataModelDict, optional
+            The calculation's results record content.  Any files it names are
+            kept.
+
+        Returns
+        -------
+        list of DataModelDict
+            The audit entry of each file to prune, with the 'path' relative to
+            calc_directory, the 'size' in bytes, the 'reason' and, for
+            duplicates, the 'source' record.
+        """
+        calc_directory = Path(calc_directory)
+        protected = set()
+        if content is not None:
+            protected = referenced_files(content)
+
+        # Load the list of database files copied by prepare
+        manifest = {}
+        if self.dedupe:
+            try:
+                with open(Path(calc_directory, manifest_filename)) as f:
+                    manifest = json.load(f)
+            except (FileNotFoundError, ValueError):
+                pass
+
+        pruned = []
+        for root, dirs, files in os.walk(calc_directory):
+            dirs.sort()
+            for name in sorted(files):
+                path = Path(root, name)
+                relpath = path.relative_to(calc_directory).as_posix()
+                if relpath == manifest_filename or relpath in protected:
+                    continue
+
+                reason = None
+                source = None
+                if (any(fnmatchcase(relpath, p) for p in self.exclude) and
+                    not any(fnmatchcase(relpath, p) for p in self.keep)):
+                    reason = 'excluded'
+                elif relpath in manifest:
+                    source, sha256 = manifest[relpath]
+                    if file_hash(path) == sha256:
+                        reason = 'duplicate'
+
+                if reason is not None:
+                    entry = DM()
+                    entry['path'] = relpath
+                    entry['size'] = path.stat().st_size
+                    entry['reason'] = reason
+                    if reason == 'duplicate':
+                        entry['source'] = source
+                    pruned.append(entry)
+
+        return pruned
+
+    def apply(self, calc_directory, pruned):
+        """
+        Deletes the pruned files and prepare's list of copied files, and
+        removes any directories left empty.
+
+        Parameters
+        ----------
+        calc_directory : path-like object
+            The calculation folder.
+        pruned : list of DataModelDict
+            The entries returned by select.
+        """
+        calc_directory = Path(calc_directory)
+        manifest = Path(calc_directory, manifest_filename)
+        if manifest.is_file():
+            manifest.unlink()
+
+        parents = set()
+        for entry in pruned:
+            path = Path(calc_directory, entry['path'])
+            if path.is_file():
+                path.unlink()
+            parents.update(path.relative_to(calc_directory).parents)
+
+        # Remove emptied directories, deepest first
+        for parent in sorted(parents, key=lambda p: len(p.parts), reverse=True):
+            if len(parent.parts) > 0:
+                try:
+                    Path(calc_directory, parent).rmdir()
+                except OSError:
+                    pass
+
+def referenced_files(content):
+    """
+    Collects the str values of record content, which include the names of
+    any files in the calculation folder that the record refers to.
+    """
+    values = set()
+    stack = [content]
+    while len(stack) > 0:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, str):
+            values.add(Path(node).as_posix())
+    return values
@@ -4,18 +4,29 @@ import sys
 import subprocess
 import random
 import shutil
-import time
 import glob
+import uuid
+import time
 import datetime
+from concurrent.futures.process import BrokenProcessPool
 import requests
 
 # https://github.com/usnistgov/DataModelDict
 from DataModelDict import DataModelDict as DM
 
 # iprPy imports
-from .. import rootdir
+from .. import rootdir, load_calculation
+from ..input import parse
+from .claim import load_claim
+from .workqueue import load_queue
+from .workerpool import WorkerPool
+from .dependencies import Dependencies
+from .retention import Retention
+from .uploader import Uploader, removecalc
 
-def runner(dbase, run_directory, orphan_directory=None, hold_directory=None):
+def runner(dbase, run_directory, orphan_directory=None, hold_directory=None,
+           claim=None, lease=600, queue=None, warm_pool=False,
+           upload_backlog=2):
     """
     High-throughput calculation runner.
     
@@ -34,6 +45,32 @@ def runner(dbase, run_directory, orphan_directory=None, hold_directory=None):
         The path for the hold directory where tar archives that failed to be
         uploaded are moved to.  If None (default) then will use 'hold' at the
         same level as the run_directory.
+    claim : str or iprPy.database.claim.Claim, optional
+        The mechanism used to claim calculations so that multiple runners do
+        not work on the same calculation.  'file' (default) atomically
+        creates a claim file in the calculation directory, and 'mongo' stores
+        the claims in a mongo database.
+    lease : float, optional
+        The number of seconds a claim remains valid without being renewed.
+        Running calculations renew their claims, so this only limits how
+        long the claims of crashed runners block calculations. (Default is
+        600).
+    queue : str, bool or iprPy.database.workqueue.WorkQueue, optional
+        The work queue to pop calculations from: 'sqlite' or 'mongo'.  If
+        None (default), the sqlite queue is used if prepare created one in
+        run_directory.  When a queue is used, it also acts as the claim and
+        run_directory is not scanned.  False disables the queue.
+    warm_pool : bool, optional
+        If True, calculations are run in a worker process that has iprPy
+        preloaded rather than in a new Python subprocess.  Calculations whose
+        scripts cannot be called this way, or that crash the worker, are run
+        in a subprocess instead.  (Default is False).
+    upload_backlog : int, optional
+        The number of finished calculations that can wait to be uploaded
+        while the next calculation runs.  Record updates, archiving, upload
+        retries and folder removal are done in a background thread, and the
+        runner only waits for them if the backlog is full.  0 does the
+        uploads before starting the next calculation.  (Default is 2).
     """
     # Get path to Python executable running this script
     py_exe = sys.executable
@@ -43,6 +80,19 @@ def runner(dbase, run_directory, orphan_directory=None, hold_directory=None):
     # Get absolute path to run_directory
     run_directory = os.path.abspath(run_directory)
     
+    # Get claim manager, which is the work queue if one is used
+    queue = load_queue(dbase, run_directory, queue=queue, lease=lease)
+    if queue is not None:
+        claim = queue
+    else:
+        claim = load_claim(dbase, claim=claim, lease=lease)
+    
+    # Get the dependency graph written by prepare
+    dependencies = Dependencies(run_directory)
+    
+    # Calculation objects used for the archive retention rules of each style
+    retentions = {}
+    
     # Get original working directory
     original_dir = os.getcwd()
     
@@ -67,35 +117,62 @@ def runner(dbase, run_directory, orphan_directory=None, hold_directory=None):
     if hold_directory is None:
         hold_directory = os.path.join(os.path.dirname(run_directory), 'hold')
     
+    # Start the warm worker process
+    if warm_pool:
+        pool = WorkerPool()
+    else:
+        pool = None
+    
     # Start runner log file
     with open(log_file, 'a') as log:
         
         # Change to the run directory
         os.chdir(run_directory)
         
-        # Initialize bidfailcount counter
-        bidfailcount = 0
+        # Start the background uploader
+        uploader = Uploader(dbase, run_directory, hold_directory, claim, log,
+                            backlog=upload_backlog)
+        uploader.sweep()
         
         # Announce the runner's pid
         print(f'Runner started with pid {pid}', flush=True)
         
-        # flist is the running list of calculations
-        flist = os.listdir(run_directory)
-        while len(flist) > 0:
+        # Calculation to try first, used for unfinished parents
+        preferred = None
+        
+        # Calculations skipped for unfinished parents
+        deferred = set()
+        
+        # Seconds to wait before retrying deferred calculations
+        defer_wait = 1.0
+        
+        while True:
             
-            # Pick a random calculation from the list
-            index = random.randint(0, len(flist)-1)
-            sim = flist[index]
+            # Pop the next ready calculation from the queue
+            if queue is not None:
+                sim = queue.pop(exclude=deferred)
+                if sim is not None and not os.path.isdir(os.path.join(run_directory, sim)):
+                    uploader.write(sim, 'no calculation directory: removed from queue')
+                    queue.done(sim)
+                    continue
             
-            # Submit a bid and check if it succeeded
-            if bid(sim):
-                
-                # Reset bidfailcount
-                bidfailcount = 0
+            # Claim the first available calculation in a random order
+            else:
+                sim = next_calc(run_directory, claim, preferred, dependencies,
+                                deferred=deferred)
+                preferred = None
+            
+            if sim is not None:
                 
                 # Move to simulation directory
                 os.chdir(sim)
-                log.write('%s\n' % sim)
+                
+                # Finish the upload of a calculation that was already run
+                if uploader.pending(sim):
+                    os.chdir(run_directory)
+                    uploader.write(sim, 'resuming upload')
+                    uploader.submit(sim)
+                    continue
                 
                 # Check that the calculation has calc_*.py, calc_*.in and
                 # record in the database
@@ -110,15 +187,16 @@ def runner(dbase, run_directory, orphan_directory=None, hold_directory=None):
                 
                 # If not complete, zip and move to the orphan directory
                 except:
-                    log.write('Incomplete simulation: moved to orphan directory\n\n')
+                    uploader.write(sim, 'incomplete simulation: moved to orphan directory')
                     os.chdir(run_directory)
                     if not os.path.isdir(orphan_directory):
                         os.makedirs(orphan_directory)
                     shutil.make_archive(os.path.join(orphan_directory, sim),
                                         'gztar', root_dir=run_directory,
                                         base_dir=sim)
-                    removecalc(os.path.join(run_directory, sim))
-                    flist = os.listdir(run_directory)
+                    if not removecalc(os.path.join(run_directory, sim)):
+                        uploader.write(sim, 'failed to delete')
+                    claim.done(os.path.join(run_directory, sim))
                     continue
                 
                 # Check if any files in the calculation folder are incomplete
@@ -146,8 +224,7 @@ def runner(dbase, run_directory, orphan_directory=None, hold_directory=None):
                                     
                                     # Skip if parent calculation failed
                                     elif status == 'error':
-                                        with open(os.path.basename(fname), 'w') as f:
-                                            parent_record.content.json(fp=f, indent=4)
+                                        write_parent(fname, parent_record)
                                         error_flag = True
                                         error_message = 'parent calculation issued an error'
                                         break
@@ -158,9 +235,8 @@ def runner(dbase, run_directory, orphan_directory=None, hold_directory=None):
                                         
                                 # Copy parent record to calculation folder if it is now complete
                                 except:
-                                    with open(os.path.basename(fname), 'w') as f:
-                                        parent_record.content.json(fp=f, indent=4)
-                                    log.write('parent %s copied to sim folder\n' % parent_sim)
+                                    write_parent(fname, parent_record)
+                                    uploader.write(sim, 'parent %s copied to sim folder' % parent_sim)
                             
                             # skip if parent calculation failed
                             elif status == 'error':
@@ -172,20 +248,40 @@ def runner(dbase, run_directory, orphan_directory=None, hold_directory=None):
                 
                 # Handle calculations that have unfinished parents
                 if not ready_flag:
-                    bid_files = glob.glob('*.bid')
                     os.chdir(run_directory)
-                    for bid_file in bid_files:
-                        os.remove(os.path.join(sim, bid_file))
-                    flist = [parent_sim]
-                    log.write('parent %s not ready\n\n' % parent_sim)
+                    claim.release(os.path.join(run_directory, sim))
+                    preferred = parent_sim
+                    deferred.add(sim)
+                    uploader.write(sim, 'parent %s not ready' % parent_sim)
                     continue
                 
                 # Run the calculation
                 try:
                     assert not error_flag, error_message
-                    run = subprocess.Popen([py_exe, calc_py, calc_in, sim],
-                                           stderr=subprocess.PIPE)
-                    error_message = run.stderr.read()
+                    sim_path = os.path.join(run_directory, sim)
+                    
+                    # Run in the warm worker if possible
+                    error_message = None
+                    if pool is not None and pool.supports(calc_py):
+                        try:
+                            error_message = pool.run(calc_py, [calc_in, sim], sim_path,
+                                                     interval=claim.lease / 2,
+                                                     renew=lambda: claim.renew(sim_path))
+                        except BrokenProcessPool:
+                            uploader.write(sim, 'worker crashed: rerunning in subprocess')
+                    
+                    # Run in a new subprocess
+                    if error_message is None:
+                        run = subprocess.Popen([py_exe, calc_py, calc_in, sim],
+                                               stderr=subprocess.PIPE)
+                        
+                        # Renew the claim while the calculation runs
+                        while True:
+                            try:
+                                error_message = run.communicate(timeout=claim.lease / 2)[1]
+                                break
+                            except subprocess.TimeoutExpired:
+                                claim.renew(sim_path)
                     
                     # Load results.json
                     try:
@@ -195,7 +291,7 @@ def runner(dbase, run_directory, orphan_directory=None, hold_directory=None):
                     except:
                         error_flag = True
                     assert not error_flag, error_message
-                    log.write('sim calculated successfully\n')
+                    uploader.write(sim, 'sim calculated successfully')
                 
                 # Catch any errors and build results.json
                 except:
@@ -206,94 +302,122 @@ def runner(dbase, run_directory, orphan_directory=None, hold_directory=None):
                     model[record_type]['error'] = str(sys.exc_info()[1])
                     with open('results.json', 'w') as f:
                         model.json(fp=f, indent=4)
-                    log.write('error: %s\n' % model[record_type]['error'])
+                    uploader.write(sim, 'error: %s' % model[record_type]['error'])
                 
-                # Update record
-                tries = 0
-                while tries < 10:
+                # Identify files to leave out of the archive and list them
+                # in the record
+                sim_path = os.path.join(run_directory, sim)
+                pruned = []
+                keys = list(model.keys())
+                if model[keys[0]].get('status', 'finished') != 'error':
                     try:
-                        dbase.update_record(content=model, name=sim)
-                        break
+                        retention = load_retention(calc_py, calc_in, retentions)
+                        pruned = retention.select(sim_path, model)
                     except:
-                        tries += 1
-                if tries == 10:
-                    os.chdir(run_directory)
-                    log.write('failed to update record\n')
-                else:
-                    # Archive calculation and add to database or hold_directory
-                    try:
-                        dbase.add_tar(root_dir=run_directory, name=sim)
-                    except:
-                        log.write('failed to upload archive\n')
-                        if not os.path.isdir(hold_directory):
-                            os.makedirs(hold_directory)
-                        shutil.move(sim+'.tar.gz', hold_directory)
-                    os.chdir(run_directory)
-                    removecalc(os.path.join(run_directory, sim))
-                log.write('\n')
-            
-            # Else if bid(sim) failed
-            else:
-                bidfailcount += 1
+                        uploader.write(sim, 'failed to apply retention rules: %s' % sys.exc_info()[1])
+                        pruned = []
+                if len(pruned) > 0:
+                    model[keys[0]]['pruned-files'] = DM()
+                    for entry in pruned:
+                        model[keys[0]]['pruned-files'].append('pruned-file', entry)
+                    uploader.write(sim, '%i files pruned from archive' % len(pruned))
                 
-                # Stop unproductive worker after 10 consecutive bid fails
-                if bidfailcount > 10:
-                    print("Didn't find an open simulation", flush=True)
-                    break
+                # Update record, archive and clean up in the background
+                os.chdir(run_directory)
+                uploader.submit(sim, model, pruned)
+                uploader.write(sim, 'sim handed to uploader')
                 
-                # Pause for 10 seconds before trying again
-                time.sleep(10)
+                # Recheck deferred calculations after each run
+                deferred.clear()
+                defer_wait = 1.0
+            
+            # Uploads in progress may finish parents of waiting calculations
+            elif uploader.busy():
+                uploader.wait()
+                deferred.clear()
+                continue
+            
+            # Give other runners time to finish the parents of deferred
+            # calculations before checking them again
+            elif len(deferred) > 0:
+                time.sleep(defer_wait)
+                defer_wait = min(2 * defer_wait, 60.0)
+                deferred.clear()
+                continue
             
-            # Regenerate flist and flush log file
-            flist = os.listdir(run_directory)
-            log.flush()
-            os.fsync(log.fileno())
+            # Stop when a full pass finds nothing left to claim
+            else:
+                break
+            
+            # Flush log file
+            uploader.flush(sync=True)
+        
+        # Finish the remaining uploads
+        uploader.close()
         print('No simulations left to run', flush=True)
         os.chdir(original_dir)
+    
+    if pool is not None:
+        pool.shutdown()
 
-def bid(sim):
+def next_calc(run_directory, claim, preferred=None, dependencies=None,
+              deferred=None):
     """
-    Bids for the chance to run a calculation instance. Used to help avoid
-    runner collisions.
+    Claims the next calculation to run.  The calculation instance
+    directories are tried in a random order until a claim succeeds.  If a
+    dependency graph is given, calculations with unfinished parents are
+    skipped and the parents with the longest chains of waiting children are
+    tried first.
     
     Parameters
     ----------
-    sim : str
-        The path to the calculation to try bidding on.
+    run_directory : str
+        The path to the directory where the calculation instances to run are
+        located.
+    claim : iprPy.database.claim.Claim
+        The claim manager to use.
+    preferred : str, optional
+        The name of a calculation to try before all others.
+    dependencies : iprPy.database.dependencies.Dependencies, optional
+        The dependency graph of the run directory's calculations.
+    deferred : set of str, optional
+        The names of calculations to skip, which were recently found to
+        have unfinished parents.
         
     Returns
     -------
-    bool
-        True if bidding is successful, False if bidding fails.
+    str or None
+        The name of the claimed calculation, or None if no calculations
+        could be claimed.
     """
-    try:
-        # Wait to make sure sim is not being deleted
-        time.sleep(1)
-        
-        # Check if bid already exists
-        for fname in os.listdir(sim):
-            if fname[-4:] == '.bid':
-                return False
-        
-        # Place a bid
-        pid = os.getpid()
-        with open(os.path.join(sim, str(pid)+'.bid'), 'w') as f:
-            f.write('bid for pid: %i' % pid)
-        
-        # Wait to make sure all bids are in
-        time.sleep(1)
-        
-        # Check bids
-        bids = []
-        for fname in os.listdir(sim):
-            if fname[-4:] == '.bid':
-                bids.append(int(fname[:-4]))
-        if min(bids) == pid:
-            return True
-        else:
-            return False
-    except:
-        return False
+    # List calculation directories, skipping hidden ones being removed
+    flist = []
+    with os.scandir(run_directory) as entries:
+        for entry in entries:
+            if entry.name[0] != '.' and entry.is_dir():
+                if deferred is None or entry.name not in deferred:
+                    flist.append(entry.name)
+    random.shuffle(flist)
+    
+    # Keep only ready calculations, longest dependency chains first
+    if dependencies is not None:
+        flist = dependencies.order(flist, pending=set(flist))
+    
+    # Try preferred first
+    if preferred in flist:
+        flist.remove(preferred)
+        flist.insert(0, preferred)
+    
+    for sim in flist:
+        path = os.path.join(run_directory, sim)
+        if claim.acquire(path):
+            
+            # Check that sim was not removed before it was claimed
+            if os.path.isdir(path):
+                return sim
+            claim.release(path)
+    
+    return None
 
 def get_file(path):
     """
@@ -326,47 +450,41 @@ def get_file(path):
     else:
         raise ValueError('Multiple files found matching '+ path)
 
-def removecalc(dir):
+def load_retention(calc_py, calc_in, calculations):
     """
-    Removes the specified calculation instance directory leaving .bid files
-    for last to help avoid runner collisions.
+    Builds the archive retention rules for a calculation from its style's
+    Calculation class and its input file.
     
     Parameters
     ----------
-    dir : str
-        The path to the calculation instance directory to delete.
-    """
+    calc_py : str
+        The name of the calculation's calc_*.py script.
+    calc_in : str
+        The path to the calculation's input file.
+    calculations : dict
+        Calculation objects already loaded, keyed by style.  New styles are
+        added to it.
     
-    # Loop over all files and directories in dir
-    for fname in glob.iglob(os.path.join(dir, '*')):
-        
-        # If fname is a directory, try rmtree up to 10 times
-        if os.path.isdir(fname):
-            tries = 0
-            while tries < 10:
-                try:
-                    shutil.rmtree(fname)
-                    break
-                except:
-                    tries += 1
-        
-        # If fname is a non-.bid file, try remove up to 10 times
-        elif os.path.isfile(fname) and fname[-4:] != '.bid':
-            tries = 0
-            while tries < 10:
-                try:
-                    os.remove(fname)
-                    break
-                except:
-                    tries += 1
-    
-    # Use rmtree on remaining content (hopefully only *.bid and the dir folder)
-    tries = 0
-    while tries < 10:
-        try:
-            shutil.rmtree(dir)
-            break
-        except:
-            tries += 1
-            if tries == 10:
-                print('failed to delete', os.path.basename(dir), flush=True)
\ No newline at end of file
+    Returns
+    -------
+    iprPy.database.retention.Retention
+        The rules.
+    """
+    style = os.path.splitext(os.path.basename(calc_py))[0][5:]
+    if style not in calculations:
+        calculations[style] = load_calculation(style)
+    input_dict = parse(calc_in)
+    return Retention.fromcalculation(calculations[style], input_dict)
+
+def write_parent(fname, parent_record):
+    """
+    Replaces a parent record file with the record's current content.  The new
+    content is written to a temporary file that is then moved into place, so
+    files that prepare hard linked across calculation folders are replaced
+    rather than modified.
+    """
+    fname = os.path.basename(fname)
+    tempname = f'.{fname}.{uuid.uuid4()}'
+    with open(tempname, 'w') as f:
+        parent_record.content.json(fp=f, indent=4)
+    os.replace(tempname, fname)
@@ -0,0 +1,390 @@
+# Standard Python libraries
+import os
+import sys
+import json
+import uuid
+import time
+import random
+import shutil
+import threading
+import queue
+
+# https://github.com/usnistgov/DataModelDict
+from DataModelDict import DataModelDict as DM
+
+# iprPy imports
+from .retention import Retention
+
+__all__ = ['Uploader', 'removecalc']
+
+class Uploader(object):
+    """
+    Uploads the results of finished calculations in a background thread so
+    that the runner can start its next calculation right away.  For each
+    calculation the record is updated, the retention rules are applied, the
+    folder is archived to the database (or to the hold directory if that
+    keeps failing) and the folder is removed.  Failed database operations are
+    retried with exponential backoff.
+
+    Delivery is at least once: a pending marker holding the results is saved
+    in run_directory/.pending-uploads before a calculation is handed over,
+    and is only deleted once its folder is removed.  A runner that claims a
+    calculation with a marker resumes its upload rather than running it
+    again.  The claims on submitted calculations are renewed by a separate
+    thread every half lease until they are done, so that long uploads do not
+    let them expire.
+    """
+
+    dirname = '.pending-uploads'
+
+    def __init__(self, dbase, run_directory, hold_directory, claim, log,
+                 backlog=2, tries=10, backoff=1.0, max_backoff=60.0):
+        """
+        Initializes the uploader and starts its thread.
+
+        Parameters
+        ----------
+        dbase : iprPy.Database
+            The database to upload to.
+        run_directory : str
+            The path to the directory where the calculation instances are
+            located.
+        hold_directory : str
+            The path for the hold directory where archives that failed to be
+            uploaded are saved.
+        claim : iprPy.database.claim.Claim
+            The claim manager holding the calculations.
+        log : file-like object
+            The open runner log file.  The runner's own lines must be written
+            with write so that they do not interleave with the uploader's.
+        backlog : int, optional
+            The number of finished calculations that can wait for upload.
+            submit blocks while the backlog is full.  If 0, uploads are done
+            by submit itself without a background thread.  (Default is 2).
+        tries : int, optional
+            The number of attempts of each database operation.  (Default is
+            10).
+        backoff : float, optional
+            The seconds to wait after the first failed attempt.  The wait is
+            doubled after each failure.  (Default is 1.0).
+        max_backoff : float, optional
+            The longest wait between attempts in seconds.  (Default is 60.0).
+        """
+        self.__dbase = dbase
+        self.__run_directory = os.path.abspath(run_directory)
+        self.__hold_directory = os.path.abspath(hold_directory)
+        self.__claim = claim
+        self.__log = log
+        self.__tries = tries
+        self.__backoff = backoff
+        self.__max_backoff = max_backoff
+
+        # Calculations submitted and not yet done
+        self.__pending = set()
+        self.__lock = threading.Lock()
+
+        # Guards the log, which is shared with the runner
+        self.__log_lock = threading.Lock()
+
+        # Renew claims independently of the upload progress
+        self.__stop = threading.Event()
+        self.__renewer = threading.Thread(target=self._renew_loop, daemon=True,
+                                          name='iprPy-claim-renewer')
+        self.__renewer.start()
+
+        if backlog > 0:
+            self.__queue = queue.Queue(maxsize=backlog)
+            # A daemon thread does not keep a failed runner alive, and
+            # its unfinished uploads are resumed from their markers
+            self.__thread = threading.Thread(target=self._run, daemon=True,
+                                             name='iprPy-uploader')
+            self.__thread.start()
+        else:
+            self.__queue = None
+            self.__thread = None
+
+    @property
+    def directory(self):
+        """str: The directory where the pending markers are saved."""
+        return os.path.join(self.__run_directory, self.dirname)
+
+    def marker_path(self, sim):
+        """Returns the path to the pending marker of a calculation."""
+        return os.path.join(self.directory, f'{sim}.json')
+
+    def pending(self, sim):
+        """bool: True if a calculation has results waiting to be uploaded."""
+        return os.path.isfile(self.marker_path(sim))
+
+    def busy(self):
+        """bool: True if submitted calculations are not yet done."""
+        with self.__lock:
+            return len(self.__pending) > 0
+
+    def sweep(self):
+        """
+        Deletes the pending markers of calculations whose folders no longer
+        exist, which are left if a runner stopped between removing a folder
+        and deleting its marker.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for fname in os.listdir(self.directory):
+            sim, ext = os.path.splitext(fname)
+            if ext == '.json' and not os.path.isdir(os.path.join(self.__run_directory, sim)):
+                try:
+                    os.remove(os.path.join(self.directory, fname))
+                except OSError:
+                    pass
+
+    def submit(self, sim, model=None, pruned=None):
+        """
+        Hands a claimed calculation over to be uploaded.
+
+        Parameters
+        ----------
+        sim : str
+            The name of the calculation.
+        model : DataModelDict, optional
+            The results record content.  If not given, the upload saved in
+            the calculation's pending marker is resumed.
+        pruned : list, optional
+            The files to prune from the archive, as returned by
+            iprPy.database.retention.Retention.select.
+        """
+        if model is not None:
+            if pruned is None:
+                pruned = []
+            marker = {'model': model.json(), 'pruned': pruned, 'stage': 'record'}
+            self._save_marker(sim, marker)
+
+        with self.__lock:
+            self.__pending.add(sim)
+
+        if self.__queue is None:
+            self._upload(sim)
+        else:
+            self.__queue.put(sim)
+
+    def wait(self):
+        """Blocks until all submitted calculations are done."""
+        if self.__queue is not None:
+            self.__queue.join()
+
+    def close(self):
+        """Finishes the submitted uploads and stops the threads."""
+        if self.__thread is not None:
+            self.__queue.put(None)
+            self.__thread.join()
+            self.__thread = None
+        if self.__renewer is not None:
+            self.__stop.set()
+            self.__renewer.join()
+            self.__renewer = None
+
+    def _run(self):
+        """Uploads submitted calculations until closed."""
+        while True:
+            sim = self.__queue.get()
+            try:
+                if sim is None:
+                    break
+                self._upload(sim)
+            finally:
+                self.__queue.task_done()
+
+    def _upload(self, sim):
+        """Uploads one calculation, logging rather than raising any errors."""
+        try:
+            self.upload(sim)
+        except:
+            self.write(sim, 'upload error: %s' % sys.exc_info()[1])
+            try:
+                self.__claim.release(os.path.join(self.__run_directory, sim))
+            except:
+                pass
+        finally:
+            with self.__lock:
+                self.__pending.discard(sim)
+            try:
+                self.flush()
+            except:
+                pass
+
+    def upload(self, sim):
+        """
+        Uploads one calculation from its pending marker.
+
+        Parameters
+        ----------
+        sim : str
+            The name of the calculation.
+        """
+        sim_path = os.path.join(self.__run_directory, sim)
+        with open(self.marker_path(sim)) as f:
+            marker = json.load(f)
+
+        # Update record
+        if marker['stage'] == 'record':
+            model = DM(marker['model'])
+            if not self._retry(sim, lambda: self.__dbase.update_record(content=model,
+                                                                       name=sim)):
+                self.write(sim, 'failed to update record')
+                self.__claim.release(sim_path)
+                return
+            self.write(sim, 'record updated')
+
+            Retention().apply(sim_path, marker['pruned'])
+            marker['stage'] = 'archive'
+            self._save_marker(sim, marker)
+            replace = False
+
+        # Replace any archive left by an interrupted upload
+        else:
+            replace = True
+
+        # Archive calculation and add to database
+        def add_tar():
+            nonlocal replace
+            if replace:
+                try:
+                    self.__dbase.delete_tar(name=sim)
+                except:
+                    pass
+            replace = True
+            self.__dbase.add_tar(root_dir=self.__run_directory, name=sim)
+
+        if self._retry(sim, add_tar):
+            self.write(sim, 'archive uploaded')
+
+        # Save the archive to hold_directory instead
+        else:
+            self.write(sim, 'failed to upload archive')
+            try:
+                if not os.path.isdir(self.__hold_directory):
+                    os.makedirs(self.__hold_directory)
+                shutil.make_archive(os.path.join(self.__hold_directory, sim),
+                                    'gztar', root_dir=self.__run_directory,
+                                    base_dir=sim)
+            except:
+                self.write(sim, 'failed to save archive to hold directory')
+                self.__claim.release(sim_path)
+                return
+
+        if not removecalc(sim_path):
+            self.write(sim, 'failed to delete')
+        self.__claim.done(sim_path)
+        try:
+            os.remove(self.marker_path(sim))
+        except OSError:
+            pass
+
+    def _retry(self, sim, func):
+        """
+        Calls func until it succeeds, up to tries times, waiting with
+        exponential backoff and jitter between attempts.
+
+        Returns
+        -------
+        bool
+            True if func succeeded.
+        """
+        delay = self.__backoff
+        for attempt in range(self.__tries):
+            try:
+                func()
+                return True
+            except:
+                if attempt == self.__tries - 1:
+                    self.write(sim, 'attempt %i failed: %s' % (attempt + 1, sys.exc_info()[1]))
+                    break
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                delay = min(2 * delay, self.__max_backoff)
+        return False
+
+    def _renew_loop(self):
+        """Renews the claims of submitted calculations until closed."""
+        while not self.__stop.wait(self.__claim.lease / 2):
+            self._renew()
+
+    def _renew(self):
+        """Renews the claims of submitted calculations."""
+        with self.__lock:
+            sims = list(self.__pending)
+        for sim in sims:
+            try:
+                self.__claim.renew(os.path.join(self.__run_directory, sim))
+            except:
+                pass
+
+    def _save_marker(self, sim, marker):
+        """Saves a pending marker, replacing any existing one."""
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+        path = self.marker_path(sim)
+        tempname = os.path.join(self.directory, f'.{sim}.{uuid.uuid4()}')
+        with open(tempname, 'w') as f:
+            json.dump(marker, f)
+        os.replace(tempname, path)
+
+    def write(self, sim, message):
+        """
+        Adds a line to the runner log.
+
+        Parameters
+        ----------
+        sim : str
+            The name of the calculation that the line is about.
+        message : str
+            The line's text.
+        """
+        with self.__log_lock:
+            self.__log.write('%s: %s\n' % (sim, message))
+
+    def flush(self, sync=False):
+        """
+        Flushes the runner log.
+
+        Parameters
+        ----------
+        sync : bool, optional
+            If True, the log is also synced to disk.  Default value is False.
+        """
+        with self.__log_lock:
+            self.__log.flush()
+            if sync:
+                os.fsync(self.__log.fileno())
+
+def removecalc(dir):
+    """
+    Removes the specified calculation instance directory.  The directory is
+    first renamed to a hidden name so that other runners no longer see it as
+    a calculation to claim.
+
+    Parameters
+    ----------
+    dir : str
+        The path to the calculation instance directory to delete.
+
+    Returns
+    -------
+    bool
+        False if the directory could not be deleted.
+    """
+
+    # Hide the directory from other runners
+    hidden = os.path.join(os.path.dirname(dir),
+                          f'.{os.path.basename(dir)}.{uuid.uuid4().hex}.removing')
+    try:
+        os.rename(dir, hidden)
+    except OSError:
+        hidden = dir
+
+    # Try rmtree up to 10 times
+    for tries in range(10):
+        try:
+            shutil.rmtree(hidden)
+            return True
+        except:
+            pass
+    return False
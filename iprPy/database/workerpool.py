@@ -0,0 +1,151 @@
+# Standard Python libraries
+from pathlib import Path
+import os
+import sys
+import tempfile
+import traceback
+import importlib.util
+from contextlib import redirect_stderr
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+__all__ = ['WorkerPool']
+
+class WorkerPool(object):
+    """
+    A warm pool of worker processes with iprPy preloaded for running
+    calculation scripts.  The scripts' main functions are called directly in
+    the workers, avoiding the cost of starting a new Python interpreter and
+    re-importing iprPy and its dependencies for every calculation.
+    """
+
+    def __init__(self, max_workers=1):
+        """
+        Starts the worker processes.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            The number of worker processes.  (Default is 1).
+        """
+        self.__max_workers = max_workers
+        self.__executor = None
+        self.start()
+
+    def start(self):
+        """Starts a new executor, replacing any existing one."""
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False)
+        self.__executor = ProcessPoolExecutor(max_workers=self.__max_workers,
+                                              initializer=_preload)
+        
+        # Spawn the workers now so the imports happen in the background
+        for i in range(self.__max_workers):
+            self.__executor.submit(_preload)
+
+    def shutdown(self):
+        """Stops the worker processes."""
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    @staticmethod
+    def supports(calc_py):
+        """
+        Checks if a calculation script can be run by the pool.  Only scripts
+        that call main with the command line arguments can be run this way.
+
+        Parameters
+        ----------
+        calc_py : path-like object
+            The calculation script.
+
+        Returns
+        -------
+        bool
+            True if the script can be run by the pool.
+        """
+        with open(calc_py) as f:
+            return 'main(*sys.argv[1:])' in f.read()
+
+    def run(self, calc_py, args, cwd, interval=None, renew=None):
+        """
+        Runs a calculation script's main function in a worker process.
+
+        Parameters
+        ----------
+        calc_py : path-like object
+            The calculation script.
+        args : list of str
+            The arguments to pass to main.
+        cwd : path-like object
+            The directory to run the calculation in.
+        interval : float, optional
+            If given with renew, renew is called every interval seconds while
+            the calculation runs.
+        renew : callable, optional
+            Function to call periodically while the calculation runs.
+
+        Returns
+        -------
+        str
+            Anything written to stderr by the calculation, including by
+            extension modules and child processes, along with the traceback
+            if it raised an error.
+
+        Raises
+        ------
+        concurrent.futures.process.BrokenProcessPool
+            If the worker process crashed.  The pool is restarted before the
+            error is raised.
+        """
+        future = self.__executor.submit(_run, os.path.abspath(calc_py),
+                                        list(args), os.path.abspath(cwd))
+        try:
+            while True:
+                try:
+                    return future.result(timeout=interval)
+                except TimeoutError:
+                    if renew is not None:
+                        renew()
+        except BrokenProcessPool:
+            self.start()
+            raise
+
+def _preload():
+    """Worker initializer that imports iprPy and its dependencies."""
+    import iprPy #pylint: disable=unused-import
+
+def _run(calc_py, args, cwd):
+    """
+    Runs a calculation script's main function in the worker.  File
+    descriptor 2 is redirected to a temporary file during the call so that
+    writes to it by extension modules and child processes are captured along
+    with sys.stderr.
+    """
+    os.chdir(cwd)
+    with tempfile.TemporaryFile() as capture:
+        sys.stderr.flush()
+        saved = os.dup(2)
+        os.dup2(capture.fileno(), 2)
+        try:
+            with open(2, 'w', buffering=1, closefd=False) as stderr:
+                with redirect_stderr(stderr):
+                    try:
+                        spec = importlib.util.spec_from_file_location(Path(calc_py).stem, calc_py)
+                        module = importlib.util.module_from_spec(spec)
+                        spec.loader.exec_module(module)
+                        module.main(*args)
+                    except BaseException:
+                        traceback.print_exc()
+        finally:
+            os.dup2(saved, 2)
+            os.close(saved)
+        capture.seek(0)
+        return capture.read().decode('UTF-8', errors='replace')
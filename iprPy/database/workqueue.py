@@ -0,0 +1,473 @@
+# Standard Python libraries
+from pathlib import Path
+import os
+import time
+import datetime
+import sqlite3
+from contextlib import contextmanager
+
+# iprPy imports
+from .claim import Claim
+
+__all__ = ['WorkQueue', 'SQLiteQueue', 'MongoQueue', 'load_queue']
+
+class WorkQueue(Claim):
+    """
+    Base class for the work queues that prepare fills and runners pop
+    calculations from.  Each queued calculation has a priority and a count
+    of the queued parent calculations it is still waiting on.  Popping a
+    calculation claims it, so a queue is also used as the runner's Claim.
+    """
+
+    def enqueue(self, items):
+        """
+        Adds calculations to the queue.
+
+        Parameters
+        ----------
+        items : list of tuple
+            Each item is (name, parents, priority), where name is the
+            calculation's name, parents is a list of the names of records the
+            calculation depends on, and priority is a number where larger
+            values are popped first.  Parents that are not in the queue are
+            treated as finished.
+        """
+        raise AttributeError('enqueue not defined for WorkQueue style')
+
+    def pop(self, exclude=None):
+        """
+        Claims the highest priority calculation that is not waiting on
+        parents.
+
+        Parameters
+        ----------
+        exclude : list of str, optional
+            Names of calculations not to pop.
+
+        Returns
+        -------
+        str or None
+            The name of the claimed calculation, or None if no calculations
+            are ready.
+        """
+        raise AttributeError('pop not defined for WorkQueue style')
+
+class SQLiteQueue(WorkQueue):
+    """
+    Work queue stored in a SQLite file in the run directory.
+    """
+
+    filename = '.queue.sqlite'
+
+    def __init__(self, run_directory, lease=600):
+        """
+        Initializes the queue for a run directory.
+
+        Parameters
+        ----------
+        run_directory : path-like object
+            The run directory containing the queue file.
+        lease : float, optional
+            The number of seconds a claim remains valid without being renewed.
+            (Default is 600).
+        """
+        super().__init__(lease=lease)
+        self.__path = Path(run_directory, self.filename)
+
+    @property
+    def path(self):
+        """pathlib.Path: The path to the queue file."""
+        return self.__path
+
+    @contextmanager
+    def connect(self):
+        """
+        Opens a connection to the queue file and starts a write transaction,
+        creating the tables if needed.  The transaction is committed and the
+        connection closed on exit.
+
+        Yields
+        ------
+        sqlite3.Connection
+            The open connection.
+        """
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('CREATE TABLE IF NOT EXISTS queue '
+                         '(name TEXT PRIMARY KEY, priority REAL, status TEXT, '
+                         'blocked INTEGER, owner TEXT, expires REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ready ON queue '
+                         '(blocked, status, priority)')
+            conn.execute('CREATE TABLE IF NOT EXISTS parents '
+                         '(child TEXT, parent TEXT)')
+            conn.execute('CREATE INDEX IF NOT EXISTS parent ON parents (parent)')
+            try:
+                yield conn
+            except:
+                conn.execute('ROLLBACK')
+                raise
+            else:
+                conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def enqueue(self, items):
+        """
+        Adds calculations to the queue.
+
+        Parameters
+        ----------
+        items : list of tuple
+            Each item is (name, parents, priority), where name is the
+            calculation's name, parents is a list of the names of records the
+            calculation depends on, and priority is a number where larger
+            values are popped first.  Parents that are not in the queue are
+            treated as finished.
+        """
+        with self.connect() as conn:
+            for name, parents, priority in items:
+                blocked = 0
+                for parent in parents:
+                    if conn.execute('SELECT 1 FROM queue WHERE name=?',
+                                    (parent,)).fetchone() is not None:
+                        conn.execute('INSERT INTO parents VALUES (?, ?)',
+                                     (name, parent))
+                        blocked += 1
+                conn.execute("INSERT OR REPLACE INTO queue VALUES "
+                             "(?, ?, 'pending', ?, NULL, NULL)",
+                             (name, priority, blocked))
+
+    def pop(self, exclude=None):
+        """
+        Claims the highest priority calculation that is not waiting on
+        parents.  Running calculations whose leases have expired are
+        included.
+
+        Parameters
+        ----------
+        exclude : list of str, optional
+            Names of calculations not to pop.
+
+        Returns
+        -------
+        str or None
+            The name of the claimed calculation, or None if no calculations
+            are ready.
+        """
+        if exclude is None:
+            exclude = []
+        exclude = list(exclude)
+        marks = ', '.join('?' * len(exclude))
+        now = time.time()
+
+        with self.connect() as conn:
+            row = conn.execute("SELECT name FROM queue WHERE blocked=0 AND "
+                               "(status='pending' OR (status='running' AND expires<?)) "
+                               f"AND name NOT IN ({marks}) "
+                               "ORDER BY priority DESC LIMIT 1",
+                               [now] + exclude).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE queue SET status='running', owner=?, expires=? "
+                         "WHERE name=?", (self.owner, now + self.lease, row[0]))
+        return row[0]
+
+    def acquire(self, sim):
+        """
+        Attempts to claim a specific calculation.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+
+        Returns
+        -------
+        bool
+            True if the claim was placed, False if the calculation is not
+            ready or already claimed by another owner.
+        """
+        now = time.time()
+        with self.connect() as conn:
+            cursor = conn.execute("UPDATE queue SET status='running', owner=?, expires=? "
+                                  "WHERE name=? AND blocked=0 AND "
+                                  "(status='pending' OR (status='running' AND expires<?))",
+                                  (self.owner, now + self.lease,
+                                   os.path.basename(sim), now))
+        return cursor.rowcount == 1
+
+    def renew(self, sim):
+        """
+        Extends the lease on a held claim.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        with self.connect() as conn:
+            conn.execute('UPDATE queue SET expires=? WHERE name=? AND owner=?',
+                         (time.time() + self.lease, os.path.basename(sim),
+                          self.owner))
+
+    def release(self, sim):
+        """
+        Returns a held calculation to the queue.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        with self.connect() as conn:
+            conn.execute("UPDATE queue SET status='pending', owner=NULL, expires=NULL "
+                         "WHERE name=? AND owner=?",
+                         (os.path.basename(sim), self.owner))
+
+    def done(self, sim):
+        """
+        Removes a finished calculation from the queue and unblocks the
+        calculations waiting on it.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        name = os.path.basename(sim)
+        with self.connect() as conn:
+            cursor = conn.execute('DELETE FROM queue WHERE name=?', (name,))
+            if cursor.rowcount == 1:
+                conn.execute('UPDATE queue SET blocked=blocked-1 WHERE name IN '
+                             '(SELECT child FROM parents WHERE parent=?)', (name,))
+                conn.execute('DELETE FROM parents WHERE parent=? OR child=?',
+                             (name, name))
+
+class MongoQueue(WorkQueue):
+    """
+    Work queue stored in a Mongo collection.  Multiple queues can share the
+    collection as each document is tagged with the queue's name.
+    """
+
+    def __init__(self, mongodb, name, lease=600, collection='runner_queue'):
+        """
+        Initializes the queue.
+
+        Parameters
+        ----------
+        mongodb : pymongo.database.Database
+            The Mongo database to store the queue in.
+        name : str
+            The name of the queue, typically the run directory's name.
+        lease : float, optional
+            The number of seconds a claim remains valid without being renewed.
+            (Default is 600).
+        collection : str, optional
+            The name of the collection to store the queue in.  (Default is
+            'runner_queue').
+        """
+        super().__init__(lease=lease)
+        self.__name = name
+        self.__collection = mongodb[collection]
+        self.__collection.create_index([('queue', 1), ('blocked', 1),
+                                        ('status', 1), ('priority', -1)])
+        self.__collection.create_index('parents')
+
+    @property
+    def name(self):
+        """str: The name of the queue."""
+        return self.__name
+
+    @property
+    def collection(self):
+        """pymongo.collection.Collection: The queue collection."""
+        return self.__collection
+
+    def expires(self):
+        """datetime.datetime: The expiration time for a new or renewed claim."""
+        return datetime.datetime.utcnow() + datetime.timedelta(seconds=self.lease)
+
+    def claimable(self):
+        """dict: The filter for queued calculations that can be claimed."""
+        return {'queue': self.name, 'blocked': 0,
+                '$or': [{'status': 'pending'},
+                        {'status': 'running',
+                         'expires': {'$lt': datetime.datetime.utcnow()}}]}
+
+    def enqueue(self, items):
+        """
+        Adds calculations to the queue.
+
+        Parameters
+        ----------
+        items : list of tuple
+            Each item is (name, parents, priority), where name is the
+            calculation's name, parents is a list of the names of records the
+            calculation depends on, and priority is a number where larger
+            values are popped first.  Parents that are not in the queue are
+            treated as finished.  Calculations that are already queued are
+            replaced.
+        """
+        # https://api.mongodb.com/python/current/
+        from pymongo import ReplaceOne
+
+        items = [(name, list(parents), priority) for name, parents, priority in items]
+
+        # Find the parents already in the queue
+        parents = set()
+        for name, item_parents, priority in items:
+            parents.update(item_parents)
+        existing = set(entry['_id'] for entry in
+                       self.collection.find({'_id': {'$in': list(parents)},
+                                             'queue': self.name},
+                                            projection={'_id': 1}))
+
+        requests = []
+        names = set()
+        for name, item_parents, priority in items:
+            queued = [parent for parent in item_parents
+                      if parent in existing or parent in names]
+            names.add(name)
+            entry = {'_id': name, 'queue': self.name,
+                     'priority': priority, 'status': 'pending',
+                     'blocked': len(queued), 'parents': queued}
+            requests.append(ReplaceOne({'_id': name}, entry, upsert=True))
+        if len(requests) > 0:
+            self.collection.bulk_write(requests, ordered=False)
+
+    def pop(self, exclude=None):
+        """
+        Claims the highest priority calculation that is not waiting on
+        parents.  Running calculations whose leases have expired are
+        included.
+
+        Parameters
+        ----------
+        exclude : list of str, optional
+            Names of calculations not to pop.
+
+        Returns
+        -------
+        str or None
+            The name of the claimed calculation, or None if no calculations
+            are ready.
+        """
+        query = self.claimable()
+        if exclude is not None:
+            query['_id'] = {'$nin': list(exclude)}
+        entry = self.collection.find_one_and_update(
+            query,
+            {'$set': {'status': 'running', 'owner': self.owner,
+                      'expires': self.expires()}},
+            sort=[('priority', -1)], projection={'_id': 1})
+        if entry is None:
+            return None
+        return entry['_id']
+
+    def acquire(self, sim):
+        """
+        Attempts to claim a specific calculation.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+
+        Returns
+        -------
+        bool
+            True if the claim was placed, False if the calculation is not
+            ready or already claimed by another owner.
+        """
+        query = self.claimable()
+        query['_id'] = os.path.basename(sim)
+        result = self.collection.update_one(
+            query,
+            {'$set': {'status': 'running', 'owner': self.owner,
+                      'expires': self.expires()}})
+        return result.modified_count == 1
+
+    def renew(self, sim):
+        """
+        Extends the lease on a held claim.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        self.collection.update_one({'_id': os.path.basename(sim), 'owner': self.owner},
+                                   {'$set': {'expires': self.expires()}})
+
+    def release(self, sim):
+        """
+        Returns a held calculation to the queue.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        self.collection.update_one({'_id': os.path.basename(sim), 'owner': self.owner},
+                                   {'$set': {'status': 'pending', 'owner': None,
+                                             'expires': None}})
+
+    def done(self, sim):
+        """
+        Removes a finished calculation from the queue and unblocks the
+        calculations waiting on it.
+
+        Parameters
+        ----------
+        sim : str
+            The path to the calculation instance directory.
+        """
+        name = os.path.basename(sim)
+        result = self.collection.delete_one({'_id': name})
+        if result.deleted_count == 1:
+            self.collection.update_many({'parents': name},
+                                        {'$inc': {'blocked': -1},
+                                         '$pull': {'parents': name}})
+
+def load_queue(dbase, run_directory, queue=None, lease=600):
+    """
+    Builds the work queue for a run directory.
+
+    Parameters
+    ----------
+    dbase : iprPy.Database
+        The database the calculations are stored in.
+    run_directory : path-like object
+        The run directory the calculations are prepared in.
+    queue : str, bool or WorkQueue, optional
+        'sqlite' uses a queue file in run_directory and 'mongo' uses a
+        collection in the Mongo database dbase.  If None (default), the
+        sqlite queue is used only if its file already exists in
+        run_directory.  False disables the queue.  A WorkQueue object can
+        also be given directly.
+    lease : float, optional
+        The number of seconds a claim remains valid without being renewed.
+        (Default is 600).
+
+    Returns
+    -------
+    WorkQueue or None
+        The work queue, or None if no queue is used.
+    """
+    if isinstance(queue, WorkQueue):
+        return queue
+    elif queue is False:
+        return None
+    elif queue is None:
+        if Path(run_directory, SQLiteQueue.filename).is_file():
+            return SQLiteQueue(run_directory, lease=lease)
+        return None
+    elif queue == 'sqlite':
+        return SQLiteQueue(run_directory, lease=lease)
+    elif queue == 'mongo':
+        if dbase.style != 'mongo':
+            raise ValueError('mongo queues require a mongo database')
+        return MongoQueue(dbase.mongodb, Path(run_directory).name, lease=lease)
+    else:
+        raise ValueError(f'Unknown queue style {queue}')
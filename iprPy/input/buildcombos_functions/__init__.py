@@ -1,7 +1,7 @@
 """
 Attributes
 ----------
-loaded : dict
+loaded : iprPy.tools.LazyImport
     Keys are the style names of the buildcombos functions that were
     successfully imported, and values are the associated functions.
 failed : dict
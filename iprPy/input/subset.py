@@ -1,5 +1,9 @@
 from .subset_classes import loaded
 
+# Subset objects only hold their prefix, so one instance is shared for each
+# style and prefix
+_instances = {}
+
 def subset(style, prefix=''):
     """
     Wrapper function for the modular subset styles
@@ -15,4 +19,7 @@ def subset(style, prefix=''):
     -------
     iprPy.input.subset_classes.Subset subclass
     """
-    return loaded[style](prefix=prefix)
\ No newline at end of file
+    key = (style, prefix)
+    if key not in _instances:
+        _instances[key] = loaded[style](prefix=prefix)
+    return _instances[key]
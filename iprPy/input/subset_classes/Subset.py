@@ -88,6 +88,14 @@ class Subset():
             km[key] = self._pre(key)
         return km
 
+    @property
+    def querypaths(self):
+        """
+        dict : Maps the todict keys (with prefix) to the dot-separated
+               paths of the record content elements that hold the values.
+        """
+        return {}
+
     def template(self, header=None):
         """
         str : The input file template lines.
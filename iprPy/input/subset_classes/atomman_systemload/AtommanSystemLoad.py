@@ -57,6 +57,21 @@ class AtommanSystemLoad(Subset):
                     'elasticconstants_content',
                 ]
 
+    @property
+    def querypaths(self):
+        """
+        dict : Maps the todict keys (with prefix) to the dot-separated
+               paths of the record content elements that hold the values.
+        """
+        prefix = self.prefix
+        modelprefix = prefix.replace('_', '-')
+        return {
+            f'{prefix}load_file': f'{modelprefix}system-info.artifact.file',
+            f'{prefix}load_style': f'{modelprefix}system-info.artifact.format',
+            f'{prefix}load_options': f'{modelprefix}system-info.artifact.load_options',
+            f'{prefix}family': f'{modelprefix}system-info.family',
+        }
+
     def template(self, header=None):
         """
         str : The input file template lines.
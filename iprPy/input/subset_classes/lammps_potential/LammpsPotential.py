@@ -37,6 +37,21 @@ class LammpsPotential(Subset):
         return  self.preparekeys + [
                     'potential',
                 ]
+
+    @property
+    def querypaths(self):
+        """
+        dict : Maps the todict keys (with prefix) to the dot-separated
+               paths of the record content elements that hold the values.
+        """
+        prefix = self.prefix
+        modelprefix = prefix.replace('_', '-')
+        return {
+            f'{prefix}potential_LAMMPS_key': f'{modelprefix}potential-LAMMPS.key',
+            f'{prefix}potential_LAMMPS_id': f'{modelprefix}potential-LAMMPS.id',
+            f'{prefix}potential_key': f'{modelprefix}potential-LAMMPS.potential.key',
+            f'{prefix}potential_id': f'{modelprefix}potential-LAMMPS.potential.id',
+        }
   
     def template(self, header=None):
         """
@@ -33,8 +33,9 @@ class CalculationRecord(Record):
         ----------
         name : str, optional
             The unique name to assign to the record.
-        content : str, file-like object, DataModelDict
-            The content of the record as an XML formatted str.
+        content : str, bytes, path-like object, file-like object, DataModelDict
+            The content of the record as an XML or JSON formatted str, a
+            DataModelDict, or a file containing the content.
         """
         super().__init__(name=name, content=content)
         if self._mod_name == 'iprPy.record.CalculationRecord':
@@ -54,6 +55,31 @@ class CalculationRecord(Record):
         """
         return {}
     
+    @property
+    def querypaths(self):
+        """
+        dict: Maps todict keys to the dot-separated paths of the content
+              elements (relative to contentroot) that hold the values.
+        """
+        paths = super().querypaths
+        paths.update({
+            'iprPy_version': 'calculation.iprPy-version',
+            'atomman_version': 'calculation.atomman-version',
+            'LAMMPS_version': 'calculation.LAMMPS-version',
+            'script': 'calculation.script',
+            'branch': 'calculation.branch',
+            'status': 'status',
+        })
+        return paths
+    
+    @property
+    def querydefaults(self):
+        """
+        dict: Values that todict assigns to querypaths keys when the
+              associated content elements are missing.
+        """
+        return {'status': 'finished'}
+    
     def buildcontent(self, script, input_dict, results_dict=None):
         """
         Builds a data model of the specified record style based on input (and
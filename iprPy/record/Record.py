@@ -11,6 +11,8 @@ import pandas as pd
 # https://github.com/usnistgov/DataModelDict
 from DataModelDict import DataModelDict as DM
 
+from .QueryExtractor import QueryExtractor
+
 class Record(object):
     """
     Class for handling different record styles in the same fashion.  The
@@ -27,8 +29,11 @@ class Record(object):
         ----------
         name : str, optional
             The unique name to assign to the record.
-        content : str, file-like object, DataModelDict
-            The content of the record as an XML formatted str.
+        content : str, bytes, path-like object, file-like object, DataModelDict
+            The content of the record as an XML or JSON formatted str, a
+            DataModelDict, or a file containing the content.  DataModelDicts
+            are used directly rather than copied, and other values are only
+            parsed when the content is first accessed.
         """
         # Get module information for current class
         self_module = sys.modules[self.__module__]
@@ -83,23 +88,79 @@ class Record(object):
     @property
     def content(self):
         """
-        DataModelDict: The record's content.
+        DataModelDict: The record's content.  Content that was not given as a
+                       DataModelDict is parsed the first time it is accessed.
         """
-        if self.__content is not None:
-            return self.__content
-        else:
-            raise AttributeError('content not set')
+        if self.__content is None:
+            if self.__rawcontent is None:
+                raise AttributeError('content not set')
+            self.__content = self.__parse(self.__rawcontent)
+            self.__rawcontent = None
+        return self.__content
     
     @content.setter
     def content(self, value):
-        if value is not None:
+        self.__content = None
+        self.__rawcontent = None
+        if value is None:
+            return
+        
+        # Use DataModelDicts directly without copying
+        if isinstance(value, DM):
+            self.__content = self.__parse(value)
+        
+        # Read files now but parse later
+        elif isinstance(value, Path):
+            with open(value, 'rb') as f:
+                self.__rawcontent = f.read()
+        elif hasattr(value, 'read'):
+            self.__rawcontent = value.read()
+        else:
+            self.__rawcontent = value
+    
+    @property
+    def isparsed(self):
+        """bool: Indicates if the record's content has been parsed."""
+        return self.__rawcontent is None
+    
+    def __parse(self, value):
+        """Converts value to a DataModelDict and checks its root element"""
+        if not isinstance(value, DM):
             value = DM(value)
-            if len(value.keys()) == 1 and self.contentroot in value:
-                self.__content = DM(value)
-            else:
-                raise ValueError('Invalid root element for content')
+        if len(value.keys()) == 1 and self.contentroot in value:
+            return value
         else:
-            self.__content = None
+            raise ValueError('Invalid root element for content')
+    
+    @property
+    def querypaths(self):
+        """
+        dict: Maps todict keys to the dot-separated paths of the content
+              elements (relative to contentroot) that hold the values.  Only
+              keys with simple str, int or float values are included, which
+              allows for database styles to filter by them natively.
+        """
+        return {
+            'key': 'key',
+            'id': 'id',
+        }
+    
+    @property
+    def querydefaults(self):
+        """
+        dict: Values that todict assigns to querypaths keys when the
+              associated content elements are missing.
+        """
+        return {}
+    
+    @property
+    def queryextractor(self):
+        """
+        iprPy.record.QueryExtractor: The compiled accessor of the querypaths
+                                     values, shared by all records of the
+                                     style.
+        """
+        return QueryExtractor.fromrecord(self)
     
     @property
     def schema(self):
@@ -1,7 +1,7 @@
 """
 Attributes
 ----------
-loaded : dict
+loaded : iprPy.tools.LazyImport
     Dictionary of the record styles that were successfully imported. The
     dictionary keys are the database style names, and the values are the
     loaded modules.
@@ -12,8 +12,9 @@ failed : dict
 from ..tools import dynamic_import
 from .Record import Record
 from .CalculationRecord import CalculationRecord
+from .QueryExtractor import QueryExtractor
 
-ignorelist = ['Record', 'CalculationRecord']
+ignorelist = ['Record', 'CalculationRecord', 'QueryExtractor']
 loaded, failed = dynamic_import(__file__, __name__, ignorelist=ignorelist)
 
 def load_record(style, name=None, content=None):
@@ -36,4 +37,4 @@ def load_record(style, name=None, content=None):
     """
     return loaded[style](name=name, content=content)
 
-__all__ = ['Record', 'load_record', 'failed', 'loaded']
\ No newline at end of file
+__all__ = ['Record', 'QueryExtractor', 'load_record', 'failed', 'loaded']
\ No newline at end of file
@@ -23,6 +23,16 @@ class CalculationDiatomScan(CalculationRecord):
         """str: The root element of the content"""
         return 'calculation-diatom-scan'
     
+    @property
+    def querypaths(self):
+        """
+        dict: Maps todict keys to the dot-separated paths of the content
+              elements (relative to contentroot) that hold the values.
+        """
+        paths = super().querypaths
+        paths.update(subset('lammps_potential').querypaths)
+        return paths
+    
     @property
     def compare_terms(self):
         """
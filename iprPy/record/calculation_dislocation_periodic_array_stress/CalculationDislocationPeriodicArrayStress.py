@@ -23,6 +23,17 @@ class CalculationDislocationPeriodicArrayStress(CalculationRecord):
         """str: The root element of the content"""
         return 'calculation-dislocation-periodic-array-stress'
     
+    @property
+    def querypaths(self):
+        """
+        dict: Maps todict keys to the dot-separated paths of the content
+              elements (relative to contentroot) that hold the values.
+        """
+        paths = super().querypaths
+        paths.update(subset('lammps_potential').querypaths)
+        paths.update(subset('atomman_systemload').querypaths)
+        return paths
+    
     @property
     def compare_terms(self):
         """
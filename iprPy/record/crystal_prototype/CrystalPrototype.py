@@ -11,6 +11,24 @@ class CrystalPrototype(Record):
         """str: The root element of the content"""
         return 'crystal-prototype'
     
+    @property
+    def querypaths(self):
+        """
+        dict: Maps todict keys to the dot-separated paths of the content
+              elements (relative to contentroot) that hold the values.
+        """
+        paths = super().querypaths
+        paths.update({
+            'name': 'name',
+            'prototype': 'prototype',
+            'Pearson_symbol': 'Pearson-symbol',
+            'Strukturbericht': 'Strukturbericht',
+            'sg_number': 'space-group.number',
+            'sg_HG': 'space-group.Hermann-Maguin',
+            'sg_Schoen': 'space-group.Schoenflies',
+        })
+        return paths
+    
     def todict(self, full=True, flat=False):
         """
         Converts the structured content to a simpler dictionary.
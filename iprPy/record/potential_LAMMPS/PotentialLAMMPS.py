@@ -11,6 +11,22 @@ class PotentialLAMMPS(Record):
         """str: The root element of the content"""
         return 'potential-LAMMPS'
     
+    @property
+    def querypaths(self):
+        """
+        dict: Maps todict keys to the dot-separated paths of the content
+              elements (relative to contentroot) that hold the values.
+        """
+        paths = super().querypaths
+        paths.update({
+            'pot_key': 'potential.key',
+            'pot_id': 'potential.id',
+            'units': 'units',
+            'atom_style': 'atom_style',
+            'pair_style': 'pair_style.type',
+        })
+        return paths
+    
     def todict(self, full=True, flat=False):
         """
         Converts the structured content to a simpler dictionary.
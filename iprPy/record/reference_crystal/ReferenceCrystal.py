@@ -11,6 +11,19 @@ class ReferenceCrystal(Record):
         """str: The root element of the content"""
         return 'reference-crystal'   
     
+    @property
+    def querypaths(self):
+        """
+        dict: Maps todict keys to the dot-separated paths of the content
+              elements (relative to contentroot) that hold the values.
+        """
+        paths = super().querypaths
+        paths.update({
+            'sourcename': 'source.name',
+            'sourcelink': 'source.link',
+        })
+        return paths
+    
     def todict(self, full=True, flat=False):
         """
         Converts the structured content to a simpler dictionary.
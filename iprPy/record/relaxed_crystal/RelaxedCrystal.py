@@ -23,6 +23,18 @@ class RelaxedCrystal(Record):
         """str: The root element of the content"""
         return 'relaxed-crystal'
     
+    @property
+    def querypaths(self):
+        """
+        dict: Maps todict keys to the dot-separated paths of the content
+              elements (relative to contentroot) that hold the values.
+        """
+        paths = super().querypaths
+        paths['method'] = 'method'
+        paths['family'] = 'system-info.family'
+        paths.update(subset('lammps_potential').querypaths)
+        return paths
+    
     @property
     def compare_terms(self):
         """
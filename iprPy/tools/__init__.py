@@ -2,7 +2,7 @@
 from .aslist import aslist, iaslist
 from .filltemplate import filltemplate
 from .screen_input import screen_input
-from .dynamic_import import dynamic_import
+from .dynamic_import import dynamic_import, LazyImport
 
 from .get_mp_structures import get_mp_structures
 from .get_oqmd_structures import get_oqmd_structures
@@ -13,6 +13,7 @@ from .generate_potential_record import generate_potential_record
 from .save_potential_record import save_potential_record
 
 __all__ = ['aslist', 'iaslist', 'filltemplate', 'screen_input', 'dynamic_import',
+           'LazyImport',
            'get_mp_structures', 'get_oqmd_structures',
            'loaded_formats', 'failed_formats', 'PotentialGenerator',
            'generate_potential_record', 'save_potential_record']
@@ -2,54 +2,134 @@
 import sys
 from pathlib import Path
 from importlib import import_module
+from collections.abc import Mapping
 
-def dynamic_import(module_file, module_name, ignorelist=None):
+class LazyImport(Mapping):
+    """
+    Read-only dictionary of the classes stored in submodules, keyed by style
+    name.  The style names are found by listing the package directory, and
+    each submodule is only imported the first time its style is accessed.
+    Listing the keys or checking membership imports the submodules as
+    needed, so only styles that import successfully are ever listed.
+    Submodules that fail import are left out of the keys and their error
+    messages are added to the associated failed dictionary.
+    """
+
+    def __init__(self, module_name, names, failed):
+        """
+        Parameters
+        ----------
+        module_name : str
+            The name of the package containing the submodules.
+        names : list of str
+            The style (submodule) names.
+        failed : dict
+            The dictionary to add the error messages of failed imports to.
+        """
+        self.__module_name = module_name
+        self.__names = names
+        self.__failed = failed
+        self.__loaded = {}
+
+    def __getitem__(self, name):
+        if name not in self.__loaded:
+            if name not in self.__names or name in self.__failed:
+                if name in self.__failed:
+                    raise KeyError(f'{name} failed import: {self.__failed[name]}')
+                raise KeyError(name)
+
+            try:
+                module = import_module('.' + name, self.__module_name)
+                all = getattr(module, '__all__')
+                if len(all) != 1:
+                    raise AttributeError("module's __all__ must have only one attribute")
+            except:
+                self.__failed[name] = '%s: %s' % sys.exc_info()[:2]
+                raise KeyError(f'{name} failed import: {self.__failed[name]}')
+            else:
+                self.__loaded[name] = getattr(module, all[0])
+
+        return self.__loaded[name]
+
+    def __contains__(self, name):
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        for name in self.__names:
+            if name in self:
+                yield name
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def load_all(self):
+        """
+        Imports all submodules that have not yet been imported so that the
+        keys and the failed dictionary are complete.
+        """
+        for name in self.__names:
+            try:
+                self[name]
+            except KeyError:
+                pass
+
+def dynamic_import(module_file, module_name, ignorelist=None, lazy=True):
     """
     Dynamically imports classes stored in submodules and makes them directly
     accessible by style name within the returned loaded dictionary.
-    
+
     Parameters
     ----------
-    
+    module_file : str
+        The __file__ of the package containing the submodules.
+    module_name : str
+        The __name__ of the package containing the submodules.
+    ignorelist : list, optional
+        Submodule names to not treat as styles.
+    lazy : bool, optional
+        If True (default), loaded is a LazyImport that imports each submodule
+        on first access.  If False, all submodules are imported now and loaded
+        is a dict.
+
     Returns
     -------
-    loaded : dict
+    loaded : LazyImport or dict
         Contains the derived classes that were successfully loaded and
         accessible by style name (root submodule).
     failed : dict
-        
+        Contains the error messages for the submodules that failed import.
     """
     if ignorelist is None:
         ignorelist = []
     names = []
     parent = Path(module_file).parent
     ignorelist = ['__init__', '__pycache__'] + ignorelist
-    loaded = {}
     failed = {}
-    
-    for child in parent.iterdir():
+
+    for child in sorted(parent.iterdir()):
         if child.is_dir():
             name = child.name
             if name not in ignorelist:
                 names.append(name)
-        
+
         elif child.is_file():
             name = child.stem
             ext = child.suffix
-            
+
             if ext.lower() in ('.py', '.pyc'):
                 if name not in ignorelist and name not in names:
                     names.append(name)
-    
-    for name in names:
-        try:
-            module = import_module('.' + name, module_name)
-            all = getattr(module, '__all__')
-            if len(all) != 1:
-                raise AttributeError("module's __all__ must have only one attribute")
-        except:
-            failed[name] = '%s: %s' % sys.exc_info()[:2]
-        else:
-            loaded[name] = getattr(module, all[0])
-    
-    return loaded, failed
\ No newline at end of file
+
+    loaded = LazyImport(module_name, names, failed)
+    if lazy:
+        return loaded, failed
+
+    loaded.load_all()
+    return dict(loaded), failed
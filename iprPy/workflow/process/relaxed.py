@@ -1,4 +1,7 @@
 import uuid
+from pathlib import Path
+import json
+import os
 
 # http://www.numpy.org/
 import numpy as np
@@ -13,63 +16,88 @@ import pandas as pd
 
 from ... import load_database, load_record
 
-def relaxed(database_name, crystal_match_file, all_crystals_file, unique_crystals_file):
+# Columns of the all crystals and unique crystals files
+result_columns = ['calc_key', 'potential_LAMMPS_key', 'potential_LAMMPS_id',
+                  'potential_key', 'potential_id', 'composition', 'prototype',
+                  'family', 'method', 'transformed', 'E_coh', 'a', 'b', 'c',
+                  'alpha', 'beta', 'gamma']
+
+# Values compared when checking if results are the same crystal
+match_columns = ['E_coh', 'a', 'b', 'c', 'alpha', 'beta', 'gamma']
+
+# Calculation methods from most robust to least
+methods = ['dynamic', 'static', 'box']
+
+def relaxed(database_name, crystal_match_file, all_crystals_file,
+            unique_crystals_file, incremental=False, watermark_file=None):
+    """
+    Processes the crystal_space_group results of relaxed crystals into the
+    all crystals and unique crystals files, and adds relaxed_crystal records
+    for the new unique crystals.
+
+    Parameters
+    ----------
+    database_name : str
+        The name of the database to access.
+    crystal_match_file : path-like object
+        The csv file matching references to prototypes.
+    all_crystals_file : path-like object
+        The csv file of all processed results.
+    unique_crystals_file : path-like object
+        The csv file of the unique results.
+    incremental : bool, optional
+        If False (default), all finished crystal_space_group records are
+        loaded and checked.  If True, only the crystal_space_group records
+        that were not processed by previous incremental runs are loaded.
+    watermark_file : path-like object, optional
+        The json file that records the crystal_space_group records processed
+        by incremental runs, and the space group of each family.  Default
+        value adds '.watermark.json' to all_crystals_file.
+    """
     # !!!!!!!!!!!!!!!!!!!!!!!!!!!!! Load records !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! #
 
     database = load_database(database_name)
 
-    # Load potential_LAMMPS records
-    pot_records = database.get_records_df(style='potential_LAMMPS')
-    print(f'{len(pot_records)} potential records found', flush=True)
-
-    # Load crystal_prototype records
-    proto_records = database.get_records_df(style='crystal_prototype')
-    print(f'{len(proto_records)} prototype records found', flush=True)
-
-    # Load reference_crystal records
-    ref_records = database.get_records_df(style='reference_crystal')
-    print(f'{len(ref_records)} reference records found', flush=True)
-
-    # Get key lists for relax_* calculations
-    raw_df = database.get_records_df(style='calculation_relax_box',
-                                    full=False, flat=True)
-    print(f'{len(raw_df)} calculation_relax_box records found', flush=True)
-    try:
-        box_keys = raw_df.key.tolist()
-    except:
-        box_keys = []
-
-    raw_df = database.get_records_df(style='calculation_relax_static',
-                                    full=False, flat=True)
-    print(f'{len(raw_df)} calculation_relax_static records found', flush=True)
-    try:
-        static_keys = raw_df.key.tolist()
-    except:
-        static_keys = []
-
-    raw_df = database.get_records_df(style='calculation_relax_dynamic',
-                                    full=False, flat=True)
-    print(f'{len(raw_df)} calculation_relax_dynamic records found', flush=True)
-    try:
-        dynamic_keys = raw_df.key.tolist()
-    except:
-        dynamic_keys = []
-    print()
+    if watermark_file is None:
+        watermark_file = f'{all_crystals_file}.watermark.json'
+    if incremental:
+        watermark = load_watermark(watermark_file)
+    else:
+        watermark = None
 
     # Get space group results
-    spg_records = database.get_records_df(style='calculation_crystal_space_group',
-                                        full=True, flat=False, status='finished')
-    print(f'{len(spg_records)} calculation_crystal_space_group records found',
-        flush=True)
+    if incremental:
+        spg_names = database.get_record_names(style='calculation_crystal_space_group')
+        new_names = sorted(spg_names.difference(watermark['processed']))
+        print(f'{len(spg_names)} calculation_crystal_space_group records found',
+              flush=True)
+        print(f' -{len(new_names)} are new since the last run', flush=True)
+        if len(new_names) > 0:
+            spg_records = database.get_records_df(name=new_names,
+                                                  style='calculation_crystal_space_group',
+                                                  full=True, flat=False)
+        else:
+            spg_records = pd.DataFrame(columns=['key', 'status', 'branch'])
+
+        # Records that have run are processed, unless their family is unknown
+        processed = set(spg_records[spg_records.status != 'not calculated'].key)
+        spg_records = spg_records[spg_records.status == 'finished']
+    else:
+        spg_records = database.get_records_df(style='calculation_crystal_space_group',
+                                              full=True, flat=False, status='finished')
+        print(f'{len(spg_records)} calculation_crystal_space_group records found',
+              flush=True)
+        processed = set()
 
     if len(spg_records) == 0:
         print('Stopping as no calculations to process')
+        save_watermark(watermark_file, watermark, processed)
         return
 
     # Separate records by branch
     prototype_records = spg_records[spg_records.branch == 'prototype']
     reference_records = spg_records[spg_records.branch == 'reference']
-    family_records = spg_records[(spg_records.branch == 'prototype') 
+    family_records = spg_records[(spg_records.branch == 'prototype')
                                 |(spg_records.branch == 'reference')]
     print(f' -{len(prototype_records)} are for prototypes', flush=True)
     print(f' -{len(reference_records)} are for references', flush=True)
@@ -78,12 +106,23 @@ def relaxed(database_name, crystal_match_file, all_crystals_file, unique_crystal
     print(f' -{len(calc_records)} are for calculations', flush=True)
     print()
 
+    # Space group of each family
+    if incremental:
+        families = watermark['families']
+    else:
+        families = {}
+    for series in family_records.itertuples():
+        families.setdefault(series.family, [int(series.spacegroup_number),
+                                            series.pearson_symbol])
+
     if len(calc_records) == 0:
         print('Stopping as no calculations to process')
+        save_watermark(watermark_file, watermark, processed)
         return
 
-    if len(family_records) == 0:
+    if len(families) == 0:
         print('Stopping as prototype/reference records needed')
+        save_watermark(watermark_file, watermark, processed.difference(calc_records.key))
         return
 
     # !!!!!!!!!!!!!!!!!!!!!!!!!! Load saved results !!!!!!!!!!!!!!!!!!!!!!!!!!!!! #
@@ -98,36 +137,39 @@ def relaxed(database_name, crystal_match_file, all_crystals_file, unique_crystal
     try:
         results = pd.read_csv(all_crystals_file)
     except:
-        columns = ['calc_key', 'potential_LAMMPS_key', 'potential_LAMMPS_id',
-                'potential_key', 'potential_id', 'composition', 'prototype',
-                'family', 'method', 'transformed', 'E_coh', 'a', 'b', 'c',
-                    'alpha', 'beta', 'gamma']
-        results = pd.DataFrame(columns=columns)
+        results = pd.DataFrame(columns=result_columns)
     print(f'{len(results)} previous results found', flush=True)
 
     try:
         unique = pd.read_csv(unique_crystals_file)
     except:
-        columns = ['calc_key', 'potential_LAMMPS_key', 'potential_LAMMPS_id',
-                'potential_key', 'potential_id', 'composition', 'prototype',
-                'family', 'method', 'transformed', 'E_coh', 'a', 'b', 'c',
-                    'alpha', 'beta', 'gamma']
-        unique = pd.DataFrame(columns=columns)
+        unique = pd.DataFrame(columns=result_columns)
     print(f'{len(unique)} previous unique results found', flush=True)
 
     print()
 
     # !!!!!!!!!!!!!!!!!!!!!!!!! Process new results !!!!!!!!!!!!!!!!!!!!!!!!!!!!! #
 
+    # Map references to prototypes
+    prototypes = {}
+    for series in ref_proto_match.itertuples():
+        if not pd.isnull(series.prototype):
+            prototypes.setdefault(series.reference, series.prototype)
+
     newresults = []
-    old_keys = results.calc_key.values
+    old_keys = set(results.calc_key)
     for series in calc_records.itertuples():
         if series.key in old_keys:
             continue
-            
+
+        # Leave calculations for families without results for a later run
+        if series.family not in families:
+            processed.discard(series.key)
+            continue
+
         results_dict = {}
-        
-        # Copy over values in series    
+
+        # Copy over values in series
         results_dict['calc_key'] = series.key
         results_dict['composition'] = series.composition
         results_dict['family'] = series.family
@@ -137,145 +179,220 @@ def relaxed(database_name, crystal_match_file, all_crystals_file, unique_crystal
         results_dict['alpha'] = series.ucell.box.alpha
         results_dict['beta'] = series.ucell.box.beta
         results_dict['gamma'] = series.ucell.box.gamma
-        
+
         # Identify prototype
-        try:
-            results_dict['prototype'] = ref_proto_match[ref_proto_match.reference==series.family].prototype.values[0]
-        except:
-            results_dict['prototype'] = series.family
-        else:
-            if pd.isnull(results_dict['prototype']):
-                results_dict['prototype'] = series.family
-        
+        results_dict['prototype'] = prototypes.get(series.family, series.family)
+
         # Check if structure has transformed relative to reference
-        family_series = family_records[family_records.family == series.family].iloc[0]
-        results_dict['transformed'] = (not (family_series.spacegroup_number == series.spacegroup_number
-                                    and family_series.pearson_symbol == series.pearson_symbol))
-        
+        spacegroup_number, pearson_symbol = families[series.family]
+        results_dict['transformed'] = (not (spacegroup_number == series.spacegroup_number
+                                    and pearson_symbol == series.pearson_symbol))
+
         # Extract info from parent calculations
         for parent in database.get_parent_records(name=series.key):
-            
-            parent_dict = parent.todict()
 
-            if parent_dict['key'] in box_keys:
+            if parent.style == 'calculation_relax_box':
+                parent_dict = parent.todict()
                 results_dict['method'] = 'box'
                 results_dict['E_coh'] = parent_dict['E_cohesive']
                 results_dict['potential_LAMMPS_key'] = parent_dict['potential_LAMMPS_key']
                 continue
 
-            elif parent_dict['key'] in dynamic_keys:
+            elif parent.style == 'calculation_relax_dynamic':
                 results_dict['method'] = 'dynamic'
                 continue
 
-            elif parent_dict['key'] in static_keys:
+            elif parent.style == 'calculation_relax_static':
+                parent_dict = parent.todict()
                 results_dict['method'] = 'static'
                 results_dict['E_coh'] = parent_dict['E_cohesive']
                 results_dict['potential_LAMMPS_key'] = parent_dict['potential_LAMMPS_key']
 
-        pot_record = pot_records[pot_records.key == results_dict['potential_LAMMPS_key']].iloc[0]
+        newresults.append(results_dict)
+
+    # Load only the potentials of the new results
+    pot_records = get_potentials(database, [r['potential_LAMMPS_key'] for r in newresults])
+    for results_dict in newresults:
+        pot_record = pot_records.loc[results_dict['potential_LAMMPS_key']]
         results_dict['potential_id'] = pot_record.pot_id
         results_dict['potential_key'] = pot_record.pot_key
         results_dict['potential_LAMMPS_id'] = pot_record.id
-        
-        newresults.append(results_dict)
 
     print(f'{len(newresults)} new results added')
     if len(newresults) > 0:
-        results = results.append(newresults, ignore_index=True)
+        results = pd.concat([results, pd.DataFrame(newresults)], ignore_index=True)
         results.to_csv(all_crystals_file, index=False)
 
     # !!!!!!!!!!!!!!!!!!!!!!!!! Find unique results !!!!!!!!!!!!!!!!!!!!!!!!!!!!! #
 
-    new_unique = pd.DataFrame(columns=results.columns)
-
-    # Loop over all potential implementations
-    for implememtation_key in np.unique(results.potential_LAMMPS_key):
-        imp_results = results[results.potential_LAMMPS_key == implememtation_key]
-        
-        # Loop over all compositions
-        for composition in np.unique(results.composition):
-            comp_unique = unique[unique.composition == composition].reset_index(drop=True)
-            comp_results = imp_results[imp_results.composition == composition]
-            
-            # Loop over all prototypes
-            for prototype in np.unique(comp_results.prototype):
-                proto_results = comp_results[comp_results.prototype == prototype]
-                
-                # Loop over calculation methods from most robust to least
-                for method in ['dynamic', 'static', 'box']:
-                    
-                    # First try matching results where prototype == family
-                    for i, series in proto_results[(proto_results.prototype == proto_results.family)
-                                                &(proto_results.method == method)
-                                                &(~proto_results.transformed)].iterrows():
-                        try:
-                            matches = comp_unique[(np.isclose(comp_unique.E_coh, series.E_coh))
-                                                &(np.isclose(comp_unique.a, series.a))
-                                                &(np.isclose(comp_unique.b, series.b))
-                                                &(np.isclose(comp_unique.c, series.c))
-                                                &(np.isclose(comp_unique.alpha, series.alpha))
-                                                &(np.isclose(comp_unique.beta, series.beta))
-                                                &(np.isclose(comp_unique.gamma, series.gamma))]
-                        except:
-                            matches = []
-                        if len(matches) == 0:
-                            comp_unique = comp_unique.append(series)
-                            new_unique = new_unique.append(series)
-                            
-                    # Next try matching results where prototype != family
-                    for i, series in proto_results[(proto_results.prototype != proto_results.family)
-                                                &(proto_results.method == method)
-                                                &(~proto_results.transformed)].iterrows():
-                        try:
-                            matches = comp_unique[(np.isclose(comp_unique.E_coh, series.E_coh))
-                                                &(np.isclose(comp_unique.a, series.a))
-                                                &(np.isclose(comp_unique.b, series.b))
-                                                &(np.isclose(comp_unique.c, series.c))
-                                                &(np.isclose(comp_unique.alpha, series.alpha))
-                                                &(np.isclose(comp_unique.beta, series.beta))
-                                                &(np.isclose(comp_unique.gamma, series.gamma))]
-                        except:
-                            matches = []
-                        if len(matches) == 0:
-                            comp_unique = comp_unique.append(series)
-                            new_unique = new_unique.append(series)
-                            
-    print(f'{len(new_unique)} new unique results added')       
+    # Check only this run's calculations in incremental mode
+    if incremental:
+        candidates = results[results.calc_key.isin(calc_records.key)]
+    else:
+        candidates = results
+
+    new_unique = find_unique(candidates, unique)
+
+    print(f'{len(new_unique)} new unique results added')
     if len(new_unique) > 0:
-        unique = unique.append(new_unique)
+        unique = pd.concat([unique, new_unique])
         unique.to_csv(unique_crystals_file, index=False)
 
     # !!!!!!!!!!!!!!!!!!! Generate relaxed_crystal records !!!!!!!!!!!!!!!!!!!!!! #
 
+    pot_records = get_potentials(database, new_unique.potential_LAMMPS_key)
+
+    # Load only the prototypes used by the new unique results
+    proto_ids = [row.prototype for row in new_unique.itertuples()
+                 if not use_spg_crystal(row.prototype)]
+    if len(proto_ids) > 0:
+        proto_records = database.get_records_df(style='crystal_prototype',
+                                                id=list(set(proto_ids)))
+    else:
+        proto_records = pd.DataFrame(columns=['id'])
+
     for row in new_unique.itertuples():
-        
+
         crystal_terms = {}
         crystal_terms['key'] = str(uuid.uuid4())
         crystal_terms['method'] = row.method
         crystal_terms['family'] = row.family
         crystal_terms['length_unit'] = 'angstrom'
-        
-        pot_record = database.get_record(name = pot_records[pot_records.key == row.potential_LAMMPS_key].id)
+
+        pot_record = database.get_record(name = pot_records.loc[row.potential_LAMMPS_key].id)
         crystal_terms['potential'] = lmp.Potential(pot_record.content)
-        
+
         c_record = calc_records[calc_records.key == row.calc_key].iloc[0]
-        
+
         # Use spg crystals for ref and α-As
-        if (row.prototype[:3] == 'mp-' or
-            row.prototype[:4] == 'mvc-' or
-            row.prototype[:5] == 'oqmd-' or
-            row.prototype == 'A7--alpha-As'):
+        if use_spg_crystal(row.prototype):
             crystal_terms['ucell'] = c_record.ucell
-        
+
         # Use scaled prototype crystals for the rest
         else:
             p_record = proto_records[proto_records.id == row.prototype].iloc[0]
             crystal_terms['ucell'] = p_record.ucell
             crystal_terms['ucell'].symbols = c_record.symbols
             crystal_terms['ucell'].box_set(a=row.a, b=row.b, c=row.c, alpha=row.alpha, beta=row.beta, gamma=row.gamma, scale=True)
-        
+
         relaxrecord = load_record('relaxed_crystal')
         relaxrecord.buildcontent('b', crystal_terms)
         relaxrecord.name = crystal_terms['key']
-        
-        database.add_record(relaxrecord)
\ No newline at end of file
+
+        database.add_record(relaxrecord)
+
+    # Mark the records as processed only once everything has been saved
+    save_watermark(watermark_file, watermark, processed)
+
+def use_spg_crystal(prototype):
+    """
+    Checks if the relaxed_crystal records for a prototype use the
+    crystal_space_group crystal rather than a scaled prototype crystal.
+    """
+    return (prototype[:3] == 'mp-' or
+            prototype[:4] == 'mvc-' or
+            prototype[:5] == 'oqmd-' or
+            prototype == 'A7--alpha-As')
+
+def get_potentials(database, keys):
+    """
+    Loads the potential_LAMMPS records with the given keys.
+
+    Parameters
+    ----------
+    database : iprPy.database.Database
+        The database to access.
+    keys : list of str
+        The potential_LAMMPS keys.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The potential_LAMMPS records indexed by key.
+    """
+    keys = list(set(keys))
+    if len(keys) == 0:
+        return pd.DataFrame(columns=['id', 'pot_id', 'pot_key'])
+    pot_records = database.get_records_df(style='potential_LAMMPS', key=keys)
+    print(f'{len(pot_records)} potential records loaded', flush=True)
+    return pot_records.drop_duplicates('key').set_index('key')
+
+def find_unique(results, unique):
+    """
+    Finds the results that are not the same crystal as a unique result or an
+    earlier result.  Only results for the same potential implementation and
+    composition are compared, which are grouped into buckets so the cost of
+    each check does not grow with the total number of unique results.
+
+    Parameters
+    ----------
+    results : pandas.DataFrame
+        The results to check.
+    unique : pandas.DataFrame
+        The previously found unique results.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The new unique results.
+    """
+    # Build buckets of existing unique values
+    buckets = {}
+    if len(unique) > 0:
+        values = unique[match_columns].to_numpy(dtype=float)
+        keys = zip(unique.potential_LAMMPS_key, unique.composition)
+        for key, value in zip(keys, values):
+            buckets.setdefault(key, []).append(value)
+
+    # Check untransformed results by prototype, by calculation method from
+    # most robust to least, and with prototype == family results first
+    candidates = results[(~results.transformed.astype(bool))
+                        &(results.method.isin(methods))]
+    order = pd.DataFrame({'potential_LAMMPS_key': candidates.potential_LAMMPS_key,
+                          'composition': candidates.composition,
+                          'prototype': candidates.prototype,
+                          'method': candidates.method.map(methods.index),
+                          'refamily': candidates.prototype != candidates.family})
+    order = order.sort_values(list(order.columns), kind='stable')
+    candidates = candidates.loc[order.index]
+
+    new_unique = []
+    values = candidates[match_columns].to_numpy(dtype=float)
+    keys = zip(candidates.potential_LAMMPS_key, candidates.composition)
+    for i, key, value in zip(candidates.index, keys, values):
+        bucket = buckets.setdefault(key, [])
+        if len(bucket) > 0 and np.isclose(bucket, value).all(axis=1).any():
+            continue
+        bucket.append(value)
+        new_unique.append(i)
+
+    return candidates.loc[new_unique]
+
+def load_watermark(watermark_file):
+    """
+    Reads the names of the crystal_space_group records processed by previous
+    incremental runs and the space groups of the families.
+    """
+    try:
+        with open(watermark_file) as f:
+            watermark = json.load(f)
+    except FileNotFoundError:
+        watermark = {}
+    watermark['processed'] = set(watermark.get('processed', []))
+    watermark['families'] = watermark.get('families', {})
+    return watermark
+
+def save_watermark(watermark_file, watermark, processed):
+    """
+    Adds newly processed record names to the watermark file.  Does nothing
+    if watermark is None, i.e. for non-incremental runs.
+    """
+    if watermark is None:
+        return
+    watermark['processed'].update(processed)
+    tempname = Path(Path(watermark_file).parent,
+                    f'.{Path(watermark_file).name}.{uuid.uuid4()}')
+    with open(tempname, 'w') as f:
+        json.dump({'processed': sorted(watermark['processed']),
+                   'families': watermark['families']}, f)
+    os.replace(tempname, watermark_file)
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from iprPy.database.DuplicateIndex import DuplicateIndex
+
+def test_object_ints_match_floats():
+    """Python ints in object columns match the same numbers as floats."""
+    index = DuplicateIndex(['size', 'symbol'], {'a': 1e-5})
+    index.add(pd.DataFrame({'size': pd.Series([None, 1, 2], dtype=object),
+                            'symbol': ['Al', 'Al', 'Cu'],
+                            'a': [4.05, 4.05, 3.61]}))
+
+    candidates = pd.DataFrame({'size': [np.nan, 1.0, 2.0, 3.0],
+                               'symbol': ['Al', 'Al', 'Al', 'Al'],
+                               'a': [4.05, 4.05, 4.05, 4.05]})
+    assert candidates['size'].dtype == float
+    assert index.new(candidates).tolist() == [False, False, True, True]
+
+def test_numeric_strings_do_not_match_numbers():
+    """str values only match equal str values."""
+    index = DuplicateIndex(['size'], {})
+    index.add(pd.DataFrame({'size': [1.0]}))
+    assert index.new(pd.DataFrame({'size': ['1.0', '1']})).tolist() == [True, True]